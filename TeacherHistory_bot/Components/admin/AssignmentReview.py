@@ -4,9 +4,36 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Button } from '@/components/ui/button';
 import { Textarea } from '@/components/ui/textarea';
+import { Progress } from '@/components/ui/progress';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
-import { CheckCircle2, XCircle, Clock, MessageSquare } from 'lucide-react';
-import { InvokeLLM } from '@/integrations/Core';
+import { CheckCircle2, XCircle, Clock, MessageSquare, Brain } from 'lucide-react';
+
+// Как часто опрашивать фоновую задачу ИИ-проверки
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_FINISHED_STATUSES = ['succeeded', 'failed'];
+
+async function requestJson(url, options = {}) {
+    const response = await fetch(url, { credentials: 'same-origin', ...options });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    return response.json();
+}
+
+// Запускает ИИ-проверку на сервере и ждёт окончания задачи, передавая её счётчик done/total в onProgress
+async function runAIReview(criteria, onProgress) {
+    let job = await requestJson('/api/review/ai', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(criteria)
+    });
+    onProgress(job);
+    while (!JOB_FINISHED_STATUSES.includes(job.status)) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        job = await requestJson(`/api/jobs/${job.id}`);
+        onProgress(job);
+    }
+    if (job.status === 'failed') throw new Error(job.error || 'AI review failed');
+    return job;
+}
 
 export default function AssignmentReview() {
     const [submissions, setSubmissions] = useState([]);
@@ -18,6 +45,9 @@ export default function AssignmentReview() {
     const [points, setPoints] = useState(0);
     const [loading, setLoading] = useState(true);
     const [filter, setFilter] = useState('pending');
+    const [reviewJob, setReviewJob] = useState(null);
+    const [drafts, setDrafts] = useState([]);
+    const [aiReviewing, setAiReviewing] = useState(false);
 
     useEffect(() => {
         loadData();
@@ -25,16 +55,18 @@ export default function AssignmentReview() {
 
     const loadData = async () => {
         try {
-            const [submissionsData, assignmentsData, usersData, topicsData] = await Promise.all([
+            const [submissionsData, assignmentsData, usersData, topicsData, draftsData] = await Promise.all([
                 UserProgress.list('-created_date'),
                 Assignment.list('-created_date'),
                 User.list('-created_date'),
-                Topic.list('grade')
+                Topic.list('grade'),
+                requestJson('/api/review/drafts')
             ]);
             setSubmissions(submissionsData);
             setAssignments(assignmentsData);
             setUsers(usersData);
             setTopics(topicsData);
+            setDrafts(draftsData);
         } catch (error) {
             console.error("Ошибка загрузки данных:", error);
         }
@@ -46,10 +78,12 @@ export default function AssignmentReview() {
             const assignment = assignments.find(a => a.id === submission.assignment_id);
             if (!assignment) return false;
             
+            // Как и на сервере: без оценки, пока нет отзыва или не решено, верен ли ответ
+            const ungraded = submission.ai_feedback == null || submission.is_correct == null;
             if (filter === 'pending') {
-                return assignment.type !== 'test' && submission.ai_feedback === undefined;
+                return assignment.type !== 'test' && ungraded;
             } else if (filter === 'reviewed') {
-                return submission.ai_feedback !== undefined;
+                return !ungraded;
             } else {
                 return assignment.type !== 'test';
             }
@@ -71,69 +105,82 @@ export default function AssignmentReview() {
         return user ? (user.full_name || user.email) : email;
     };
 
+    const getDraft = (submissionId) => drafts.find(d => d.progress_id === submissionId);
+
+    const closeReview = () => {
+        setSelectedSubmission(null);
+        setFeedback('');
+        setPoints(0);
+    };
+
+    // Открывает ответ; если ИИ уже подготовил оценку, подставляет её для правки
+    const selectSubmission = (submission) => {
+        const draft = getDraft(submission.id);
+        setSelectedSubmission(submission);
+        setPoints(draft ? draft.points_earned : 0);
+        setFeedback(draft ? draft.feedback || '' : '');
+    };
+
     const handleReview = async (submission, isCorrect, pointsEarned, aiFeedback) => {
+        const draft = getDraft(submission.id);
+        // Оценку записывает сервер: он же пересчитывает баллы и уровень ученика
+        const url = draft ? `/api/review/drafts/${draft.id}/accept` : `/api/review/grade/${submission.id}`;
         try {
-            await UserProgress.update(submission.id, {
-                is_correct: isCorrect,
-                points_earned: pointsEarned,
-                ai_feedback: aiFeedback
+            await requestJson(url, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ is_correct: isCorrect, points_earned: pointsEarned, feedback: aiFeedback })
             });
-
-            // Обновляем баллы пользователя
-            const user = users.find(u => u.email === submission.created_by);
-            if (user) {
-                const newTotalPoints = (user.total_points || 0) + pointsEarned;
-                await User.update(user.id, { 
-                    total_points: newTotalPoints,
-                    level: Math.floor(newTotalPoints / 100) + 1
-                });
-            }
-
             loadData();
-            setSelectedSubmission(null);
-            setFeedback('');
-            setPoints(0);
+            closeReview();
         } catch (error) {
             console.error("Ошибка сохранения оценки:", error);
         }
     };
 
+    const handleRejectDraft = async (draft) => {
+        try {
+            await requestJson(`/api/review/drafts/${draft.id}/reject`, { method: 'POST' });
+            setDrafts(prev => prev.filter(d => d.id !== draft.id));
+            setPoints(0);
+            setFeedback('');
+        } catch (error) {
+            console.error("Ошибка отклонения оценки ИИ:", error);
+        }
+    };
+
     const handleAIReview = async () => {
         if (!selectedSubmission) return;
 
-        const assignment = assignments.find(a => a.id === selectedSubmission.assignment_id);
-        if (!assignment) return;
-
+        setAiReviewing(true);
         try {
-            const aiResult = await InvokeLLM({
-                prompt: `Проверь ответ ученика на задание по истории/обществознанию.
-                
-                Задание: ${assignment.question}
-                Правильный ответ: ${assignment.correct_answer}
-                Ответ ученика: ${selectedSubmission.user_answer}
-                
-                Оцени ответ по критериям:
-                1. Правильность фактов
-                2. Полнота ответа
-                3. Структура изложения
-                
-                Выстави баллы от 0 до ${assignment.points} и дай подробную обратную связь.`,
-                response_json_schema: {
-                    type: "object",
-                    properties: {
-                        is_correct: { type: "boolean" },
-                        points_earned: { type: "number" },
-                        feedback: { type: "string" }
-                    }
-                }
-            });
-            
-            setPoints(aiResult.points_earned);
-            setFeedback(aiResult.feedback);
+            const job = await runAIReview({ progress_id: selectedSubmission.id }, () => {});
+            const [draft] = await requestJson(`/api/review/drafts?status=all&job_id=${job.id}`);
+            if (!draft) {
+                alert("Этот ответ уже проверяется или ждёт решения по оценке ИИ.");
+            } else if (draft.status === 'failed') {
+                alert("Ошибка при получении ИИ-оценки. Попробуйте еще раз.");
+            } else {
+                setDrafts(prev => [...prev.filter(d => d.progress_id !== draft.progress_id), draft]);
+                setPoints(draft.points_earned);
+                setFeedback(draft.feedback || '');
+            }
         } catch (error) {
             console.error("Ошибка ИИ-проверки:", error);
             alert("Ошибка при получении ИИ-оценки. Попробуйте еще раз.");
         }
+        setAiReviewing(false);
+    };
+
+    const handleBulkAIReview = async () => {
+        try {
+            await runAIReview({}, setReviewJob);
+            loadData();
+        } catch (error) {
+            console.error("Ошибка ИИ-проверки:", error);
+            alert("Ошибка при ИИ-проверке. Попробуйте еще раз.");
+            setReviewJob(null);
+        }
     };
 
     if (loading) {
@@ -145,6 +192,7 @@ export default function AssignmentReview() {
     }
 
     const filteredSubmissions = getFilteredSubmissions();
+    const reviewRunning = reviewJob !== null && !JOB_FINISHED_STATUSES.includes(reviewJob.status);
 
     return (
         <div className="space-y-6">
@@ -156,7 +204,7 @@ export default function AssignmentReview() {
                     </CardTitle>
                 </CardHeader>
                 <CardContent>
-                    <div className="mb-6">
+                    <div className="mb-6 flex flex-wrap items-center gap-4">
                         <Select value={filter} onValueChange={setFilter}>
                             <SelectTrigger className="w-48">
                                 <SelectValue placeholder="Фильтр заданий" />
@@ -167,8 +215,33 @@ export default function AssignmentReview() {
                                 <SelectItem value="all">Все развернутые</SelectItem>
                             </SelectContent>
                         </Select>
+                        <Button onClick={handleBulkAIReview} disabled={reviewRunning}>
+                            <Brain className="w-4 h-4 mr-2" />
+                            {reviewRunning ? 'ИИ проверяет ответы...' : 'Проверить все с ИИ'}
+                        </Button>
                     </div>
 
+                    {reviewJob && (
+                        <div className="mb-6 space-y-2">
+                            {reviewRunning ? (
+                                <>
+                                    <div className="text-sm text-gray-600">
+                                        Проверено {reviewJob.done} из {reviewJob.total ?? '…'}
+                                    </div>
+                                    <Progress
+                                        value={reviewJob.total ? (reviewJob.done * 100) / reviewJob.total : 0}
+                                        className="h-2"
+                                    />
+                                </>
+                            ) : (
+                                <div className="text-sm text-gray-600">
+                                    ИИ подготовил оценок: {reviewJob.result?.drafted ?? 0}
+                                    {reviewJob.result?.failed ? `, не удалось проверить: ${reviewJob.result.failed}` : ''}
+                                </div>
+                            )}
+                        </div>
+                    )}
+
                     <div className="grid gap-4">
                         {filteredSubmissions.map(submission => {
                             const assignment = assignments.find(a => a.id === submission.assignment_id);
@@ -180,7 +253,7 @@ export default function AssignmentReview() {
                                     className={`cursor-pointer transition-all duration-200 ${
                                         submission.ai_feedback ? 'border-green-200 bg-green-50' : 'border-orange-200 bg-orange-50 hover:border-orange-300'
                                     }`}
-                                    onClick={() => setSelectedSubmission(submission)}
+                                    onClick={() => selectSubmission(submission)}
                                 >
                                     <CardContent className="p-4">
                                         <div className="flex items-start justify-between">
@@ -212,6 +285,10 @@ export default function AssignmentReview() {
                                                         </div>
                                                         <div className="text-sm text-gray-500">Проверено</div>
                                                     </div>
+                                                ) : getDraft(submission.id) ? (
+                                                    <Badge variant="outline" className="bg-blue-100">
+                                                        Оценка ИИ: {getDraft(submission.id).points_earned}/{assignment.points}
+                                                    </Badge>
                                                 ) : (
                                                     <Badge variant="outline" className="bg-orange-100">
                                                         Требует проверки
@@ -242,7 +319,7 @@ export default function AssignmentReview() {
                                 <MessageSquare className="w-5 h-5" />
                                 Проверка ответа
                             </CardTitle>
-                            <Button variant="outline" onClick={() => setSelectedSubmission(null)}>
+                            <Button variant="outline" onClick={closeReview}>
                                 Закрыть
                             </Button>
                         </div>
@@ -274,9 +351,14 @@ export default function AssignmentReview() {
 
                             <div>
                                 <div className="mb-4">
-                                    <Button onClick={handleAIReview} className="w-full mb-4">
-                                        Получить ИИ-оценку
+                                    <Button onClick={handleAIReview} className="w-full mb-4" disabled={aiReviewing}>
+                                        {aiReviewing ? 'ИИ проверяет ответ...' : 'Получить ИИ-оценку'}
                                     </Button>
+                                    {getDraft(selectedSubmission.id) && (
+                                        <p className="text-sm text-blue-700">
+                                            Оценка подготовлена ИИ: проверьте её, при необходимости исправьте и сохраните.
+                                        </p>
+                                    )}
                                 </div>
 
                                 <div className="mb-4">
@@ -309,6 +391,14 @@ export default function AssignmentReview() {
                                     >
                                         Сохранить оценку
                                     </Button>
+                                    {getDraft(selectedSubmission.id) && (
+                                        <Button
+                                            variant="outline"
+                                            onClick={() => handleRejectDraft(getDraft(selectedSubmission.id))}
+                                        >
+                                            Отклонить оценку ИИ
+                                        </Button>
+                                    )}
                                 </div>
                             </div>
                         </div>
@@ -11,7 +11,33 @@ import { Card, CardContent } from "@/components/ui/card";
 import { Textarea } from "@/components/ui/textarea";
 import { Badge } from "@/components/ui/badge";
 import { CheckCircle2, XCircle, Send, Brain } from "lucide-react";
-import { InvokeLLM } from "@/integrations/Core";
+
+// Статусы заявки на проверку, после которых оценка уже записана
+const FINISHED_STATUSES = ["done", "degraded", "regrading", "failed"];
+// Оценка выставлена без ИИ и будет перепроверена, когда он снова станет доступен
+const PROVISIONAL_STATUSES = ["degraded", "regrading"];
+
+async function requestJson(url, options = {}) {
+  const response = await fetch(url, { credentials: "same-origin", ...options });
+  if (!response.ok) throw new Error(`HTTP ${response.status}`);
+  return response.json();
+}
+
+// Отправляет ответ; развернутые ответы проверяются на сервере, ждём результат проверки
+async function submitAnswer(assignment, userAnswer) {
+  let data = await requestJson("/api/submissions", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ assignment_id: assignment.id, user_answer: userAnswer }),
+  });
+  let ticket = data.ticket;
+  while (ticket && !FINISHED_STATUSES.includes(ticket.status)) {
+    const polled = await requestJson(`/api/grading/${ticket.id}?wait=25`);
+    ticket = polled.ticket;
+    data = { ...data, ...polled };
+  }
+  return { ...data, ticket };
+}
 
 export default function AssignmentModal({ isOpen, assignment, onClose, onComplete }) {
   const [selectedAnswer, setSelectedAnswer] = useState("");
@@ -19,70 +45,37 @@ export default function AssignmentModal({ isOpen, assignment, onClose, onComplet
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [showResult, setShowResult] = useState(false);
   const [result, setResult] = useState(null);
+  const [error, setError] = useState(null);
 
   const handleSubmit = async () => {
     if (!assignment) return;
     
     setIsSubmitting(true);
+    setError(null);
     const userAnswer = assignment.type === 'test' ? selectedAnswer : textAnswer;
-    
-    let isCorrect = false;
-    let pointsEarned = 0;
-    let aiFeedback = "";
 
-    if (assignment.type === 'test') {
-      isCorrect = userAnswer === assignment.correct_answer;
-      pointsEarned = isCorrect ? assignment.points : 0;
-    } else {
-      // Для развернутых ответов используем ИИ для проверки
-      try {
-        const aiResult = await InvokeLLM({
-          prompt: `Проверь ответ ученика на задание по истории/обществознанию.
-          
-          Задание: ${assignment.question}
-          Правильный ответ: ${assignment.correct_answer}
-          Ответ ученика: ${userAnswer}
-          
-          Оцени ответ по критериям:
-          1. Правильность фактов
-          2. Полнота ответа
-          3. Структура изложения
-          
-          Выставь баллы от 0 до ${assignment.points} и дай обратную связь.`,
-          response_json_schema: {
-            type: "object",
-            properties: {
-              is_correct: { type: "boolean" },
-              points_earned: { type: "number" },
-              feedback: { type: "string" }
-            }
-          }
-        });
-        
-        isCorrect = aiResult.is_correct;
-        pointsEarned = aiResult.points_earned;
-        aiFeedback = aiResult.feedback;
-      } catch (error) {
-        // Fallback: простая проверка
-        isCorrect = userAnswer.length > 50;
-        pointsEarned = isCorrect ? Math.floor(assignment.points * 0.7) : 0;
-        aiFeedback = "Проверка выполнена автоматически. Обратитесь к учителю для подробной оценки.";
-      }
+    try {
+      const data = await submitAnswer(assignment, userAnswer);
+      setResult({
+        isCorrect: Boolean(data.progress.is_correct),
+        pending: data.progress.is_correct === null,
+        provisional: PROVISIONAL_STATUSES.includes(data.ticket?.status),
+        pointsEarned: data.progress.points_earned || 0,
+        aiFeedback: data.progress.ai_feedback,
+        userAnswer,
+        user: data.user,
+        topic: data.topic,
+      });
+      setShowResult(true);
+    } catch (err) {
+      console.error("Ошибка отправки ответа:", err);
+      setError("Не удалось отправить ответ. Попробуйте еще раз.");
     }
-
-    setResult({
-      isCorrect,
-      pointsEarned,
-      aiFeedback,
-      userAnswer
-    });
-    
-    setShowResult(true);
     setIsSubmitting(false);
   };
 
   const handleComplete = () => {
-    onComplete(assignment, result.userAnswer, result.isCorrect, result.pointsEarned);
+    onComplete(assignment, result);
     resetModal();
   };
 
@@ -91,6 +84,7 @@ export default function AssignmentModal({ isOpen, assignment, onClose, onComplet
     setTextAnswer("");
     setShowResult(false);
     setResult(null);
+    setError(null);
   };
 
   const handleClose = () => {
@@ -174,6 +168,10 @@ export default function AssignmentModal({ isOpen, assignment, onClose, onComplet
                 </CardContent>
               </Card>
 
+              {error && (
+                <p className="text-sm text-red-600">{error}</p>
+              )}
+
               <div className="flex justify-end gap-3">
                 <Button variant="outline" onClick={handleClose}>
                   Отмена
@@ -219,7 +217,7 @@ export default function AssignmentModal({ isOpen, assignment, onClose, onComplet
                     )}
                     <div>
                       <h3 className="text-xl font-bold">
-                        {result.isCorrect ? 'Правильно!' : 'Неправильно'}
+                        {result.pending ? 'Ответ передан учителю' : result.isCorrect ? 'Правильно!' : 'Неправильно'}
                       </h3>
                       <p className="text-lg">
                         Получено баллов: <span className="font-bold">{result.pointsEarned}</span> из {assignment.points}
@@ -227,6 +225,15 @@ export default function AssignmentModal({ isOpen, assignment, onClose, onComplet
                     </div>
                   </div>
 
+                  {result.provisional && (
+                    <div className="p-4 bg-yellow-50 rounded-lg border border-yellow-200 mb-4">
+                      <p className="text-yellow-800">
+                        Оценка предварительная: ИИ-проверка сейчас недоступна, ответ будет перепроверен
+                        автоматически, и баллы могут измениться.
+                      </p>
+                    </div>
+                  )}
+
                   {result.aiFeedback && (
                     <div className="p-4 bg-white rounded-lg border">
                       <h4 className="font-medium mb-2">Обратная связь:</h4>
@@ -1,10 +1,33 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Input } from '@/components/ui/input';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
-import { Brain, User, Sparkles, Send } from 'lucide-react';
-import { InvokeLLM } from '@/integrations/Core';
+import { Brain, User, Sparkles, Send, Square } from 'lucide-react';
+
+// Разбирает поток Server-Sent Events и вызывает onEvent(name, data) для каждого события
+async function readEvents(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let name = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) name = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      onEvent(name, data ? JSON.parse(data) : {});
+    }
+  }
+}
 
 export default function AIHelperPage() {
   const [messages, setMessages] = useState([
@@ -15,33 +38,65 @@ export default function AIHelperPage() {
   ]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [sessionId, setSessionId] = useState(null);
+  const abortRef = useRef(null);
+
+  useEffect(() => () => abortRef.current?.abort(), []);
+
+  const updateLastMessage = (text) => {
+    setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], text }]);
+  };
 
   const handleSend = async () => {
     if (!input.trim()) return;
 
-    const userMessage = { sender: 'user', text: input };
-    setMessages(prev => [...prev, userMessage]);
+    const question = input;
+    setMessages(prev => [...prev, { sender: 'user', text: question }, { sender: 'ai', text: '', streaming: true }]);
     setInput('');
     setIsLoading(true);
 
+    const controller = new AbortController();
+    abortRef.current = controller;
+    let text = '';
     try {
-      const aiResponse = await InvokeLLM({
-        prompt: `Ты — ИИ-ассистент Clio, эксперт по истории и обществознанию. Отвечай на вопросы учеников дружелюбно, точно и понятно.
-        
-        Вопрос ученика: "${input}"`,
+      const response = await fetch('/api/helper/stream', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ question, session_id: sessionId }),
+        signal: controller.signal,
+      });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      await readEvents(response, (name, data) => {
+        if (name === 'start') {
+          setSessionId(data.session_id);
+        } else if (name === 'delta') {
+          text += data.text;
+          updateLastMessage(text);
+        } else if (name === 'done') {
+          text = data.answer;
+          updateLastMessage(text);
+        } else if (name === 'error') {
+          throw new Error(data.error);
+        }
       });
-      
-      const aiMessage = { sender: 'ai', text: aiResponse };
-      setMessages(prev => [...prev, aiMessage]);
     } catch (error) {
-      const errorMessage = { sender: 'ai', text: 'К сожалению, произошла ошибка. Попробуйте еще раз.' };
-      setMessages(prev => [...prev, errorMessage]);
-      console.error("Ошибка ИИ-помощника:", error);
+      if (error.name !== 'AbortError') {
+        text = text || 'К сожалению, произошла ошибка. Попробуйте еще раз.';
+        updateLastMessage(text);
+        console.error("Ошибка ИИ-помощника:", error);
+      }
     }
-    
+
+    setMessages(prev => [...prev.slice(0, -1), { sender: 'ai', text: text || 'Ответ остановлен.' }]);
+    abortRef.current = null;
     setIsLoading(false);
   };
 
+  const handleStop = () => {
+    abortRef.current?.abort();
+  };
+
   return (
     <div className="p-6 h-full flex flex-col">
       <Card className="flex-1 flex flex-col shadow-lg">
@@ -53,7 +108,7 @@ export default function AIHelperPage() {
         </CardHeader>
         <CardContent className="flex-1 overflow-y-auto p-4 space-y-4">
           <AnimatePresence>
-            {messages.map((msg, index) => (
+            {messages.filter(msg => msg.text).map((msg, index) => (
               <motion.div
                 key={index}
                 initial={{ opacity: 0, y: 10 }}
@@ -83,7 +138,7 @@ export default function AIHelperPage() {
                 )}
               </motion.div>
             ))}
-            {isLoading && (
+            {isLoading && !messages[messages.length - 1].text && (
               <motion.div
                 initial={{ opacity: 0, y: 10 }}
                 animate={{ opacity: 1, y: 0 }}
@@ -112,9 +167,15 @@ export default function AIHelperPage() {
               placeholder="Спросите что-нибудь о Древнем Риме..."
               disabled={isLoading}
             />
-            <Button onClick={handleSend} disabled={isLoading}>
-              <Send className="w-4 h-4" />
-            </Button>
+            {isLoading ? (
+              <Button onClick={handleStop} variant="outline">
+                <Square className="w-4 h-4" />
+              </Button>
+            ) : (
+              <Button onClick={handleSend} disabled={!input.trim()}>
+                <Send className="w-4 h-4" />
+              </Button>
+            )}
           </div>
         </div>
       </Card>
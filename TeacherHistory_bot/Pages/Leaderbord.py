@@ -19,12 +19,11 @@ export default function LeaderboardPage() {
       const userData = await User.me();
       setCurrentUser(userData);
       
-      const allUsers = await User.list('-total_points');
-      const filteredUsers = allUsers.filter(user => 
-        user.total_points > 0 && user.grade
-      ).slice(0, 50);
-      
-      setUsers(filteredUsers);
+      // Список пользователей доступен только учителю, рейтинг отдаёт сервер
+      const response = await fetch('/api/leaderboard?limit=50', { credentials: 'same-origin' });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      const { items } = await response.json();
+      setUsers(items.filter(user => user.total_points > 0 && user.grade));
     } catch (error) {
       console.error("Ошибка загрузки рейтинга:", error);
     }
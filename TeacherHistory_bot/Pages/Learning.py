@@ -1,5 +1,4 @@
 import React, { useState, useEffect } from "react";
-import { Topic, Assignment, UserProgress, User } from "@/entities/all";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
@@ -22,7 +21,8 @@ export default function LearningPage() {
   const [topics, setTopics] = useState([]);
   const [selectedTopic, setSelectedTopic] = useState(null);
   const [assignments, setAssignments] = useState([]);
-  const [userProgress, setUserProgress] = useState([]);
+  const [topicProgress, setTopicProgress] = useState({});
+  const [solvedAssignments, setSolvedAssignments] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showAssignment, setShowAssignment] = useState(false);
   const [selectedAssignment, setSelectedAssignment] = useState(null);
@@ -39,43 +39,50 @@ export default function LearningPage() {
       tg.BackButton.hide(); // Скрываем кнопку назад на главной странице
     }
 
-    const checkAuthAndLoad = async () => {
-      setLoading(true);
-      try {
-        const userData = await User.me();
-        setUser(userData);
-        if (userData.grade) {
-          await loadData(userData);
-        } else {
-          setLoading(false);
-        }
-      } catch (error) {
-        setUser(null);
-        setLoading(false);
-      }
-    };
-    checkAuthAndLoad();
+    setLoading(true);
+    loadData();
   }, []);
 
-  const loadData = async (currentUser) => {
+  // Запросы идут в тот же бэкенд, из которого читает bootstrap
+  const requestJson = async (url, options = {}) => {
+    const response = await fetch(url, {
+      credentials: 'same-origin',
+      ...options,
+      headers: { 'Content-Type': 'application/json', ...options.headers },
+    });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    return response.json();
+  };
+
+  // Пользователь, темы его класса и прогресс по темам — одним запросом
+  const loadData = async () => {
     try {
-      const topicsData = await Topic.filter({ grade: currentUser.grade }, 'order_index');
-      setTopics(topicsData);
-      
-      const progressData = await UserProgress.filter({ created_by: currentUser.email });
-      setUserProgress(progressData);
+      const response = await fetch('/api/learning/bootstrap', { credentials: 'same-origin' });
+      if (response.status === 401) {
+        setUser(null);
+      } else {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+        setUser(data.user);
+        setTopics(data.topics);
+        setTopicProgress(data.progress);
+        setSolvedAssignments(data.solved_assignments);
+      }
     } catch (error) {
       console.error("Ошибка загрузки данных:", error);
+      setUser(user => user === undefined ? null : user);
     }
     setLoading(false);
   };
 
   const handleGradeSelect = async (grade) => {
     setLoading(true);
-    await User.updateMyUserData({ grade });
-    const updatedUser = await User.me();
-    setUser(updatedUser);
-    await loadData(updatedUser);
+    try {
+      await requestJson('/api/auth/me', { method: 'PUT', body: JSON.stringify({ grade }) });
+    } catch (error) {
+      console.error("Ошибка сохранения класса:", error);
+    }
+    await loadData();
 
     // Уведомляем Telegram о достижении
     if (window.Telegram?.WebApp) {
@@ -85,7 +92,10 @@ export default function LearningPage() {
 
   const handleTopicSelect = async (topic) => {
     setSelectedTopic(topic);
-    const topicAssignments = await Assignment.filter({ topic_id: topic.id });
+    const topicAssignments = await requestJson('/api/entities/Assignment/filter', {
+      method: 'POST',
+      body: JSON.stringify({ query: { topic_id: topic.id } }),
+    });
     setAssignments(topicAssignments);
 
     // Показываем кнопку "Назад" в Telegram
@@ -104,41 +114,32 @@ export default function LearningPage() {
     setShowAssignment(true);
   };
 
-  const handleAssignmentComplete = async (assignment, userAnswer, isCorrect, pointsEarned) => {
-    await UserProgress.create({
-      topic_id: selectedTopic.id,
-      assignment_id: assignment.id,
-      user_answer: userAnswer,
-      is_correct: isCorrect,
-      points_earned: pointsEarned
-    });
-
-    const newTotalPoints = (user.total_points || 0) + pointsEarned;
-    await User.updateMyUserData({ 
-      total_points: newTotalPoints,
-      level: Math.floor(newTotalPoints / 100) + 1
-    });
+  // Ответ уже записан и оценён сервером; обновляем состояние страницы из ответа без перезагрузки
+  const handleAssignmentComplete = (assignment, result) => {
+    if (result.user) {
+      setUser(prev => ({ ...prev, total_points: result.user.total_points, level: result.user.level }));
+    }
+    if (result.topic) {
+      setTopicProgress(prev => ({ ...prev, [result.topic.topic_id]: result.topic }));
+    }
+    if (result.isCorrect) {
+      setSolvedAssignments(prev => prev.includes(assignment.id) ? prev : [...prev, assignment.id]);
+    }
 
     // Показываем достижение в Telegram
-    if (window.Telegram?.WebApp && isCorrect) {
-      window.Telegram.WebApp.showAlert(`🎉 Правильно! +${pointsEarned} баллов`);
+    if (window.Telegram?.WebApp && result.isCorrect) {
+      window.Telegram.WebApp.showAlert(`🎉 Правильно! +${result.pointsEarned} баллов`);
     }
 
     setShowAssignment(false);
-    loadData(user);
   };
 
   const isTopicCompleted = (topicId) => {
-    return userProgress.some(p => p.topic_id === topicId && p.is_correct);
+    return Boolean(topicProgress[topicId]?.completed);
   };
 
   const getTopicProgress = (topicId) => {
-    const topicAssignments = assignments.filter(a => a.topic_id === topicId);
-    const completedAssignments = userProgress.filter(p => 
-      p.topic_id === topicId && p.is_correct
-    );
-    return topicAssignments.length > 0 ? 
-      (completedAssignments.length / topicAssignments.length) * 100 : 0;
+    return topicProgress[topicId]?.percentage || 0;
   };
 
   if (loading || user === undefined) {
@@ -282,9 +283,7 @@ export default function LearningPage() {
                   </CardHeader>
                   <CardContent className="space-y-3">
                     {assignments.map((assignment) => {
-                      const isCompleted = userProgress.some(p => 
-                        p.assignment_id === assignment.id && p.is_correct
-                      );
+                      const isCompleted = solvedAssignments.includes(assignment.id);
                       
                       return (
                         <div
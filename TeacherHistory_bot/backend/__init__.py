@@ -0,0 +1,49 @@
+"""Clio backend: a Flask service replacing the hosted entity SDK.
+
+Run locally with ``flask --app backend run``; in production the Procfile
+starts it under gunicorn with threaded workers (``GUNICORN_THREADS`` per
+process), since helper streams and grading waits hold a worker for their
+whole duration.
+"""
+
+from flask import Flask
+
+from .config import Config
+from .errors import register_error_handlers
+from .extensions import db, login_manager
+
+
+def create_app(config: dict | None = None) -> Flask:
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    app.json.ensure_ascii = app.config["JSON_AS_ASCII"]
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    register_error_handlers(app)
+
+    from . import auth  # noqa: F401  registers the login_manager loaders
+    from . import (
+        batch, catalog, course, entities, grading, helper, jobs, leaderboard, learning, llm, progress, review,
+        stats, submissions, topic_progress, users,
+    )
+
+    jobs.runner.init_app(app)
+    catalog.init_app(app)
+    llm.init_app(app)
+    helper.init_app(app)
+    grading.queue.init_app(app)
+    blueprints = (entities, batch, learning, progress, stats, leaderboard, submissions, grading, review, helper,
+                  jobs, users, course)
+    for module in blueprints:
+        app.register_blueprint(module.bp)
+    app.cli.add_command(topic_progress.rebuild_command)
+
+    with app.app_context():
+        db.create_all()
+        jobs.runner.recover()
+        grading.queue.recover()
+
+    return app
@@ -0,0 +1,53 @@
+"""Request authentication.
+
+The API sits behind the login proxy, which authenticates the Telegram / web
+session and forwards the user's e-mail in ``AUTH_EMAIL_HEADER``.  The first
+request from a new e-mail provisions the ``User`` row, as the hosted platform
+did.
+"""
+
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_login import current_user, login_required
+
+from .errors import ApiError
+from .extensions import db, login_manager
+from .models import User
+
+__all__ = ["admin_required", "current_user", "login_required"]
+
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    email = request.headers.get(current_app.config["AUTH_EMAIL_HEADER"], "").strip().lower()
+    if not email:
+        return None
+    user = db.session.scalar(sa.select(User).where(User.email == email))
+    if user is None:
+        user = User(email=email, created_by=email)
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return db.session.get(User, user_id)
+
+
+@login_manager.unauthorized_handler
+def unauthorized():
+    raise ApiError("authentication required", 401)
+
+
+def admin_required(view):
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not current_user.is_admin:
+            raise ApiError("admin role required", 403)
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,96 @@
+"""Batched entity queries: several list/filter/get calls in one HTTP request.
+
+``POST /api/batch`` takes ``{"queries": {key: spec, ...}}`` where a spec is
+``{"entity": "UserProgress", "query": {...}, "sort": "-created_date",
+"limit": 100, "cursor": ..., "fields": [...]}`` or ``{"entity": "Topic",
+"id": "..."}`` for a single record.  Each result is reported under its key as
+``{"status": 200, "body": ...}`` or ``{"status": 4xx, "error": ...}``, so one
+bad query does not fail the others.
+
+With ``Accept: application/x-ndjson`` the results are streamed one line per
+query as they finish.  On PostgreSQL the queries run in parallel, each on its
+own pooled connection; on SQLite, or with ``BATCH_WORKERS=1``, they run one
+after another in the request's session.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from .auth import login_required
+from .entities import get_model, get_readable, run_page, run_query
+from .errors import ApiError
+from .extensions import db
+from .query import parse_fields
+
+bp = Blueprint("batch", __name__, url_prefix="/api")
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config["BATCH_WORKERS"], thread_name_prefix="clio-batch"
+        )
+    return _executor
+
+
+def execute(spec) -> dict:
+    """Run one query spec and wrap the outcome."""
+    try:
+        if not isinstance(spec, dict):
+            raise ApiError("query spec must be an object")
+        if not isinstance(spec.get("entity"), str):
+            raise ApiError("entity must be a string")
+        model = get_model(spec["entity"])
+        if spec.get("id"):
+            record = get_readable(model, spec["id"])
+            body = record.to_dict(parse_fields(model, spec.get("fields")))
+        elif "cursor" in spec:
+            body = run_page(model, spec.get("query"), spec.get("sort"), spec.get("limit"),
+                            spec["cursor"] or "", spec.get("fields"))
+        else:
+            body = run_query(model, spec.get("query"), spec.get("sort"), spec.get("limit"), spec.get("fields"))
+        return {"status": 200, "body": body}
+    except ApiError as exc:
+        return {"status": exc.status_code, "error": exc.message}
+
+
+def _execute_in_context(app, spec) -> dict:
+    with app.app_context():
+        return execute(spec)
+
+
+def run_batch(queries: dict):
+    """Yield ``(key, result)`` pairs as the queries complete."""
+    parallel = current_app.config["BATCH_WORKERS"] > 1 and db.engine.dialect.name != "sqlite"
+    if not parallel or len(queries) == 1:
+        for key, spec in queries.items():
+            yield key, execute(spec)
+        return
+    app = current_app._get_current_object()
+    futures = {_pool().submit(_execute_in_context, app, spec): key for key, spec in queries.items()}
+    for future in as_completed(futures):
+        yield futures[future], future.result()
+
+
+@bp.post("/batch")
+@login_required
+def batch():
+    body = request.get_json(silent=True) or {}
+    queries = body.get("queries")
+    if not isinstance(queries, dict) or not queries:
+        raise ApiError("queries must be a non-empty object")
+    if len(queries) > current_app.config["BATCH_MAX_QUERIES"]:
+        raise ApiError(f"at most {current_app.config['BATCH_MAX_QUERIES']} queries per batch")
+
+    if request.accept_mimetypes.best == "application/x-ndjson":
+        def lines():
+            for key, result in run_batch(queries):
+                yield json.dumps({"key": key, **result}, ensure_ascii=False, default=str) + "\n"
+
+        return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+    return jsonify(dict(run_batch(queries)))
@@ -0,0 +1,232 @@
+"""In-process caching primitives: an LRU+TTL map, single-flight call collapsing and a similarity cache."""
+
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait and receive the same result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error: BaseException | None = None
+            self.waiters = 0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                call.waiters += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class TTLCache:
+    """Thread-safe LRU map whose entries also expire ``ttl`` seconds after they were stored.
+
+    :meth:`get_or_load` fills misses through a :class:`SingleFlight`, and a fill
+    that started before :meth:`clear` is not stored, so an invalidation cannot
+    be undone by a slow loader finishing afterwards.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._flight = SingleFlight()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING or entry[0] <= self._clock():
+                if entry is not self._MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation: int | None = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        value = self.get(key, self._MISSING)
+        if value is not self._MISSING:
+            return value
+
+        def fill():
+            generation = self._generation
+            loaded = loader()
+            self.set(key, loaded, generation)
+            return loaded
+
+        return self._flight.do(key, fill)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticCache:
+    """Answers to previously asked questions, found by TF-IDF cosine similarity.
+
+    Entries are partitioned by ``scope`` (a lookup only sees its own scope),
+    expire ``ttl`` seconds after they were stored, and each scope keeps at most
+    ``maxsize`` of them, dropping the oldest.  An inverted index limits scoring
+    to entries that share at least one term with the question; IDF weights are
+    kept per scope and follow additions and removals.
+    """
+
+    class _Entry:
+        __slots__ = ("id", "terms", "value", "expires")
+
+        def __init__(self, id_, terms: Counter, value, expires: float):
+            self.id = id_
+            self.terms = terms
+            self.value = value
+            self.expires = expires
+
+    class _Scope:
+        def __init__(self):
+            self.entries: OrderedDict = OrderedDict()
+            self.postings: dict = defaultdict(set)
+            self.df: Counter = Counter()
+
+    def __init__(self, tokenize, threshold: float = 0.85, ttl: float = 86400.0, maxsize: int = 2000,
+                 clock=time.monotonic):
+        self.tokenize = tokenize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._scopes: dict = defaultdict(self._Scope)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = self.misses = 0
+
+    def _weights(self, scope: "_Scope", terms: Counter) -> dict:
+        n = len(scope.entries) + 1
+        return {t: (1 + math.log(tf)) * math.log(1 + n / (1 + scope.df[t])) for t, tf in terms.items()}
+
+    @staticmethod
+    def _cosine(a: dict, b: dict) -> float:
+        dot = sum(w * b.get(t, 0.0) for t, w in a.items())
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0.0
+
+    def _remove(self, scope: "_Scope", entry: "_Entry") -> None:
+        del scope.entries[entry.id]
+        for term in entry.terms:
+            scope.postings[term].discard(entry.id)
+            if not scope.postings[term]:
+                del scope.postings[term]
+            scope.df[term] -= 1
+            if scope.df[term] <= 0:
+                del scope.df[term]
+
+    def _expire(self, scope: "_Scope") -> None:
+        now = self._clock()
+        while scope.entries:
+            oldest = next(iter(scope.entries.values()))
+            if oldest.expires > now and len(scope.entries) <= self.maxsize:
+                break
+            self._remove(scope, oldest)
+
+    def lookup(self, scope_key, text: str):
+        """Return ``(value, similarity)`` of the closest entry above the threshold, or ``None``."""
+        terms = Counter(self.tokenize(text))
+        with self._lock:
+            scope = self._scopes.get(scope_key)
+            if scope is not None:
+                self._expire(scope)
+            if not terms or scope is None:
+                self.misses += 1
+                return None
+            query = self._weights(scope, terms)
+            candidates = set().union(*(scope.postings.get(t, ()) for t in terms))
+            best, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = scope.entries[entry_id]
+                score = self._cosine(query, self._weights(scope, entry.terms))
+                if score > best_score:
+                    best, best_score = entry, score
+            if best is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best.value, best_score
+
+    def add(self, scope_key, text: str, value) -> None:
+        terms = Counter(self.tokenize(text))
+        if not terms:
+            return
+        with self._lock:
+            scope = self._scopes[scope_key]
+            self._next_id += 1
+            entry = self._Entry(self._next_id, terms, value, self._clock() + self.ttl)
+            scope.entries[entry.id] = entry
+            for term in terms:
+                scope.postings[term].add(entry.id)
+                scope.df[term] += 1
+            self._expire(scope)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+
+    def __len__(self) -> int:
+        return sum(len(scope.entries) for scope in self._scopes.values())
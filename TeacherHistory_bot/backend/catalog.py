@@ -0,0 +1,57 @@
+"""Topic catalog cache.
+
+Topics change only when an admin edits them, yet every student opening
+Learning or Premium asks for them.  Lists are cached per (grade, subject,
+is_premium) with LRU+TTL eviction.  Keys also carry the Topic collection
+version (see :mod:`backend.versions`), which every Topic write bumps, so a
+write made by any worker is a miss here on the next request and a list never
+goes out with an ETag newer than its content.  Every Topic write in this
+worker also clears the cache.  Concurrent misses for the same key share one
+database query.
+"""
+
+import sqlalchemy as sa
+from flask import Flask
+
+from . import versions
+from .cache import TTLCache
+from .extensions import db
+from .models import Topic
+
+# Topic filters the catalog can answer; anything else goes to the database.
+CATALOG_FIELDS = ("grade", "subject", "is_premium")
+CATALOG_SORTS = (None, "", "order_index")
+
+cache = TTLCache()
+
+
+def init_app(app: Flask) -> None:
+    cache.maxsize = app.config["TOPIC_CACHE_SIZE"]
+    cache.ttl = app.config["TOPIC_CACHE_TTL"]
+
+
+def _load(grade, subject, is_premium) -> list[dict]:
+    stmt = sa.select(Topic).order_by(Topic.order_index.asc().nulls_last(), Topic.id)
+    for field, value in zip(CATALOG_FIELDS, (grade, subject, is_premium)):
+        if value is not None:
+            stmt = stmt.where(getattr(Topic, field) == value)
+    return [topic.to_dict() for topic in db.session.scalars(stmt)]
+
+
+def topics(grade=None, subject=None, is_premium=None) -> list[dict]:
+    """Topics matching the given filters (``None`` = any), in ``order_index`` order."""
+    key = (versions.current("Topic"), grade, subject, is_premium)
+    return cache.get_or_load(key, lambda: _load(*key[1:]))
+
+
+def can_serve(criteria, sort, cursor) -> bool:
+    if cursor is not None or sort not in CATALOG_SORTS:
+        return False
+    criteria = criteria or {}
+    return isinstance(criteria, dict) and all(
+        field in CATALOG_FIELDS and isinstance(value, (int, str, bool)) for field, value in criteria.items()
+    )
+
+
+def invalidate() -> None:
+    cache.clear()
@@ -0,0 +1,70 @@
+"""Runtime configuration for the Clio backend, read from the environment."""
+
+import os
+
+
+def _database_url() -> str:
+    url = os.environ.get("DATABASE_URL", "sqlite:///clio.db")
+    # Heroku-style URLs still use the scheme SQLAlchemy dropped in 1.4.
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True}
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev")
+    JSON_AS_ASCII = False
+
+    # Header set by the auth proxy in front of the API (Telegram / Base44 login).
+    AUTH_EMAIL_HEADER = os.environ.get("AUTH_EMAIL_HEADER", "X-User-Email")
+    DEFAULT_LIST_LIMIT = int(os.environ.get("DEFAULT_LIST_LIMIT", "500"))
+    MAX_LIST_LIMIT = int(os.environ.get("MAX_LIST_LIMIT", "5000"))
+    BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "4"))
+    BATCH_MAX_QUERIES = int(os.environ.get("BATCH_MAX_QUERIES", "10"))
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+    JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+    JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "1800"))
+    JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "1"))
+    DELETE_BATCH_SIZE = int(os.environ.get("DELETE_BATCH_SIZE", "1000"))
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "500"))
+    TOPIC_CACHE_SIZE = int(os.environ.get("TOPIC_CACHE_SIZE", "256"))
+    TOPIC_CACHE_TTL = float(os.environ.get("TOPIC_CACHE_TTL", "300"))
+    LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "http" if os.environ.get("LLM_API_URL") else "fake")
+    LLM_API_URL = os.environ.get("LLM_API_URL", "")
+    LLM_API_KEY = os.environ.get("LLM_API_KEY")
+    LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
+    LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "40"))
+    LLM_FAKE_LATENCY = float(os.environ.get("LLM_FAKE_LATENCY", "0"))
+    LLM_FAKE_TOKEN_DELAY = float(os.environ.get("LLM_FAKE_TOKEN_DELAY", "0"))
+    LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+    LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF", "0.5"))
+    # Token-bucket rate (calls/s) and burst, concurrency share and optional per-user limits per feature.
+    LLM_FEATURES = {
+        "grading": {"rate": 10.0, "burst": 50, "concurrency": 12},
+        "review": {"rate": 5.0, "burst": 20, "concurrency": 8},
+        "helper": {"rate": 5.0, "burst": 20, "concurrency": 6, "user_rate": 0.1, "user_burst": 5},
+    }
+    LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+    GRADING_DEADLINE_SECONDS = int(os.environ.get("GRADING_DEADLINE_SECONDS", "180"))
+    HELPER_DEADLINE_SECONDS = int(os.environ.get("HELPER_DEADLINE_SECONDS", "60"))
+    GRADING_WORKERS = int(os.environ.get("GRADING_WORKERS", "4"))
+    GRADING_STALE_SECONDS = int(os.environ.get("GRADING_STALE_SECONDS", "300"))
+    REGRADE_INTERVAL_SECONDS = int(os.environ.get("REGRADE_INTERVAL_SECONDS", "60"))
+    GRADE_CACHE_TTL_DAYS = int(os.environ.get("GRADE_CACHE_TTL_DAYS", "30"))
+    GRADE_CACHE_MAX_ENTRIES = int(os.environ.get("GRADE_CACHE_MAX_ENTRIES", "100000"))
+    HELPER_CACHE_THRESHOLD = float(os.environ.get("HELPER_CACHE_THRESHOLD", "0.85"))
+    HELPER_CACHE_TTL = float(os.environ.get("HELPER_CACHE_TTL", str(7 * 24 * 3600)))
+    HELPER_CACHE_SIZE = int(os.environ.get("HELPER_CACHE_SIZE", "2000"))
+    HELPER_HISTORY_TOKENS = int(os.environ.get("HELPER_HISTORY_TOKENS", "600"))
+    HELPER_SUMMARY_TOKENS = int(os.environ.get("HELPER_SUMMARY_TOKENS", "200"))
+    HELPER_SESSION_IDLE_SECONDS = int(os.environ.get("HELPER_SESSION_IDLE_SECONDS", str(7 * 24 * 3600)))
+    RETRIEVAL_CHUNK_TOKENS = int(os.environ.get("RETRIEVAL_CHUNK_TOKENS", "200"))
+    RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "4"))
+    RETRIEVAL_TOKEN_BUDGET = int(os.environ.get("RETRIEVAL_TOKEN_BUDGET", "800"))
+    RETRIEVAL_RESYNC_SECONDS = int(os.environ.get("RETRIEVAL_RESYNC_SECONDS", "600"))
+    REVIEW_WORKERS = int(os.environ.get("REVIEW_WORKERS", "8"))
+    LEADERBOARD_RESYNC_SECONDS = int(os.environ.get("LEADERBOARD_RESYNC_SECONDS", "300"))
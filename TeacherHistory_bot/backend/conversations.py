@@ -0,0 +1,150 @@
+"""Server-side memory for AI helper conversations.
+
+Every turn is stored, but a prompt only carries the session's summary and the
+most recent messages.  When the unsummarized messages exceed
+``HELPER_HISTORY_TOKENS`` the oldest of them are folded into the summary
+(one LLM call, capped at ``HELPER_SUMMARY_TOKENS``) until the window is back to
+half the budget, so the prompt size, and with it the cost of a turn, stays
+flat however long the conversation runs.  If the LLM is unavailable the
+summary is extended by clipping the folded messages instead.
+
+Sessions belong to one user and are deleted after ``HELPER_SESSION_IDLE_SECONDS``
+without activity.
+"""
+
+from datetime import timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import llm
+from .errors import NotFound
+from .extensions import db
+from .models import HelperMessage, HelperSession, utcnow
+from .text import estimate_tokens
+
+ROLE_LABELS = {"user": "Ученик", "assistant": "Clio"}
+
+
+def get_session(user_id: str, session_id: str | None) -> HelperSession:
+    """The user's session ``session_id``, or a new one when it is not given."""
+    if not session_id:
+        evict_idle()
+        session = HelperSession(user_id=user_id)
+        db.session.add(session)
+        db.session.flush()
+        return session
+    session = db.session.get(HelperSession, session_id)
+    if session is None or session.user_id != user_id:
+        raise NotFound("helper session not found")
+    return session
+
+
+def append(session: HelperSession, role: str, text: str) -> HelperMessage:
+    """Add a message under the session's next ``seq``.
+
+    The number is taken with an atomic ``UPDATE``, which also keeps the session
+    row locked until the transaction ends, so concurrent turns in one session
+    get consecutive numbers instead of colliding on ``(session_id, seq)``.
+    """
+    db.session.execute(
+        sa.update(HelperSession)
+        .where(HelperSession.id == session.id)
+        .values(last_seq=HelperSession.last_seq + 1, updated_date=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    seq = db.session.scalar(sa.select(HelperSession.last_seq).where(HelperSession.id == session.id))
+    set_committed_value(session, "last_seq", seq)
+    message = HelperMessage(session_id=session.id, seq=seq, role=role, text=text)
+    db.session.add(message)
+    return message
+
+
+def window(session: HelperSession) -> list[HelperMessage]:
+    """Messages not yet folded into the summary, oldest first."""
+    return list(db.session.scalars(
+        sa.select(HelperMessage)
+        .where(HelperMessage.session_id == session.id, HelperMessage.seq > session.summarized_seq)
+        .order_by(HelperMessage.seq)
+    ))
+
+
+def transcript(session: HelperSession) -> list[HelperMessage]:
+    return list(db.session.scalars(
+        sa.select(HelperMessage).where(HelperMessage.session_id == session.id).order_by(HelperMessage.seq)
+    ))
+
+
+def format_messages(messages) -> str:
+    return "\n".join(f"{ROLE_LABELS.get(m.role, m.role)}: {m.text}" for m in messages)
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    limit = max_tokens * 3
+    return text if len(text) <= limit else "…" + text[-limit:]
+
+
+def _summarize(previous: str, messages, max_tokens: int) -> str:
+    prompt = (
+        "Обнови краткое содержание разговора ученика с ИИ-помощником по истории и обществознанию. "
+        f"Сохрани темы, факты и вопросы ученика, не длиннее {max_tokens * 2} символов.\n\n"
+        f"Текущее содержание:\n{previous or '(пусто)'}\n\n"
+        f"Новые сообщения:\n{format_messages(messages)}"
+    )
+    try:
+        summary = llm.get_gateway().complete(prompt, feature="helper")
+    except llm.LLMError:
+        summary = f"{previous}\n{format_messages(messages)}".strip()
+    return _clip(summary.strip(), max_tokens)
+
+
+def compact(session: HelperSession) -> int:
+    """Fold the oldest messages into the summary if the window is over budget.
+
+    Returns the number of messages folded.
+    """
+    budget = current_app.config["HELPER_HISTORY_TOKENS"]
+    messages = window(session)
+    sizes = [estimate_tokens(m.text) for m in messages]
+    total = sum(sizes)
+    if total <= budget:
+        return 0
+    folded = 0
+    while folded < len(messages) - 1 and total > budget // 2:
+        total -= sizes[folded]
+        folded += 1
+    older = messages[:folded]
+    db.session.commit()  # do not hold a transaction open across the LLM call
+    session.summary = _summarize(session.summary, older, current_app.config["HELPER_SUMMARY_TOKENS"])
+    session.summarized_seq = older[-1].seq
+    return folded
+
+
+def history_prompt(session: HelperSession) -> str:
+    """The conversation so far, as it goes into the prompt."""
+    parts = []
+    if session.summary:
+        parts.append(f"Краткое содержание разговора:\n{session.summary}")
+    recent = window(session)
+    if recent:
+        parts.append(f"Последние сообщения:\n{format_messages(recent)}")
+    return "\n\n".join(parts)
+
+
+def evict_idle() -> int:
+    cutoff = utcnow() - timedelta(seconds=current_app.config["HELPER_SESSION_IDLE_SECONDS"])
+    idle = sa.select(HelperSession.id).where(HelperSession.updated_date < cutoff)
+    db.session.execute(sa.delete(HelperMessage).where(HelperMessage.session_id.in_(idle)))
+    return db.session.execute(sa.delete(HelperSession).where(HelperSession.updated_date < cutoff)).rowcount
+
+
+def delete(session: HelperSession) -> None:
+    db.session.execute(sa.delete(HelperMessage).where(HelperMessage.session_id == session.id))
+    db.session.delete(session)
+
+
+def delete_for_user(user_id: str) -> None:
+    sessions = sa.select(HelperSession.id).where(HelperSession.user_id == user_id)
+    db.session.execute(sa.delete(HelperMessage).where(HelperMessage.session_id.in_(sessions)))
+    db.session.execute(sa.delete(HelperSession).where(HelperSession.user_id == user_id))
@@ -0,0 +1,369 @@
+"""Bulk course import and streaming export.
+
+A course package is either JSON::
+
+    {"topics": [{"title": ..., "grade": 8, ..., "assignments": [{...}, ...]}],
+     "assignments": [{"topic_title": ..., "title": ..., ...}]}
+
+or CSV files uploaded as the ``topics`` and ``assignments`` form fields, one row
+per record with the entity's field names as headers (arrays such as
+``options`` are ``|``-separated).  Assignments point at their topic by nesting,
+by ``topic_id``, by ``topic_title`` or by ``topic_order`` (the topic's
+``order_index``); ``topic_grade``/``topic_subject`` narrow the lookup.
+
+Topics are matched to existing ones by (grade, subject, title) and assignments
+by (topic, title): matches are updated, the rest created.  A ``topic_id`` that
+is not known here (say, from another database's export) gives way to the other
+references, so ``GET /api/course/export``, which writes ``topic_title``,
+``topic_grade`` and ``topic_subject`` next to every assignment's ``topic_id``,
+imports anywhere.  Every row is validated against ``Entities/*.json`` before
+anything is written, the whole import is one transaction, and ``?dry_run=1``
+returns the diff without writing.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+
+import sqlalchemy as sa
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from . import catalog, grade_cache, retrieval, versions
+from .auth import admin_required, current_user
+from .errors import ApiError
+from .extensions import db
+from .models import Assignment, Topic, new_id, utcnow
+from .schema import validate
+from .topic_progress import refresh_totals
+
+bp = Blueprint("course", __name__, url_prefix="/api/course")
+
+TOPIC_REFS = ("topic_title", "topic_order", "topic_grade", "topic_subject")
+TRUE_WORDS = {"1", "true", "yes", "да", "y"}
+FALSE_WORDS = {"0", "false", "no", "нет", "n"}
+
+
+class ImportErrors(ApiError):
+    def __init__(self, errors: list[str]):
+        super().__init__(f"{len(errors)} invalid rows")
+        self.errors = errors
+
+
+# -- parsing ------------------------------------------------------------------
+
+
+def _coerce_cell(spec: dict, raw: str):
+    kind = spec.get("type")
+    if kind == "integer":
+        return int(raw)
+    if kind == "number":
+        return float(raw)
+    if kind == "boolean":
+        word = raw.strip().lower()
+        if word in TRUE_WORDS:
+            return True
+        if word in FALSE_WORDS:
+            return False
+        raise ValueError(f"not a boolean: {raw!r}")
+    if kind == "array":
+        return json.loads(raw) if raw.lstrip().startswith("[") else [p.strip() for p in raw.split("|")]
+    return raw
+
+
+def parse_csv(text: str, schema: dict, label: str) -> list[tuple[str, dict]]:
+    properties = schema["properties"]
+    rows = []
+    for line, record in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+        where = f"{label}:{line}"
+        row = {}
+        for field, raw in record.items():
+            if field is None or raw is None or raw == "":
+                continue
+            field = field.strip()
+            if field in TOPIC_REFS:
+                row[field] = int(raw) if field in ("topic_order", "topic_grade") and raw.isdigit() else raw
+                continue
+            try:
+                row[field] = _coerce_cell(properties.get(field, {}), raw)
+            except ValueError as exc:
+                raise ImportErrors([f"{where}: {field}: {exc}"]) from None
+        rows.append((where, row))
+    return rows
+
+
+def read_package() -> tuple[list, list]:
+    """Return ``(topic_rows, assignment_rows)`` as ``(location, data)`` pairs.
+
+    Nested assignments carry their parent topic's location in ``_parent``.
+    """
+    if request.files:
+        topics = request.files.get("topics")
+        assignments = request.files.get("assignments")
+        topic_rows = parse_csv(topics.read().decode("utf-8-sig"), Topic.entity_schema, "topics.csv") if topics else []
+        assignment_rows = (
+            parse_csv(assignments.read().decode("utf-8-sig"), Assignment.entity_schema, "assignments.csv")
+            if assignments else []
+        )
+        return topic_rows, assignment_rows
+
+    package = request.get_json(silent=True)
+    if not isinstance(package, dict):
+        raise ApiError("expected a JSON course package or CSV files")
+    topic_rows, assignment_rows = [], []
+    for i, topic in enumerate(package.get("topics") or []):
+        where = f"topics[{i}]"
+        topic = dict(topic)
+        for j, assignment in enumerate(topic.pop("assignments", None) or []):
+            assignment_rows.append((f"{where}.assignments[{j}]", {**assignment, "_parent": where}))
+        topic_rows.append((where, topic))
+    for i, assignment in enumerate(package.get("assignments") or []):
+        assignment_rows.append((f"assignments[{i}]", dict(assignment)))
+    return topic_rows, assignment_rows
+
+
+# -- planning -----------------------------------------------------------------
+
+
+def _diff(record, data: dict) -> list[str]:
+    return [field for field, value in data.items() if getattr(record, field) != value]
+
+
+class Plan:
+    """What an import would do, computed without writing anything."""
+
+    def __init__(self):
+        self.creates = defaultdict(list)
+        self.updates = defaultdict(list)
+        self.unchanged = defaultdict(int)
+        self.changes = []
+        self.errors = []
+
+    def create(self, entity: str, where: str, data: dict) -> None:
+        self.creates[entity].append(data)
+        self.changes.append({"entity": entity, "action": "create", "row": where, "title": data.get("title")})
+
+    def update(self, entity: str, where: str, record, data: dict) -> None:
+        changed = _diff(record, data)
+        if not changed:
+            self.unchanged[entity] += 1
+            return
+        self.updates[entity].append({"id": record.id, **{f: data[f] for f in changed}})
+        self.changes.append({
+            "entity": entity, "action": "update", "row": where, "id": record.id,
+            "title": record.title, "fields": changed,
+        })
+
+    def summary(self) -> dict:
+        return {
+            entity: {
+                "create": len(self.creates[entity]),
+                "update": len(self.updates[entity]),
+                "unchanged": self.unchanged[entity],
+            }
+            for entity in ("Topic", "Assignment")
+        }
+
+
+def _topic_key(data: dict) -> tuple:
+    return (data.get("grade"), data.get("subject"), data.get("title"))
+
+
+def plan_import(topic_rows, assignment_rows) -> Plan:
+    plan = Plan()
+    grades = {row.get("grade") for _, row in topic_rows}
+    grades |= {row["topic_grade"] for _, row in assignment_rows if row.get("topic_grade")}
+    ids = {row["topic_id"] for _, row in assignment_rows if row.get("topic_id")}
+    # Only load the grades the package touches, unless an assignment looks its
+    # topic up by title or order without saying which grade it is in.
+    unscoped = any(
+        not (row.get("topic_grade") or row.get("topic_id") or "_parent" in row)
+        for _, row in assignment_rows
+    )
+    scope = sa.true() if unscoped else sa.or_(Topic.grade.in_(grades - {None}), Topic.id.in_(ids))
+    existing_topics = db.session.scalars(sa.select(Topic).where(scope)).all()
+    by_key = {_topic_key(t.to_dict()): t for t in existing_topics}
+
+    # Topics known to this import, by id, including ones not yet created.
+    topics = {t.id: t.to_dict(["id", "title", "grade", "subject", "order_index"]) for t in existing_topics}
+    location_ids = {}
+    for where, row in topic_rows:
+        try:
+            data = validate(Topic.entity_schema, row)
+        except ApiError as exc:
+            plan.errors.append(f"{where}: {exc.message}")
+            continue
+        record = by_key.get(_topic_key(data))
+        if record is not None:
+            plan.update("Topic", where, record, data)
+            topic_id = record.id
+        else:
+            topic_id = new_id()
+            plan.create("Topic", where, {"id": topic_id, **data})
+        topics[topic_id] = {"id": topic_id, **data}
+        location_ids[where] = topic_id
+
+    resolved = []
+    for where, row in assignment_rows:
+        row = dict(row)
+        refs = {name: row.pop(name) for name in (*TOPIC_REFS, "_parent") if name in row}
+        try:
+            row["topic_id"] = _resolve_topic(row.get("topic_id"), refs, topics, location_ids)
+            resolved.append((where, validate(Assignment.entity_schema, row)))
+        except ApiError as exc:
+            plan.errors.append(f"{where}: {exc.message}")
+
+    topic_ids = {data["topic_id"] for _, data in resolved}
+    existing_assignments = {
+        (a.topic_id, a.title): a
+        for a in db.session.scalars(sa.select(Assignment).where(Assignment.topic_id.in_(topic_ids)))
+    }
+    for where, data in resolved:
+        record = existing_assignments.get((data["topic_id"], data["title"]))
+        if record is not None:
+            plan.update("Assignment", where, record, data)
+        else:
+            plan.create("Assignment", where, data)
+    return plan
+
+
+def _resolve_topic(topic_id, refs: dict, topics: dict, location_ids: dict) -> str:
+    if "_parent" in refs:
+        if refs["_parent"] not in location_ids:
+            raise ApiError("parent topic is invalid")
+        return location_ids[refs["_parent"]]
+    if topic_id in topics:
+        return topic_id
+    if topic_id and not ({"topic_title", "topic_order"} & refs.keys()):
+        raise ApiError(f"unknown topic_id {topic_id!r}")
+    candidates = list(topics.values())
+    if "topic_grade" in refs:
+        candidates = [t for t in candidates if t["grade"] == refs["topic_grade"]]
+    if "topic_subject" in refs:
+        candidates = [t for t in candidates if t["subject"] == refs["topic_subject"]]
+    if "topic_title" in refs:
+        candidates = [t for t in candidates if t["title"] == refs["topic_title"]]
+    elif "topic_order" in refs:
+        candidates = [t for t in candidates if t.get("order_index") == refs["topic_order"]]
+    else:
+        raise ApiError("assignment needs topic_id, topic_title or topic_order")
+    if len(candidates) != 1:
+        problem = "no topic matches" if not candidates else f"{len(candidates)} topics match"
+        raise ApiError(f"{problem} {', '.join(f'{k}={v!r}' for k, v in refs.items())}")
+    return candidates[0]["id"]
+
+
+def apply_plan(plan: Plan, owner: str) -> None:
+    """Write the plan with multi-row INSERTs and primary-key bulk UPDATEs."""
+    batch = current_app.config["IMPORT_BATCH_SIZE"]
+    now = utcnow()
+    for model in (Topic, Assignment):
+        name = model.__name__
+        creates = [
+            {"id": new_id(), **row, "created_by": owner, "created_date": now, "updated_date": now}
+            for row in plan.creates[name]
+        ]
+        for start in range(0, len(creates), batch):
+            db.session.execute(sa.insert(model), creates[start:start + batch])
+        updates = [{**row, "updated_date": now} for row in plan.updates[name]]
+        for start in range(0, len(updates), batch):
+            db.session.execute(sa.update(model), updates[start:start + batch])
+    refresh_totals(row["topic_id"] for row in plan.creates["Assignment"])
+    grade_cache.invalidate(row["id"] for row in plan.updates["Assignment"])
+    versions.bump(*(name for name in ("Topic", "Assignment") if plan.creates[name] or plan.updates[name]))
+
+
+@bp.post("/import")
+@admin_required
+def import_course():
+    dry_run = request.args.get("dry_run", "").lower() in TRUE_WORDS
+    try:
+        plan = plan_import(*read_package())
+    except ImportErrors as exc:
+        plan = Plan()
+        plan.errors = exc.errors
+    if plan.errors:
+        return jsonify(error="course package is invalid", errors=plan.errors), 400
+    if not dry_run:
+        try:
+            apply_plan(plan, current_user.email)
+            db.session.commit()
+            catalog.invalidate()
+            retrieval.index.invalidate()
+        except Exception:
+            db.session.rollback()
+            raise
+    return jsonify(dry_run=dry_run, summary=plan.summary(), changes=plan.changes)
+
+
+# -- export -------------------------------------------------------------------
+
+
+EXPORT_TOPIC_REFS = ("topic_title", "topic_grade", "topic_subject")
+
+
+def _export_query(model, grade):
+    if model is Topic:
+        stmt = sa.select(Topic)
+        if grade is not None:
+            stmt = stmt.where(Topic.grade == grade)
+        return stmt.order_by(Topic.grade, Topic.subject, Topic.order_index, Topic.id)
+    stmt = (
+        sa.select(Assignment, Topic.title, Topic.grade, Topic.subject)
+        .outerjoin(Topic, Topic.id == Assignment.topic_id)
+    )
+    if grade is not None:
+        stmt = stmt.where(Topic.grade == grade)
+    return stmt.order_by(Assignment.topic_id, Assignment.id)
+
+
+def _stream(model, grade):
+    """Exported rows; assignments also name their topic, as ids differ between databases."""
+    batch = current_app.config["IMPORT_BATCH_SIZE"]
+    stmt = _export_query(model, grade).execution_options(yield_per=batch)
+    for record, *topic in db.session.execute(stmt):
+        row = record.to_dict()
+        if model is Assignment and topic[0] is not None:
+            row.update(zip(EXPORT_TOPIC_REFS, topic))
+        yield row
+
+
+def _json_export(grade):
+    yield "{"
+    for i, model in enumerate((Topic, Assignment)):
+        yield ("," if i else "") + f'"{model.__tablename__}s":['
+        for j, row in enumerate(_stream(model, grade)):
+            yield ("," if j else "") + json.dumps(row, ensure_ascii=False)
+        yield "]"
+    yield "}"
+
+
+def _csv_export(model, grade):
+    fields = model.field_names() + (list(EXPORT_TOPIC_REFS) if model is Assignment else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for row in _stream(model, grade):
+        writer.writerow({k: "|".join(v) if isinstance(v, list) else v for k, v in row.items()})
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@bp.get("/export")
+@admin_required
+def export_course():
+    grade = request.args.get("grade", type=int)
+    if request.args.get("format", "json") == "csv":
+        model = {"Topic": Topic, "Assignment": Assignment}.get(request.args.get("entity", "Topic"))
+        if model is None:
+            raise ApiError("entity must be Topic or Assignment")
+        body, mimetype = _csv_export(model, grade), "text/csv"
+        filename = f"{model.__tablename__}s.csv"
+    else:
+        body, mimetype, filename = _json_export(grade), "application/json", "course.json"
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
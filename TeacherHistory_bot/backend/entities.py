@@ -0,0 +1,287 @@
+"""Entity CRUD API mirroring the hosted ``@/entities/all`` SDK contract.
+
+====================================  ==========================================
+SDK call                              Endpoint
+====================================  ==========================================
+``Entity.list(sort, limit)``          ``GET /api/entities/<Entity>``
+``Entity.filter(query, sort, limit)`` ``POST /api/entities/<Entity>/filter``
+``Entity.get(id)``                    ``GET /api/entities/<Entity>/<id>``
+``Entity.create(data)``               ``POST /api/entities/<Entity>``
+``Entity.update(id, data)``           ``PUT /api/entities/<Entity>/<id>``
+``Entity.delete(id)``                 ``DELETE /api/entities/<Entity>/<id>``
+``User.me()``                         ``GET /api/auth/me``
+``User.updateMyUserData(data)``       ``PUT /api/auth/me``
+====================================  ==========================================
+
+Only admins write through this API: students submit answers through
+``/api/submissions``, which grades them on the server, and the grading fields
+of ``UserProgress`` are not writable here at all (see :data:`SERVER_FIELDS`).
+Reads are authorized too: only admins read ``User`` (a student gets their own
+record from ``/api/auth/me``), and students only see their own
+``UserProgress`` rows.
+
+List responses carry an ETag and honour ``If-None-Match`` (see
+:mod:`backend.versions`).
+
+``fields`` (``"id,title,subject"`` or a list) limits the columns selected and
+returned, so callers that only need titles do not download ``content``.
+
+``query`` accepts equality matches and the ``$in``/``$gt``/``$contains``/``$or``
+operators documented in :func:`backend.query.filter_clauses`.  Passing a
+``cursor`` (empty for the first page) switches list and filter to keyset
+pagination, returning ``{"items": [...], "next_cursor": ...}`` instead of a
+bare array; ``next_cursor`` is ``null`` on the last page.
+"""
+
+import json
+
+from flask import Blueprint, current_app, jsonify, make_response, request
+
+from . import catalog, grade_cache, versions
+from .auth import current_user, login_required
+from .errors import ApiError, NotFound
+from .extensions import db
+from .models import ENTITIES, Assignment, Topic, User, UserProgress
+from .query import build_select, encode_cursor, parse_fields, parse_sort
+from .schema import validate
+from .topic_progress import recompute, refresh_totals
+
+bp = Blueprint("entities", __name__, url_prefix="/api")
+
+# Fields only the grading code writes.  ``grading.apply_grade`` credits the
+# difference from the stored ``points_earned``, so it must not change behind it.
+SERVER_FIELDS = {"UserProgress": {"is_correct", "points_earned", "ai_feedback"}}
+# Entities only admins may read.
+ADMIN_READ = {"User"}
+# Entities non-admins only see their own records of.
+OWNER_READ = {"UserProgress"}
+# Fields a user may change on their own profile through ``updateMyUserData``.
+SELF_EDITABLE_FIELDS = {"full_name", "grade"}
+
+
+def get_model(name: str):
+    model = ENTITIES.get(name)
+    if model is None:
+        raise NotFound(f"unknown entity {name!r}")
+    return model
+
+
+def get_record(model, record_id: str):
+    record = db.session.get(model, record_id)
+    if record is None:
+        raise NotFound(f"{model.__name__} {record_id} not found")
+    return record
+
+
+def read_scope(model) -> list:
+    """Clauses limiting a read of ``model`` to what the current user may see."""
+    if current_user.is_admin:
+        return []
+    if model.__name__ in ADMIN_READ:
+        raise ApiError("admin role required", 403)
+    if model.__name__ in OWNER_READ:
+        return [model.created_by == current_user.email]
+    return []
+
+
+def get_readable(model, record_id: str):
+    """The record, if the current user may read it; others' records look missing."""
+    record = get_record(model, record_id)
+    if read_scope(model) and record.created_by != current_user.email:
+        raise NotFound(f"{model.__name__} {record_id} not found")
+    return record
+
+
+def parse_limit(value) -> int:
+    config = current_app.config
+    if value in (None, ""):
+        return config["DEFAULT_LIST_LIMIT"]
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ApiError("limit must be an integer") from None
+    if limit < 1:
+        raise ApiError("limit must be positive")
+    return min(limit, config["MAX_LIST_LIMIT"])
+
+
+def check_write(model, data=None) -> None:
+    if not current_user.is_admin:
+        raise ApiError("admin role required", 403)
+    graded = SERVER_FIELDS.get(model.__name__, set()) & set(data if isinstance(data, dict) else ())
+    if graded:
+        raise ApiError(f"{', '.join(sorted(graded))} can only be set by grading", 403)
+
+
+def run_query(model, criteria=None, sort=None, limit=None, fields=None) -> list:
+    scope = read_scope(model)
+    fields = parse_fields(model, fields)
+    if model is Topic and catalog.can_serve(criteria, sort, None):
+        criteria = criteria or {}
+        topics = catalog.topics(*(criteria.get(f) for f in catalog.CATALOG_FIELDS))[:parse_limit(limit)]
+        return [{f: topic[f] for f in fields} for topic in topics] if fields else topics
+    rows = db.session.scalars(build_select(model, criteria, sort, parse_limit(limit), fields=fields, scope=scope))
+    return [row.to_dict(fields) for row in rows]
+
+
+def run_page(model, criteria=None, sort=None, limit=None, cursor=None, fields=None) -> dict:
+    scope = read_scope(model)
+    limit = parse_limit(limit)
+    fields = parse_fields(model, fields)
+    rows = db.session.scalars(build_select(model, criteria, sort, limit + 1, cursor, fields, scope)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(parse_sort(model, sort), rows[-1])
+    return {"items": [row.to_dict(fields) for row in rows], "next_cursor": next_cursor}
+
+
+def respond_list(model, criteria, sort, limit, cursor, fields=None):
+    if cursor is None:
+        return jsonify(run_query(model, criteria, sort, limit, fields))
+    return jsonify(run_page(model, criteria, sort, limit, cursor, fields))
+
+
+def create_record(model, data: dict, owner: str | None):
+    record = model(**validate(model.entity_schema, data), created_by=owner)
+    db.session.add(record)
+    return record
+
+
+def update_record(record, data: dict):
+    for field, value in validate(record.entity_schema, data, partial=True).items():
+        setattr(record, field, value)
+    return record
+
+
+def derived_keys(record) -> set:
+    """What a record contributes to ``user_topic_progress``, to resync after a write."""
+    if isinstance(record, Assignment):
+        return {record.topic_id}
+    if isinstance(record, UserProgress):
+        return {(record.created_by, record.topic_id)}
+    return set()
+
+
+def sync_derived(model, keys: set) -> None:
+    versions.bump(model.__name__)
+    if model is Assignment:
+        refresh_totals(keys)
+    elif model is UserProgress:
+        for email, topic_id in keys:
+            recompute(email, [topic_id])
+
+
+def invalidate_caches(model) -> None:
+    """Drop cached reads of ``model``; call after the write has committed."""
+    if model is Topic:
+        catalog.invalidate()
+
+
+@bp.get("/entities/<name>")
+@login_required
+def list_entities(name):
+    model = get_model(name)
+    criteria = request.args.get("q")
+    if criteria:
+        try:
+            criteria = json.loads(criteria)
+        except ValueError:
+            raise ApiError("q must be a JSON object") from None
+    args = request.args
+    etag = versions.list_etag(name, args.to_dict())
+    if etag is not None and versions.not_modified(etag):
+        return "", 304, {"ETag": f'"{etag}"'}
+    response = make_response(respond_list(
+        model, criteria, args.get("sort"), args.get("limit"), args.get("cursor"), args.get("fields"),
+    ))
+    if etag is not None:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+@bp.post("/entities/<name>/filter")
+@login_required
+def filter_entities(name):
+    model = get_model(name)
+    body = request.get_json(silent=True) or {}
+    return respond_list(
+        model, body.get("query"), body.get("sort"), body.get("limit"), body.get("cursor"), body.get("fields"),
+    )
+
+
+@bp.get("/entities/<name>/<record_id>")
+@login_required
+def get_entity(name, record_id):
+    model = get_model(name)
+    return jsonify(get_readable(model, record_id).to_dict(parse_fields(model, request.args.get("fields"))))
+
+
+@bp.post("/entities/<name>")
+@login_required
+def create_entity(name):
+    model = get_model(name)
+    data = request.get_json(silent=True)
+    check_write(model, data)
+    record = create_record(model, data, current_user.email)
+    db.session.flush()
+    sync_derived(model, derived_keys(record))
+    db.session.commit()
+    invalidate_caches(model)
+    return jsonify(record.to_dict()), 201
+
+
+@bp.route("/entities/<name>/<record_id>", methods=["PUT", "PATCH"])
+@login_required
+def update_entity(name, record_id):
+    model = get_model(name)
+    data = request.get_json(silent=True)
+    check_write(model, data)
+    record = get_record(model, record_id)
+    keys = derived_keys(record)
+    update_record(record, data)
+    db.session.flush()
+    sync_derived(model, keys | derived_keys(record))
+    if model is Assignment:
+        grade_cache.invalidate([record_id])
+    db.session.commit()
+    invalidate_caches(model)
+    return jsonify(record.to_dict())
+
+
+@bp.delete("/entities/<name>/<record_id>")
+@login_required
+def delete_entity(name, record_id):
+    model = get_model(name)
+    check_write(model)
+    record = get_record(model, record_id)
+    keys = derived_keys(record)
+    db.session.delete(record)
+    db.session.flush()
+    sync_derived(model, keys)
+    if model is Assignment:
+        grade_cache.invalidate([record_id])
+    db.session.commit()
+    invalidate_caches(model)
+    return jsonify(id=record_id)
+
+
+@bp.get("/auth/me")
+@login_required
+def me():
+    return jsonify(current_user.to_dict())
+
+
+@bp.put("/auth/me")
+@login_required
+def update_me():
+    data = request.get_json(silent=True) or {}
+    forbidden = set(data) - SELF_EDITABLE_FIELDS
+    if forbidden:
+        raise ApiError(f"cannot update {', '.join(sorted(forbidden))}", 403)
+    update_record(db.session.get(User, current_user.id), data)
+    db.session.commit()
+    return jsonify(current_user.to_dict())
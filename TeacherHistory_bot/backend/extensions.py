@@ -0,0 +1,7 @@
+"""Flask extension singletons, bound to the app in :func:`backend.create_app`."""
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+login_manager = LoginManager()
@@ -0,0 +1,106 @@
+"""Persistent cache of LLM grades.
+
+An entry is keyed by a SHA-256 of the assignment's graded content (type,
+question, reference answer, points and the prompt version) together with the
+normalized student answer.  Editing an assignment therefore changes every key
+for it; the old rows are also deleted when the edit is saved, and whatever is
+left unused expires after ``GRADE_CACHE_TTL_DAYS``.  The table is trimmed to
+``GRADE_CACHE_MAX_ENTRIES`` least-recently-used rows from time to time.
+
+Answers are normalized conservatively (Unicode form, case, ``ё``, whitespace
+and surrounding punctuation) so only answers that read the same share a grade.
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import unicodedata
+from datetime import timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from .extensions import db
+from .models import GradeCacheEntry, utcnow
+from .query import dialect_insert
+
+# Bump when the grading prompt changes so old grades stop matching.
+PROMPT_VERSION = 1
+EVICT_EVERY = 200
+
+_stores = itertools.count(1)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_answer(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+    return _SPACE.sub(" ", text).strip(" .,;:!?\"'«»()-")
+
+
+def assignment_fingerprint(assignment) -> str:
+    content = [PROMPT_VERSION, assignment.type, assignment.question, assignment.correct_answer, assignment.points]
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode()).hexdigest()
+
+
+def cache_key(assignment, answer: str) -> str:
+    material = f"{assignment_fingerprint(assignment)}\0{normalize_answer(answer)}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _expiry_cutoff():
+    return utcnow() - timedelta(days=current_app.config["GRADE_CACHE_TTL_DAYS"])
+
+
+def lookup(assignment, answer: str) -> tuple[bool, int, str | None] | None:
+    """Return a cached ``(is_correct, points, feedback)`` and mark it used, or ``None``."""
+    key = cache_key(assignment, answer)
+    entry = db.session.get(GradeCacheEntry, key)
+    if entry is None or entry.used_date < _expiry_cutoff():
+        return None
+    db.session.execute(
+        sa.update(GradeCacheEntry)
+        .where(GradeCacheEntry.key == key)
+        .values(hits=GradeCacheEntry.hits + 1, used_date=utcnow())
+    )
+    return entry.is_correct, entry.points_earned, entry.feedback
+
+
+def store(assignment, answer: str, grade: tuple[bool, int, str | None]) -> None:
+    """Remember a grade in the current transaction; the first writer of a key wins."""
+    is_correct, points, feedback = grade
+    now = utcnow()
+    db.session.execute(
+        dialect_insert(GradeCacheEntry)
+        .values(
+            key=cache_key(assignment, answer), assignment_id=assignment.id, is_correct=is_correct,
+            points_earned=points, feedback=feedback, hits=0, created_date=now, used_date=now,
+        )
+        .on_conflict_do_nothing(index_elements=["key"])
+    )
+    if next(_stores) % EVICT_EVERY == 0:
+        evict()
+
+
+def invalidate(assignment_ids) -> None:
+    """Drop the grades of edited or deleted assignments."""
+    ids = [i for i in set(assignment_ids) if i]
+    if ids:
+        db.session.execute(sa.delete(GradeCacheEntry).where(GradeCacheEntry.assignment_id.in_(ids)))
+
+
+def evict() -> int:
+    """Delete expired entries and trim the table to its size limit, oldest use first."""
+    removed = db.session.execute(
+        sa.delete(GradeCacheEntry).where(GradeCacheEntry.used_date < _expiry_cutoff())
+    ).rowcount
+    limit = current_app.config["GRADE_CACHE_MAX_ENTRIES"]
+    excess = db.session.scalar(sa.select(sa.func.count()).select_from(GradeCacheEntry)) - limit
+    if excess > 0:
+        oldest = (
+            sa.select(GradeCacheEntry.key)
+            .order_by(GradeCacheEntry.used_date, GradeCacheEntry.key)
+            .limit(excess)
+        )
+        removed += db.session.execute(sa.delete(GradeCacheEntry).where(GradeCacheEntry.key.in_(oldest))).rowcount
+    return removed
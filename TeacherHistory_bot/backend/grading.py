@@ -0,0 +1,342 @@
+"""Background LLM grading of free-text answers.
+
+``POST /api/submissions`` stores a non-test answer ungraded, creates a
+:class:`~backend.models.GradingTicket` and returns it at once.  A pool of
+``GRADING_WORKERS`` threads sends the answer to the LLM and writes the grade
+back to the progress row, crediting points the same way a graded submission
+does.  The client polls ``GET /api/grading/<id>``; with ``?wait=N`` the request
+is held open until the ticket finishes or ``N`` seconds pass, so the result
+arrives as soon as it is ready without a tight polling loop.
+
+Obvious cases are settled by :mod:`backend.prescore` and identical answers to
+an unchanged assignment come from :mod:`backend.grade_cache`, both without
+calling the LLM; identical answers graded at the same moment (a class checking
+the same model answer) share one LLM call.  If the LLM stays unavailable, or
+the gateway's circuit breaker is open, the answer gets the pre-scorer's
+coverage-based grade (or is left for the teacher when there is no reference
+answer) and the ticket ends ``degraded`` without keeping the student waiting.
+
+Degraded tickets are the regrade queue: every ``REGRADE_INTERVAL_SECONDS``, and
+as soon as the breaker closes, they are sent to the LLM again one by one and
+the new grade replaces the provisional one, correcting the student's points
+through :func:`apply_grade`.  A sweep stops at the first LLM failure.  While a
+ticket is being regraded its status is ``regrading``; afterwards it is
+``done``.  Tickets live in the database, so a restart picks up whatever was
+still queued or stuck running for longer than ``GRADING_STALE_SECONDS``.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import sqlalchemy as sa
+from flask import Blueprint, Flask, jsonify, request
+
+from . import grade_cache, llm
+from .auth import current_user, login_required
+from .errors import ApiError, NotFound
+from .extensions import db
+from .models import Assignment, GradingTicket, User, UserProgress, UserTopicProgress, utcnow
+from .points import add_points, locked_user
+from .prescore import DEGRADED_FEEDBACK, degraded_grade, prescore
+from .topic_progress import recompute
+
+log = logging.getLogger(__name__)
+
+bp = Blueprint("grading", __name__, url_prefix="/api/grading")
+
+GRADE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_correct": {"type": "boolean"},
+        "points_earned": {"type": "number"},
+        "feedback": {"type": "string"},
+    },
+}
+
+MAX_ATTEMPTS = 3
+MAX_WAIT_SECONDS = 30
+REGRADE_BATCH = 50
+FAILED_FEEDBACK = "Не удалось проверить ответ автоматически. Ответ передан учителю на проверку."
+
+
+def build_prompt(assignment, answer: str) -> str:
+    return (
+        "Проверь ответ ученика на задание по истории/обществознанию.\n\n"
+        f"Задание: {assignment.question}\n"
+        f"Правильный ответ: {assignment.correct_answer}\n"
+        f"Ответ ученика: {answer}\n\n"
+        "Оцени ответ по критериям:\n"
+        "1. Правильность фактов\n"
+        "2. Полнота ответа\n"
+        "3. Структура изложения\n\n"
+        f"Выставь баллы от 0 до {assignment.points or 0} и дай обратную связь."
+    )
+
+
+def parse_grade(reply, max_points: int) -> tuple[bool, int, str | None]:
+    """Validate the model's reply and clamp the points to the assignment."""
+    if not isinstance(reply, dict) or not isinstance(reply.get("is_correct"), bool):
+        raise llm.LLMError(f"unusable grade: {reply!r}")
+    points = reply.get("points_earned", 0)
+    if isinstance(points, bool) or not isinstance(points, (int, float)):
+        points = 0
+    feedback = reply.get("feedback")
+    return reply["is_correct"], max(0, min(int(points), max_points)), feedback if isinstance(feedback, str) else None
+
+
+def grade_answer(gateway: llm.Gateway, prompt: str, max_points: int, feature: str = "grading",
+                 deadline: float | None = None, key: str | None = None):
+    """Ask the LLM for a grade, retrying failed calls and unusable replies.
+
+    Concurrent calls with the same ``key`` (a :func:`grade_cache.cache_key`)
+    share one LLM call.
+    """
+    return gateway.complete(
+        prompt, GRADE_SCHEMA, feature=feature, deadline=deadline, attempts=MAX_ATTEMPTS, wait=True,
+        validate=lambda reply: parse_grade(reply, max_points), key=key,
+    )
+
+
+def apply_grade(progress: UserProgress, is_correct: bool, points: int, feedback: str | None) -> dict:
+    """Write a grade onto a progress row in the current transaction.
+
+    Points follow the submission rule: nothing is credited if the user already
+    solved the assignment with another answer.  If the row was graded before,
+    the user is credited only the difference: ``points_earned`` is written only
+    here and by ``submissions.record_submission``, never through the entity
+    API, so it is what the user was credited for the row.
+    """
+    user = locked_user(User.email == progress.created_by)
+    solved_before = db.session.scalar(
+        sa.select(sa.func.count(UserProgress.id)).where(
+            UserProgress.created_by == progress.created_by,
+            UserProgress.assignment_id == progress.assignment_id,
+            UserProgress.is_correct.is_(True),
+            UserProgress.id != progress.id,
+        )
+    ) > 0
+    if solved_before:
+        points = 0
+    delta = points - (progress.points_earned or 0)
+    progress.is_correct = is_correct
+    progress.points_earned = points
+    progress.ai_feedback = feedback
+    db.session.flush()
+    recompute(progress.created_by, [progress.topic_id])
+
+    if user is None:
+        return {"points_earned": points, "level_up": False, "first_solve": False}
+    old_level = user.level or 1
+    level = add_points(user.id, delta)[1] if delta else old_level
+    return {"points_earned": points, "level_up": level > old_level, "first_solve": is_correct and not solved_before}
+
+
+class GradingQueue:
+    def __init__(self):
+        self._executor: ThreadPoolExecutor | None = None
+        self._app: Flask | None = None
+        self._finished = threading.Condition()
+        self._wake = threading.Event()
+        self._sweeper: threading.Thread | None = None
+
+    def init_app(self, app: Flask) -> None:
+        self._app = app
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config["GRADING_WORKERS"], thread_name_prefix="clio-grading"
+        )
+        app.extensions["llm_gateway"].breaker.on_close(self._wake.set)
+        if self._sweeper is None and app.config["REGRADE_INTERVAL_SECONDS"] > 0:
+            self._sweeper = threading.Thread(target=self._regrade_forever, name="clio-regrade", daemon=True)
+            self._sweeper.start()
+
+    def recover(self) -> int:
+        """Requeue tickets left queued or stuck running by a previous process."""
+        cutoff = utcnow() - timedelta(seconds=self._app.config["GRADING_STALE_SECONDS"])
+        for stuck, status in (("running", "queued"), ("regrading", "degraded")):
+            db.session.execute(
+                sa.update(GradingTicket)
+                .where(GradingTicket.status == stuck, GradingTicket.updated_date < cutoff)
+                .values(status=status)
+            )
+        db.session.commit()
+        ticket_ids = db.session.scalars(
+            sa.select(GradingTicket.id).where(GradingTicket.status == "queued").order_by(GradingTicket.created_date)
+        ).all()
+        for ticket_id in ticket_ids:
+            self.enqueue(ticket_id)
+        return len(ticket_ids)
+
+    def enqueue(self, ticket_id: str) -> None:
+        """Schedule a committed ticket for grading."""
+        self._executor.submit(self._run, ticket_id)
+
+    def _run(self, ticket_id: str) -> None:
+        with self._app.app_context():
+            try:
+                self._process(ticket_id)
+            except Exception:
+                log.exception("grading ticket %s crashed", ticket_id)
+                db.session.rollback()
+        with self._finished:
+            self._finished.notify_all()
+
+    def _claim(self, ticket_id: str, status: str = "queued", to: str = "running") -> bool:
+        claimed = db.session.execute(
+            sa.update(GradingTicket)
+            .where(GradingTicket.id == ticket_id, GradingTicket.status == status)
+            .values(status=to, attempts=GradingTicket.attempts + 1, updated_date=utcnow())
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    def _grade_with_llm(self, assignment: Assignment, answer: str) -> tuple[bool, int, str | None]:
+        prompt, max_points = build_prompt(assignment, answer), assignment.points or 0
+        db.session.commit()  # do not hold a transaction open across the LLM call
+        grade = grade_answer(llm.get_gateway(), prompt, max_points,
+                             deadline=llm.deadline(self._app.config["GRADING_DEADLINE_SECONDS"]),
+                             key=grade_cache.cache_key(assignment, answer))
+        grade_cache.store(assignment, answer, grade)
+        return grade
+
+    def _process(self, ticket_id: str) -> None:
+        if not self._claim(ticket_id):
+            return  # finished already, or another worker has it
+        ticket = db.session.get(GradingTicket, ticket_id)
+        progress = db.session.get(UserProgress, ticket.progress_id)
+        assignment = db.session.get(Assignment, progress.assignment_id) if progress else None
+        if assignment is None:
+            ticket.status, ticket.error = "failed", "answer or assignment no longer exists"
+            db.session.commit()
+            return
+        answer = progress.user_answer
+        score = prescore(assignment, answer)
+        grade = score.grade if score.settled else grade_cache.lookup(assignment, answer)
+        status = "done"
+        if grade is None:
+            try:
+                grade = self._grade_with_llm(assignment, answer)
+            except llm.LLMError as exc:
+                log.warning("grading ticket %s deferred: %s", ticket_id, exc)
+                ticket.error = str(exc)
+                grade, status = degraded_grade(assignment, answer, score), "degraded"
+                if grade is None:
+                    progress.ai_feedback = FAILED_FEEDBACK
+                    ticket.status = status
+                    db.session.commit()
+                    return
+
+        apply_grade(progress, *grade)
+        ticket.status = status
+        db.session.commit()
+
+    def _regrade_forever(self) -> None:
+        while True:
+            self._wake.wait(self._app.config["REGRADE_INTERVAL_SECONDS"])
+            self._wake.clear()
+            with self._app.app_context():
+                try:
+                    self.regrade()
+                except Exception:
+                    log.exception("regrade sweep crashed")
+                    db.session.rollback()
+
+    def regrade(self) -> int:
+        """Re-grade degraded tickets until none are left or the LLM fails; return how many were corrected."""
+        regraded = 0
+        while True:
+            ticket_ids = db.session.scalars(
+                sa.select(GradingTicket.id)
+                .where(GradingTicket.status == "degraded")
+                .order_by(GradingTicket.updated_date, GradingTicket.id)
+                .limit(REGRADE_BATCH)
+            ).all()
+            if not ticket_ids:
+                return regraded
+            for ticket_id in ticket_ids:
+                try:
+                    regraded += self._regrade(ticket_id)
+                except llm.LLMError:
+                    return regraded
+
+    def _regrade(self, ticket_id: str) -> bool:
+        if not self._claim(ticket_id, "degraded", "regrading"):
+            return False
+        ticket = db.session.get(GradingTicket, ticket_id)
+        progress = db.session.get(UserProgress, ticket.progress_id)
+        assignment = db.session.get(Assignment, progress.assignment_id) if progress else None
+        if assignment is None:
+            ticket.status, ticket.error = "failed", "answer or assignment no longer exists"
+            db.session.commit()
+            return False
+        if progress.ai_feedback not in (DEGRADED_FEEDBACK, FAILED_FEEDBACK):
+            ticket.status, ticket.error = "done", None  # a teacher has graded it meanwhile
+            db.session.commit()
+            return False
+        answer = progress.user_answer
+        grade = grade_cache.lookup(assignment, answer)
+        if grade is None:
+            try:
+                grade = self._grade_with_llm(assignment, answer)
+            except llm.LLMError as exc:
+                ticket.status, ticket.error = "degraded", str(exc)
+                db.session.commit()
+                raise
+        apply_grade(progress, *grade)
+        ticket.status, ticket.error = "done", None
+        db.session.commit()
+        return True
+
+    def wait(self, ticket_id: str, timeout: float) -> GradingTicket | None:
+        """Return the ticket once it finishes or ``timeout`` runs out.
+
+        Workers in this process wake waiters directly; the periodic re-read
+        also catches tickets finished by another process.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            db.session.expire_all()
+            ticket = db.session.get(GradingTicket, ticket_id)
+            remaining = deadline - time.monotonic()
+            if ticket is None or ticket.finished or remaining <= 0:
+                return ticket
+            db.session.commit()  # release the snapshot while sleeping
+            with self._finished:
+                self._finished.wait(min(remaining, 1.0))
+
+
+queue = GradingQueue()
+
+
+def ticket_result(ticket: GradingTicket) -> dict:
+    result = {"ticket": ticket.to_dict()}
+    progress = db.session.get(UserProgress, ticket.progress_id)
+    if progress is not None:
+        result["progress"] = progress.to_dict()
+    if ticket.finished:
+        user = db.session.scalar(sa.select(User).where(User.email == progress.created_by)) if progress else None
+        if user is not None:
+            result["user"] = {"id": user.id, "total_points": user.total_points, "level": user.level}
+            topic = db.session.get(UserTopicProgress, (user.id, progress.topic_id)) if progress.topic_id else None
+            result["topic"] = topic.to_dict() if topic else None
+    return result
+
+
+@bp.get("/<ticket_id>")
+@login_required
+def get_ticket(ticket_id):
+    try:
+        wait = min(float(request.args.get("wait", 0)), MAX_WAIT_SECONDS)
+    except ValueError:
+        raise ApiError("wait must be a number") from None
+    ticket = db.session.get(GradingTicket, ticket_id)
+    progress = db.session.get(UserProgress, ticket.progress_id) if ticket else None
+    if ticket is None or (
+        not current_user.is_admin and (progress is None or progress.created_by != current_user.email)
+    ):
+        raise NotFound("grading ticket not found")
+    if wait > 0 and not ticket.finished:
+        ticket = queue.wait(ticket_id, wait)
+    return jsonify(ticket_result(ticket))
@@ -0,0 +1,244 @@
+"""The AI helper chat.
+
+``POST /api/helper/ask`` answers a student's question through the LLM within a
+conversation kept by :mod:`backend.conversations`: pass the ``session_id`` of
+an earlier answer to continue it, or leave it out to start a new one.  The
+prompt carries the conversation's summary and recent turns, plus the
+curriculum chunks :mod:`backend.retrieval` finds for the question in the
+student's grade.
+
+Students of the same grade ask the same things over and over, so opening
+questions are answered from a :class:`~backend.cache.SemanticCache` when their
+TF-IDF cosine similarity to an earlier one reaches ``HELPER_CACHE_THRESHOLD``.
+The cache is scoped by grade and by the question words asked (see
+:data:`~backend.text.QUESTION_WORDS`), which the similarity itself ignores.
+Follow-ups depend on the conversation and always go to the LLM.  Identical
+prompts asked at the same moment share one LLM call.
+
+``POST /api/helper/stream`` answers the same request as Server-Sent Events:
+``start`` (with the stream and session ids), a ``delta`` per piece of text as
+the model produces it, then ``done`` with the full answer, or
+``error``/``cancelled``.  Closing the connection stops the upstream request; so
+does ``POST /api/helper/stream/<id>/cancel`` from the same user, which reaches
+streams served by this process.
+
+Helper calls go through the LLM gateway under the ``helper`` feature limits,
+including a per-student token bucket; a student over quota gets ``429`` with
+``Retry-After``.
+"""
+
+import json
+import threading
+
+import sqlalchemy as sa
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
+
+from . import conversations, llm, retrieval
+from .auth import current_user, login_required
+from .cache import SemanticCache
+from .errors import ApiError, NotFound, TooManyRequests
+from .extensions import db
+from .models import HelperSession, new_id
+from .text import question_words, tokenize
+
+bp = Blueprint("helper", __name__, url_prefix="/api/helper")
+
+MAX_QUESTION_LENGTH = 2000
+
+answers = SemanticCache(tokenize)
+
+# stream id -> (owner e-mail, cancel event) for streams running in this process
+_streams: dict[str, tuple[str, threading.Event]] = {}
+_streams_lock = threading.Lock()
+
+
+def init_app(app: Flask) -> None:
+    answers.threshold = app.config["HELPER_CACHE_THRESHOLD"]
+    answers.ttl = app.config["HELPER_CACHE_TTL"]
+    answers.maxsize = app.config["HELPER_CACHE_SIZE"]
+
+
+def build_prompt(question: str, context=(), history: str = "") -> str:
+    parts = [
+        "Ты — ИИ-ассистент Clio, эксперт по истории и обществознанию. "
+        "Отвечай на вопросы учеников дружелюбно, точно и понятно."
+    ]
+    if context:
+        materials = "\n\n".join(f"[{chunk.title}]\n{chunk.text}" for chunk in context)
+        parts.append(f"Материалы курса (опирайся на них, если они относятся к вопросу):\n{materials}")
+    if history:
+        parts.append(history)
+    parts.append(f'Вопрос ученика: "{question}"')
+    return "\n\n".join(parts)
+
+
+def read_question() -> tuple[str, str | None]:
+    body = request.get_json(silent=True) or {}
+    question = body.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise ApiError("question is required")
+    if len(question) > MAX_QUESTION_LENGTH:
+        raise ApiError(f"question is longer than {MAX_QUESTION_LENGTH} characters")
+    session_id = body.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        raise ApiError("session_id must be a string")
+    return question.strip(), session_id
+
+
+def cache_scope(question: str) -> tuple:
+    return current_user.grade, question_words(question)
+
+
+def prepare_turn(question: str, session_id: str | None):
+    """Open the conversation and either find a cached answer or build the prompt.
+
+    Returns ``(session, cached_answer, prompt)`` with one of the last two set.
+    Commits, so no transaction stays open while the LLM works.
+    """
+    session = conversations.get_session(current_user.id, session_id)
+    cached = answers.lookup(cache_scope(question), question) if session.last_seq == 0 else None
+    prompt = None
+    if cached is None:
+        context = retrieval.context_for(question, current_user.grade)
+        prompt = build_prompt(question, context, conversations.history_prompt(session))
+    db.session.commit()
+    return session, cached[0] if cached else None, prompt
+
+
+def finish_turn(session_id: str, question: str, answer: str, cached: bool) -> None:
+    session = db.session.get(HelperSession, session_id)
+    if not cached and session.last_seq == 0:
+        answers.add(cache_scope(question), question, answer)
+    conversations.append(session, "user", question)
+    conversations.append(session, "assistant", answer)
+    conversations.compact(session)
+    db.session.commit()
+
+
+def _call_limits() -> dict:
+    return {"feature": "helper", "user": current_user.id,
+            "deadline": llm.deadline(current_app.config["HELPER_DEADLINE_SECONDS"])}
+
+
+def _quota_error(exc: llm.QuotaExceeded) -> TooManyRequests:
+    return TooManyRequests("too many questions to the AI helper, try again shortly", exc.retry_after)
+
+
+@bp.post("/ask")
+@login_required
+def ask():
+    question, session_id = read_question()
+    session, answer, prompt = prepare_turn(question, session_id)
+    cached = answer is not None
+    if not cached:
+        try:
+            answer = llm.get_gateway().complete(prompt, key=llm.prompt_key(prompt), **_call_limits())
+        except llm.QuotaExceeded as exc:
+            raise _quota_error(exc) from None
+        except llm.LLMError:
+            raise ApiError("the AI helper is unavailable, try again later", 503) from None
+    finish_turn(session.id, question, answer, cached)
+    return jsonify(answer=answer, cached=cached, session_id=session.id)
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_answer(chunks, cancel: threading.Event, on_done):
+    """Yield SSE events for the text ``chunks`` of one answer, calling ``on_done(answer)`` before ``done``."""
+    parts = []
+    try:
+        try:
+            for chunk in chunks:
+                if cancel.is_set():
+                    yield _event("cancelled", {})
+                    return
+                parts.append(chunk)
+                yield _event("delta", {"text": chunk})
+        finally:
+            chunks.close()
+    except llm.LLMError:
+        yield _event("error", {"error": "the AI helper is unavailable, try again later"})
+        return
+    answer = "".join(parts)
+    on_done(answer)
+    yield _event("done", {"answer": answer, "cached": False})
+
+
+@bp.post("/stream")
+@login_required
+def stream():
+    question, session_id = read_question()
+    session, cached, prompt = prepare_turn(question, session_id)
+    session_id, owner = session.id, current_user.email
+    stream_id, cancel = new_id(), threading.Event()
+    chunks = None
+    if cached is None:
+        # Admitted before the response starts, so a quota error is a real 429.
+        try:
+            chunks = llm.get_gateway().stream(prompt, **_call_limits())
+        except llm.QuotaExceeded as exc:
+            raise _quota_error(exc) from None
+        except llm.LLMError:
+            raise ApiError("the AI helper is unavailable, try again later", 503) from None
+
+    def events():
+        with _streams_lock:
+            _streams[stream_id] = (owner, cancel)
+        try:
+            yield _event("start", {"id": stream_id, "session_id": session_id})
+            if cached is not None:
+                finish_turn(session_id, question, cached, True)
+                yield _event("delta", {"text": cached})
+                yield _event("done", {"answer": cached, "cached": True})
+            else:
+                yield from stream_answer(
+                    chunks, cancel, lambda answer: finish_turn(session_id, question, answer, False),
+                )
+        finally:
+            with _streams_lock:
+                _streams.pop(stream_id, None)
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    if chunks is not None:
+        response.call_on_close(chunks.close)  # frees the gateway slots even if the body never starts
+    return response
+
+
+@bp.post("/stream/<stream_id>/cancel")
+@login_required
+def cancel_stream(stream_id):
+    with _streams_lock:
+        owner, cancel = _streams.get(stream_id, (None, None))
+    if cancel is None or owner != current_user.email:
+        raise NotFound("stream not found")
+    cancel.set()
+    return jsonify(id=stream_id, cancelled=True)
+
+
+@bp.get("/sessions")
+@login_required
+def list_sessions():
+    sessions = db.session.scalars(
+        sa.select(HelperSession)
+        .where(HelperSession.user_id == current_user.id)
+        .order_by(HelperSession.updated_date.desc(), HelperSession.id)
+    )
+    return jsonify([session.to_dict() for session in sessions])
+
+
+@bp.get("/sessions/<session_id>")
+@login_required
+def get_session(session_id):
+    session = conversations.get_session(current_user.id, session_id)
+    return jsonify({**session.to_dict(), "messages": [m.to_dict() for m in conversations.transcript(session)]})
+
+
+@bp.delete("/sessions/<session_id>")
+@login_required
+def delete_session(session_id):
+    conversations.delete(conversations.get_session(current_user.id, session_id))
+    db.session.commit()
+    return jsonify(id=session_id)
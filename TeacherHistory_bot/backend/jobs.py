@@ -0,0 +1,180 @@
+"""Background jobs for work too slow to do inside a request.
+
+A job runs on a small thread pool inside the app context; the request that
+started it returns the job handle at once and the client polls
+``GET /api/jobs/<id>`` for status and progress.  Job state is kept in the
+``jobs`` table, so the poll can land on any worker: the row is written when
+the job is queued, starts and finishes, and progress at most every
+``JOB_PROGRESS_INTERVAL`` seconds.  Those writes go through their own short
+transactions, so they are visible while the job's own transaction is still
+open.  On SQLite, where that would contend for the single database lock,
+progress is only written at the end and the worker running the job serves it
+from memory.
+
+Finished jobs are deleted after ``JOB_RETENTION_SECONDS``; jobs a dead process
+left unfinished are marked failed after ``JOB_STALE_SECONDS``.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import sqlalchemy as sa
+from flask import Blueprint, Flask, jsonify
+from sqlalchemy.orm import Session
+
+from .auth import current_user, login_required
+from .errors import NotFound
+from .extensions import db
+from .models import BackgroundJob, new_id, utcnow
+
+log = logging.getLogger(__name__)
+
+bp = Blueprint("jobs", __name__, url_prefix="/api/jobs")
+
+
+class Job:
+    """Handle passed to a running job; ``total`` and :meth:`advance` report progress."""
+
+    def __init__(self, runner: "JobRunner", kind: str, owner: str | None, total: int | None = None):
+        self.id = new_id()
+        self.kind = kind
+        self.owner = owner
+        self.status = "queued"
+        self.done = 0
+        self.result = None
+        self.error = None
+        self._runner = runner
+        self._total = total
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int | None:
+        return self._total
+
+    @total.setter
+    def total(self, value: int | None) -> None:
+        self._total = value
+        self._save_progress(force=True)
+
+    def advance(self, n: int = 1) -> None:
+        with self._lock:
+            self.done += n
+        self._save_progress()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def _save_progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not self._runner.live_progress or (not force and now - self._saved_at < self._runner.progress_interval):
+            return
+        self._saved_at = now
+        self._runner.save(self, done=self.done, total=self.total)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "done": self.done,
+                "total": self.total,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobRunner:
+    def __init__(self):
+        self._running: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._app: Flask | None = None
+        self.live_progress = True
+        self.progress_interval = 1.0
+
+    def init_app(self, app: Flask) -> None:
+        self._app = app
+        self.progress_interval = app.config["JOB_PROGRESS_INTERVAL"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config["JOB_WORKERS"], thread_name_prefix="clio-job"
+        )
+
+    def recover(self) -> int:
+        """Fail jobs a previous process left unfinished; call at startup."""
+        self.live_progress = db.engine.dialect.name != "sqlite"
+        cutoff = utcnow() - timedelta(seconds=self._app.config["JOB_STALE_SECONDS"])
+        failed = db.session.execute(
+            sa.update(BackgroundJob)
+            .where(BackgroundJob.status.in_(("queued", "running")), BackgroundJob.updated_date < cutoff)
+            .values(status="failed", error="interrupted", finished_date=utcnow())
+        ).rowcount
+        db.session.commit()
+        return failed
+
+    def submit(self, kind: str, fn, *args, owner: str | None = None, total: int | None = None) -> Job:
+        """Run ``fn(job, *args)`` in the background and return its job.
+
+        Commits the caller's transaction along with the job row.
+        """
+        job = Job(self, kind, owner, total)
+        self._prune()
+        db.session.add(BackgroundJob(id=job.id, kind=kind, owner=owner, total=total))
+        db.session.commit()
+        with self._lock:
+            self._running[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Job | BackgroundJob | None:
+        """The live handle if this worker runs the job, otherwise the stored row."""
+        with self._lock:
+            job = self._running.get(job_id)
+        return job or db.session.get(BackgroundJob, job_id)
+
+    def save(self, job: Job, **values) -> None:
+        """Write job state in a transaction of its own."""
+        try:
+            with Session(db.engine) as session:
+                session.execute(sa.update(BackgroundJob).where(BackgroundJob.id == job.id).values(**values))
+                session.commit()
+        except Exception:
+            log.warning("could not save state of job %s", job.id, exc_info=True)
+
+    def _run(self, job: Job, fn, args) -> None:
+        job.status = "running"
+        with self._app.app_context():
+            self.save(job, status="running")
+            try:
+                job.result = fn(job, *args)
+                job.status = "succeeded"
+            except Exception as exc:  # reported to the client through the job
+                log.exception("job %s (%s) failed", job.id, job.kind)
+                db.session.rollback()
+                job.error = str(exc)
+                job.status = "failed"
+            self.save(job, status=job.status, done=job.done, total=job.total, result=job.result, error=job.error,
+                      finished_date=utcnow())
+        with self._lock:
+            del self._running[job.id]
+
+    def _prune(self) -> None:
+        cutoff = utcnow() - timedelta(seconds=self._app.config["JOB_RETENTION_SECONDS"])
+        db.session.execute(sa.delete(BackgroundJob).where(BackgroundJob.finished_date < cutoff))
+
+
+runner = JobRunner()
+
+
+@bp.get("/<job_id>")
+@login_required
+def get_job(job_id):
+    job = runner.get(job_id)
+    if job is None or (job.owner != current_user.email and not current_user.is_admin):
+        raise NotFound("job not found")
+    return jsonify(job.to_dict())
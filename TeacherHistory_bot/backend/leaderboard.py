@@ -0,0 +1,256 @@
+"""Incrementally maintained leaderboard.
+
+Each worker keeps the ranking in memory as sorted lists, one global partition
+and one per grade, so top-N, "my rank" and "users around me" are answered with
+a bisect instead of scanning ``users``.  The ranking is loaded from the
+database on first use and then kept current from committed ``User`` changes
+(see the session hooks below); changes committed while a snapshot is being
+read are journalled and replayed over it, so a reload cannot lose them.
+Points changed by another worker reach this one at the latest after
+``LEADERBOARD_RESYNC_SECONDS``, when the ranking is reloaded.
+
+Only users with a grade and a positive score are ranked, as on the page.
+"""
+
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import Blueprint, current_app, jsonify, request
+from sortedcontainers import SortedList
+from sqlalchemy.orm import Session
+
+from .auth import current_user, login_required
+from .errors import ApiError
+from .extensions import db
+from .models import User
+
+bp = Blueprint("leaderboard", __name__, url_prefix="/api/leaderboard")
+
+ALL = "all"
+
+
+class Leaderboard:
+    """Rankings partitioned by grade, ordered by points desc then user id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partitions: dict = {}
+        self._entries: dict[str, tuple[int, int]] = {}
+        self._journal: list | None = None
+        self.loaded_at: float | None = None
+
+    @staticmethod
+    def _key(user_id: str, points: int) -> tuple[int, str]:
+        return (-points, user_id)
+
+    def _partition(self, name) -> SortedList:
+        return self._partitions.setdefault(name, SortedList())
+
+    def begin_load(self) -> None:
+        """Start journalling changes; call before reading the snapshot passed to :meth:`load`."""
+        with self._lock:
+            self._journal = []
+
+    def cancel_load(self) -> None:
+        with self._lock:
+            self._journal = None
+
+    def load(self, rows) -> None:
+        """Replace the ranking with ``(user_id, points, grade)`` rows.
+
+        Changes recorded since :meth:`begin_load` are applied on top, as the
+        snapshot may predate them.
+        """
+        with self._lock:
+            self._partitions = {}
+            self._entries = {}
+            for user_id, points, grade in rows:
+                self._insert(user_id, points, grade)
+            for user_id, points, grade in self._journal or ():
+                self._remove(user_id)
+                self._insert(user_id, points, grade)
+            self._journal = None
+            self.loaded_at = time.monotonic()
+
+    def _insert(self, user_id, points, grade) -> None:
+        if not points or points <= 0 or grade is None:
+            return
+        key = self._key(user_id, points)
+        self._partition(ALL).add(key)
+        self._partition(grade).add(key)
+        self._entries[user_id] = (points, grade)
+
+    def _remove(self, user_id) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        points, grade = entry
+        key = self._key(user_id, points)
+        self._partitions[ALL].remove(key)
+        self._partitions[grade].remove(key)
+
+    def record(self, user_id: str, points: int | None, grade: int | None) -> None:
+        """Apply a user's new score and grade; O(log n)."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((user_id, points, grade))
+            if self.loaded_at is None:
+                return
+            self._remove(user_id)
+            self._insert(user_id, points, grade)
+
+    def discard(self, user_id: str) -> None:
+        self.record(user_id, None, None)
+
+    def size(self, partition=ALL) -> int:
+        return len(self._partitions.get(partition, ()))
+
+    def top(self, n: int, partition=ALL) -> list[tuple[int, str, int]]:
+        """``(rank, user_id, points)`` for the first ``n`` users."""
+        with self._lock:
+            ranking = self._partitions.get(partition, SortedList())
+            return [(i + 1, uid, -neg) for i, (neg, uid) in enumerate(ranking[:n])]
+
+    def rank(self, user_id: str, partition=ALL) -> int | None:
+        with self._lock:
+            return self._rank(user_id, partition)
+
+    def _rank(self, user_id, partition):
+        entry = self._entries.get(user_id)
+        if entry is None or (partition != ALL and entry[1] != partition):
+            return None
+        return self._partitions[partition].index(self._key(user_id, entry[0])) + 1
+
+    def around(self, user_id: str, n: int, partition=ALL) -> list[tuple[int, str, int]]:
+        """Up to ``n`` users on each side of ``user_id``, including them."""
+        with self._lock:
+            rank = self._rank(user_id, partition)
+            if rank is None:
+                return []
+            start = max(rank - 1 - n, 0)
+            window = self._partitions[partition][start:rank + n]
+            return [(start + i + 1, uid, -neg) for i, (neg, uid) in enumerate(window)]
+
+
+board = Leaderboard()
+_load_lock = threading.Lock()
+
+
+def ensure_loaded() -> Leaderboard:
+    max_age = current_app.config["LEADERBOARD_RESYNC_SECONDS"]
+
+    def stale() -> bool:
+        return board.loaded_at is None or time.monotonic() - board.loaded_at > max_age
+
+    if stale():
+        with _load_lock:
+            if stale():
+                board.begin_load()
+                try:
+                    rows = db.session.execute(
+                        sa.select(User.id, User.total_points, User.grade)
+                        .where(User.total_points > 0, User.grade.is_not(None))
+                    ).all()
+                except BaseException:
+                    board.cancel_load()
+                    raise
+                board.load(rows)
+    return board
+
+
+# -- keep the ranking in step with committed User changes ---------------------
+
+_PENDING = "leaderboard_pending"
+
+
+@sa.event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING, {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, User):
+            pending[obj.id] = (obj.total_points, obj.grade)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending[obj.id] = None
+
+
+def mark_changed(session, user_id: str, points: int, grade: int | None) -> None:
+    """Queue a score change made with a bulk UPDATE, which the flush hook cannot see."""
+    session.info.setdefault(_PENDING, {})[user_id] = (points, grade)
+
+
+@sa.event.listens_for(Session, "after_commit")
+def _apply_user_changes(session):
+    for user_id, change in session.info.pop(_PENDING, {}).items():
+        if change is None:
+            board.discard(user_id)
+        else:
+            board.record(user_id, *change)
+
+
+@sa.event.listens_for(Session, "after_rollback")
+def _drop_user_changes(session):
+    session.info.pop(_PENDING, None)
+
+
+# -- API ----------------------------------------------------------------------
+
+
+def _partition_arg():
+    grade = request.args.get("grade")
+    if grade in (None, "", ALL):
+        return ALL
+    try:
+        return int(grade)
+    except ValueError:
+        raise ApiError("grade must be an integer") from None
+
+
+def _int_arg(name: str, default: int, maximum: int) -> int:
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise ApiError(f"{name} must be an integer") from None
+    return max(0, min(value, maximum))
+
+
+def _serialize(ranked) -> list[dict]:
+    ids = [uid for _, uid, _ in ranked]
+    users = {u.id: u for u in db.session.scalars(sa.select(User).where(User.id.in_(ids)))} if ids else {}
+    items = []
+    for rank, uid, points in ranked:
+        user = users.get(uid)
+        if user is None:
+            continue
+        items.append({
+            "rank": rank,
+            "id": uid,
+            "full_name": user.full_name,
+            "grade": user.grade,
+            "level": user.level,
+            "total_points": points,
+        })
+    return items
+
+
+@bp.get("")
+@login_required
+def top():
+    partition = _partition_arg()
+    ranking = ensure_loaded()
+    limit = _int_arg("limit", 50, 500)
+    return jsonify(items=_serialize(ranking.top(limit, partition)), total=ranking.size(partition))
+
+
+@bp.get("/me")
+@login_required
+def me():
+    partition = _partition_arg()
+    ranking = ensure_loaded()
+    around = _int_arg("around", 5, 50)
+    return jsonify(
+        rank=ranking.rank(current_user.id, partition),
+        total=ranking.size(partition),
+        around=_serialize(ranking.around(current_user.id, around, partition)),
+    )
@@ -0,0 +1,39 @@
+"""Learning page bootstrap: everything the first render needs in one response.
+
+Replaces the ``User.me()`` -> ``Topic.filter({grade})`` ->
+``UserProgress.filter({created_by})`` waterfall.  Per-topic progress comes from
+the ``user_topic_progress`` summary rows instead of every progress row.
+"""
+
+import sqlalchemy as sa
+from flask import Blueprint, jsonify
+
+from . import catalog
+from .auth import current_user, login_required
+from .extensions import db
+from .models import UserProgress
+from .topic_progress import rows_for
+
+bp = Blueprint("learning", __name__, url_prefix="/api/learning")
+
+
+def solved_assignments(email: str) -> list[str]:
+    return db.session.scalars(
+        sa.select(UserProgress.assignment_id)
+        .where(UserProgress.created_by == email, UserProgress.is_correct.is_(True))
+        .distinct()
+    ).all()
+
+
+@bp.get("/bootstrap")
+@login_required
+def bootstrap():
+    user = current_user
+    if user.grade is None:
+        return jsonify(user=user.to_dict(), topics=[], progress={}, solved_assignments=[])
+    return jsonify(
+        user=user.to_dict(),
+        topics=catalog.topics(grade=user.grade),
+        progress=rows_for(user.id),
+        solved_assignments=solved_assignments(user.email),
+    )
@@ -0,0 +1,54 @@
+"""LLM access for answer grading and the AI helper.
+
+The provider is chosen by ``LLM_PROVIDER``: ``http`` for an OpenAI-compatible
+endpoint at ``LLM_API_URL``, ``fake`` for the offline stand-in.  Application
+code calls it only through the :class:`~backend.llm.gateway.Gateway` returned
+by :func:`get_gateway`, which applies the quotas and concurrency limits of
+``LLM_FEATURES``; :func:`get_provider` gives tests the provider underneath.
+"""
+
+import time
+
+from flask import Flask, current_app
+
+from .gateway import CircuitBreaker, CircuitOpen, Gateway, QuotaExceeded, TokenBucket, prompt_key
+from .providers import FakeProvider, HTTPProvider, LLMError, LLMTimeout, Provider
+
+__all__ = [
+    "CircuitBreaker", "CircuitOpen", "FakeProvider", "Gateway", "HTTPProvider", "LLMError", "LLMTimeout",
+    "Provider", "QuotaExceeded", "TokenBucket", "deadline", "get_gateway", "get_provider", "init_app", "prompt_key",
+]
+
+
+def create_provider(config) -> Provider:
+    kind = config["LLM_PROVIDER"]
+    if kind == "fake":
+        return FakeProvider(latency=config["LLM_FAKE_LATENCY"], token_delay=config["LLM_FAKE_TOKEN_DELAY"])
+    if kind == "http":
+        return HTTPProvider(
+            config["LLM_API_URL"], config["LLM_API_KEY"], config["LLM_MODEL"], config["LLM_TIMEOUT"],
+            pool_size=config["LLM_MAX_CONCURRENCY"],
+        )
+    raise ValueError(f"unknown LLM_PROVIDER {kind!r}")
+
+
+def init_app(app: Flask) -> None:
+    provider = app.extensions["llm"] = create_provider(app.config)
+    app.extensions["llm_gateway"] = Gateway(
+        provider, app.config["LLM_MAX_CONCURRENCY"], app.config["LLM_FEATURES"], app.config["LLM_TIMEOUT"],
+        backoff=app.config["LLM_RETRY_BACKOFF"],
+        breaker=CircuitBreaker(app.config["LLM_BREAKER_FAILURES"], app.config["LLM_BREAKER_COOLDOWN_SECONDS"]),
+    )
+
+
+def get_provider() -> Provider:
+    return current_app.extensions["llm"]
+
+
+def get_gateway() -> Gateway:
+    return current_app.extensions["llm_gateway"]
+
+
+def deadline(seconds: float) -> float:
+    """The :func:`time.monotonic` instant ``seconds`` from now, for a gateway call."""
+    return time.monotonic() + seconds
@@ -0,0 +1,321 @@
+"""The one way out to the LLM.
+
+Every call names its feature (``grading``, ``review``, ``helper``) and, for
+calls a user triggers directly, the user.  Before the provider is called the
+gateway takes:
+
+* a token from the feature's bucket and, if the feature has per-user limits,
+  from the user's bucket for that feature;
+* a slot of the feature's concurrency limit, then one of the global
+  ``LLM_MAX_CONCURRENCY`` slots.
+
+Feature limits keep one use from crowding out another: the helper can never
+hold more than its share of the global slots, so a student spamming it cannot
+starve essay grading.  Interactive calls (``wait=False``) fail at once with
+:class:`QuotaExceeded` when a bucket is empty; background calls wait for a
+token.  All waiting, the request timeout and retries are bounded by the call's
+``deadline`` (a :func:`time.monotonic` instant), and retries back off
+exponentially with full jitter.
+
+A :class:`CircuitBreaker` watches the provider itself.  After
+``LLM_BREAKER_FAILURES`` failed calls in a row it opens and every call fails at
+once with :class:`CircuitOpen` instead of waiting out timeouts; one trial call
+is let through per ``LLM_BREAKER_COOLDOWN_SECONDS`` and the first success
+closes it again.
+
+Calls that pass a ``key`` are coalesced: while one call for a key is in
+flight, identical calls wait for it and share its reply (or error) instead of
+going to the provider themselves.  Per-user quotas are still charged to every
+caller, so waiting on someone else's call does not bypass them.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from ..cache import SingleFlight
+from .providers import LLMError, LLMTimeout
+
+_SPACE = re.compile(r"\s+")
+
+
+def prompt_key(prompt: str, schema: dict | None = None) -> str:
+    """Coalescing key for a prompt; prompts differing only in whitespace share it."""
+    material = json.dumps([_SPACE.sub(" ", prompt).strip(), schema], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class QuotaExceeded(LLMError):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(LLMError):
+    def __init__(self, retry_after: float):
+        super().__init__("LLM provider is unavailable")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown: float, clock=time.monotonic):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures = 0
+        self._opened = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> bool:
+        with self._lock:
+            return self._failures >= self.threshold
+
+    def on_close(self, listener) -> None:
+        """Call ``listener()`` whenever the breaker closes after being open."""
+        self._listeners.append(listener)
+
+    def allow(self) -> None:
+        """Raise :class:`CircuitOpen` unless a call may go to the provider now."""
+        with self._lock:
+            if self._failures < self.threshold:
+                return
+            waited = self._clock() - self._opened
+            if waited < self.cooldown:
+                raise CircuitOpen(self.cooldown - waited)
+            self._opened = self._clock()  # this call is the trial; the next one waits a full cooldown
+
+    def record_success(self) -> None:
+        with self._lock:
+            was_open, self._failures = self._failures >= self.threshold, 0
+        if was_open:
+            for listener in self._listeners:
+                listener()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened = self._clock()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self) -> float:
+        """Take a token if one is available; otherwise return seconds until one is."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        with self._lock:
+            self._refill()
+            return self._tokens >= self.burst
+
+
+class Gateway:
+    MAX_USER_BUCKETS = 10_000
+
+    def __init__(self, provider, max_concurrency: int, features: dict, default_timeout: float,
+                 backoff: float = 0.5, breaker: CircuitBreaker | None = None, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.provider = provider
+        self.breaker = breaker or CircuitBreaker(5, 30.0, clock)
+        self.default_timeout = default_timeout
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._features = {}
+        for name, limits in features.items():
+            self._features[name] = {
+                "bucket": TokenBucket(limits["rate"], limits["burst"], clock),
+                "slots": threading.BoundedSemaphore(limits.get("concurrency", max_concurrency)),
+                "user_rate": limits.get("user_rate"),
+                "user_burst": limits.get("user_burst"),
+            }
+        self._user_buckets: dict = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def _feature(self, name: str) -> dict:
+        try:
+            return self._features[name]
+        except KeyError:
+            raise ValueError(f"unknown LLM feature {name!r}") from None
+
+    def _user_bucket(self, feature: str, limits: dict, user: str) -> TokenBucket:
+        key = (feature, user)
+        with self._lock:
+            bucket = self._user_buckets.get(key)
+            if bucket is None:
+                if len(self._user_buckets) >= self.MAX_USER_BUCKETS:
+                    # A full bucket is indistinguishable from a fresh one, so it can go.
+                    for stale in [k for k, b in self._user_buckets.items() if b.full]:
+                        del self._user_buckets[stale]
+                bucket = self._user_buckets[key] = TokenBucket(limits["user_rate"], limits["user_burst"], self._clock)
+            return bucket
+
+    def _remaining(self, deadline: float | None) -> float | None:
+        if deadline is None:
+            return None
+        remaining = deadline - self._clock()
+        if remaining <= 0:
+            raise LLMTimeout("deadline exceeded")
+        return remaining
+
+    def _take(self, bucket: TokenBucket, what: str, wait: bool, deadline: float | None) -> None:
+        while True:
+            delay = bucket.take()
+            if not delay:
+                return
+            remaining = self._remaining(deadline)
+            if not wait or (remaining is not None and delay > remaining):
+                raise QuotaExceeded(f"{what} quota exceeded", delay)
+            self._sleep(delay)
+
+    def _acquire(self, semaphore, deadline: float | None) -> None:
+        if not semaphore.acquire(timeout=self._remaining(deadline)):
+            raise LLMTimeout("no free LLM slot before the deadline")
+
+    def _charge_user(self, feature: str, user: str | None, wait: bool, deadline: float | None) -> None:
+        limits = self._feature(feature)
+        if user is not None and limits["user_rate"]:
+            self._take(self._user_bucket(feature, limits, user), f"{feature} per-user", wait, deadline)
+
+    def _admit(self, feature: str, wait: bool, deadline: float | None):
+        limits = self._feature(feature)
+        self._take(limits["bucket"], feature, wait, deadline)
+        self._acquire(limits["slots"], deadline)
+        try:
+            self._acquire(self._slots, deadline)
+        except BaseException:
+            limits["slots"].release()
+            raise
+        return limits["slots"]
+
+    def _timeout(self, deadline: float | None) -> float:
+        remaining = self._remaining(deadline)
+        return self.default_timeout if remaining is None else min(remaining, self.default_timeout)
+
+    def complete(self, prompt: str, schema: dict | None = None, *, feature: str, user: str | None = None,
+                 deadline: float | None = None, attempts: int = 1, wait: bool = False, validate=None,
+                 key: str | None = None):
+        """Call the provider through the limits, retrying failures up to ``attempts`` times.
+
+        ``validate(reply)`` may transform the reply or raise :class:`LLMError`
+        to have it retried like a failed call.  An open breaker is not retried.
+        Calls with the same ``key`` in flight at once share one provider call,
+        so they must also share ``validate``; see :func:`prompt_key`.
+        """
+        self._charge_user(feature, user, wait, deadline)
+
+        def call():
+            return self._complete(prompt, schema, feature, deadline, attempts, wait, validate)
+
+        return call() if key is None else self._flights.do(key, call)
+
+    def in_flight(self) -> int:
+        """Number of coalesced calls currently in flight."""
+        return self._flights.in_flight()
+
+    def _complete(self, prompt, schema, feature, deadline, attempts, wait, validate):
+        for attempt in range(1, attempts + 1):
+            feature_slots = self._admit(feature, wait, deadline)
+            try:
+                self.breaker.allow()
+                try:
+                    reply = self.provider.complete(prompt, schema, timeout=self._timeout(deadline))
+                except LLMError:
+                    self.breaker.record_failure()
+                    raise
+                self.breaker.record_success()
+                return validate(reply) if validate else reply
+            except CircuitOpen:
+                raise
+            except LLMError:
+                if attempt == attempts:
+                    raise
+            finally:
+                self._slots.release()
+                feature_slots.release()
+            pause = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+            remaining = self._remaining(deadline)
+            if remaining is not None and pause >= remaining:
+                raise LLMTimeout("deadline exceeded while backing off")
+            self._sleep(pause)
+
+    def stream(self, prompt: str, *, feature: str, user: str | None = None, deadline: float | None = None,
+               wait: bool = False) -> "_Stream":
+        """Admit the call now and return an iterator of text pieces.
+
+        Quota and slot errors are raised here rather than on first iteration;
+        the slots are held until the iterator is exhausted or closed.
+        """
+        self._charge_user(feature, user, wait, deadline)
+        feature_slots = self._admit(feature, wait, deadline)
+        release = [self._slots.release, feature_slots.release]
+        try:
+            self.breaker.allow()
+            return _Stream(self.provider.stream(prompt, timeout=self._timeout(deadline)), release, self.breaker)
+        except BaseException:
+            for fn in release:
+                fn()
+            raise
+
+
+class _Stream:
+    def __init__(self, chunks, release, breaker: CircuitBreaker):
+        self._chunks = chunks
+        self._release = release
+        self._breaker = breaker
+        self._started = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._breaker.record_success()
+            self.close()
+            raise
+        except LLMError:
+            self._breaker.record_failure()
+            self.close()
+            raise
+        except BaseException:
+            self.close()
+            raise
+        if not self._started:
+            self._started = True
+            self._breaker.record_success()
+        return chunk
+
+    def close(self) -> None:
+        if self._release:
+            release, self._release = self._release, None
+            self._chunks.close()
+            for fn in release:
+                fn()
@@ -0,0 +1,177 @@
+"""LLM providers.
+
+``HTTPProvider`` talks to an OpenAI-compatible chat completions endpoint.
+``FakeProvider`` is a deterministic local stand-in used in development and
+tests: it grades by word overlap between the reference and the student's
+answer, summarizes conversations by listing the student's questions and
+answers other prompts with a canned reply, streamed word by word, with
+optional artificial latency and failures.
+"""
+
+import json
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LLMError(Exception):
+    """The provider failed or returned something unusable."""
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class Provider:
+    def complete(self, prompt: str, schema: dict | None = None, timeout: float | None = None):
+        """Return the model's reply: a dict when ``schema`` is given, else text."""
+        raise NotImplementedError
+
+    def stream(self, prompt: str, timeout: float | None = None):
+        """Yield the text reply in pieces as it is generated.
+
+        Closing the generator abandons the request.
+        """
+        yield self.complete(prompt, timeout=timeout)
+
+
+class HTTPProvider(Provider):
+    """Calls go through one keep-alive :class:`requests.Session` with ``pool_size`` connections."""
+
+    def __init__(self, url: str, api_key: str | None, model: str, timeout: float, pool_size: int = 10):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, prompt: str, schema: dict | None) -> dict:
+        payload = {"model": self.model, "messages": [{"role": "user", "content": prompt}]}
+        if schema is not None:
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "result", "schema": schema},
+            }
+        return payload
+
+    def complete(self, prompt, schema=None, timeout=None):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            response = self.session.post(
+                self.url, json=self._payload(prompt, schema), headers=headers, timeout=timeout or self.timeout,
+            )
+            response.raise_for_status()
+            text = response.json()["choices"][0]["message"]["content"]
+        except requests.Timeout as exc:
+            raise LLMTimeout(str(exc)) from exc
+        except (requests.RequestException, KeyError, IndexError, ValueError) as exc:
+            raise LLMError(str(exc)) from exc
+        return _parse_reply(text, schema)
+
+    def stream(self, prompt, timeout=None):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            response = self.session.post(
+                self.url, json={**self._payload(prompt, None), "stream": True}, headers=headers,
+                timeout=timeout or self.timeout, stream=True,
+            )
+            response.raise_for_status()
+        except requests.Timeout as exc:
+            raise LLMTimeout(str(exc)) from exc
+        except requests.RequestException as exc:
+            raise LLMError(str(exc)) from exc
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                try:
+                    text = json.loads(data)["choices"][0]["delta"].get("content")
+                except (ValueError, KeyError, IndexError) as exc:
+                    raise LLMError(f"bad stream chunk: {data[:200]!r}") from exc
+                if text:
+                    yield text
+        except requests.RequestException as exc:
+            raise LLMError(str(exc)) from exc
+        finally:
+            response.close()
+
+
+def _parse_reply(text: str, schema: dict | None):
+    if schema is None:
+        return text
+    try:
+        return json.loads(text)
+    except ValueError as exc:
+        raise LLMError(f"reply is not JSON: {text[:200]!r}") from exc
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def words(text: str) -> set[str]:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2}
+
+
+def _field(prompt: str, label: str) -> str:
+    match = re.search(rf"{label}:\s*(.*)", prompt)
+    return match.group(1).strip() if match else ""
+
+
+class FakeProvider(Provider):
+    def __init__(self, latency: float = 0.0, fail: bool = False, token_delay: float = 0.0):
+        self.latency = latency
+        self.fail = fail
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def _grade(self, prompt: str) -> dict:
+        reference = words(_field(prompt, "Правильный ответ"))
+        answer = words(_field(prompt, "Ответ ученика"))
+        max_points = re.search(r"от 0 до (\d+)", prompt)
+        max_points = int(max_points.group(1)) if max_points else 0
+        overlap = len(reference & answer) / len(reference) if reference else 0.0
+        points = round(max_points * overlap)
+        return {
+            "is_correct": overlap >= 0.5,
+            "points_earned": points,
+            "feedback": f"Совпадение с эталоном: {round(overlap * 100)}%.",
+        }
+
+    def complete(self, prompt, schema=None, timeout=None):
+        self.calls += 1
+        if self.latency:
+            if timeout is not None and self.latency > timeout:
+                time.sleep(timeout)
+                raise LLMTimeout("fake provider timed out")
+            time.sleep(self.latency)
+        if self.fail:
+            raise LLMError("fake provider is failing")
+        if schema is not None:
+            return self._grade(prompt)
+        return self._answer(prompt)
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        if prompt.startswith("Обнови краткое содержание"):
+            previous = prompt.split("Текущее содержание:", 1)[1].split("Новые сообщения:", 1)[0].strip()
+            asked = re.findall(r"^Ученик: (.*)$", prompt, re.MULTILINE)
+            return "; ".join(([] if previous == "(пусто)" else [previous]) + asked)
+        question = _field(prompt, "Вопрос ученика").strip('"') or prompt.strip()[:200]
+        return f"Это учебный ответ на вопрос: {question}"
+
+    def stream(self, prompt, timeout=None):
+        self.calls += 1
+        if self.fail:
+            raise LLMError("fake provider is failing")
+        for token in re.findall(r"\S+\s*", self._answer(prompt)):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
@@ -0,0 +1,340 @@
+"""Database models.
+
+``Topic``, ``Assignment`` and ``UserProgress`` are generated from the JSON
+schemas in ``Entities/``; ``User`` is the platform's built-in entity and is
+declared here by hand.  Indexes are declared next to the entity they belong to
+and only cover the fields the pages actually filter and sort by.
+"""
+
+import uuid
+from datetime import date, datetime, timezone
+
+import sqlalchemy as sa
+from flask_login import UserMixin
+
+from .extensions import db
+from .schema import build_columns, load_schemas
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class EntityMixin:
+    """Columns and serialisation shared by every entity table."""
+
+    id = sa.Column(sa.String(32), primary_key=True, default=new_id)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+    updated_date = sa.Column(sa.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    created_by = sa.Column(sa.String(255))
+
+    entity_schema: dict
+
+    @classmethod
+    def field_names(cls) -> list[str]:
+        return [c.name for c in cls.__table__.columns]
+
+    def to_dict(self, fields=None) -> dict:
+        names = fields or self.field_names()
+        result = {}
+        for name in names:
+            value = getattr(self, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            result[name] = value
+        return result
+
+
+# Schema of the built-in User entity, in the same format as Entities/*.json.
+USER_SCHEMA = {
+    "name": "User",
+    "type": "object",
+    "properties": {
+        "email": {"type": "string"},
+        "full_name": {"type": "string"},
+        "role": {"type": "string", "enum": ["admin", "user"], "default": "user"},
+        "grade": {"type": "integer", "enum": [5, 6, 7, 8, 9, 10, 11]},
+        "total_points": {"type": "integer", "default": 0},
+        "level": {"type": "integer", "default": 1},
+    },
+    "required": ["email"],
+}
+
+
+class User(UserMixin, EntityMixin, db.Model):
+    __tablename__ = "users"
+    entity_schema = USER_SCHEMA
+
+    email = sa.Column(sa.String(255), nullable=False, unique=True)
+    full_name = sa.Column(sa.Text)
+    role = sa.Column(sa.String(16), nullable=False, default="user")
+    grade = sa.Column(sa.Integer)
+    total_points = sa.Column(sa.Integer, nullable=False, default=0)
+    level = sa.Column(sa.Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        sa.Index("ix_users_created_date", "created_date"),
+        sa.Index("ix_users_total_points", "total_points"),
+    )
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+# Composite indexes per generated entity, matching the pages' query shapes:
+# Learning filters topics by grade ordered by order_index, assignments by
+# topic, and progress by (created_by, topic_id, is_correct); the Progress page
+# reads a user's latest rows, which a backward scan of
+# (created_by, created_date, id) returns in created_date DESC order.
+ENTITY_INDEXES = {
+    "Topic": [("grade", "order_index")],
+    "Assignment": [("topic_id",)],
+    "UserProgress": [("created_by", "topic_id", "is_correct"), ("created_by", "created_date", "id")],
+}
+
+TABLE_NAMES = {
+    "Topic": "topic",
+    "Assignment": "assignment",
+    "UserProgress": "user_progress",
+}
+
+
+def _build_model(name: str, schema: dict):
+    table = TABLE_NAMES[name]
+    indexes = [sa.Index(f"ix_{table}_created_date", "created_date")]
+    for fields in ENTITY_INDEXES.get(name, []):
+        indexes.append(sa.Index(f"ix_{table}_{'_'.join(fields)}", *fields))
+    attrs = {
+        "__tablename__": table,
+        "__table_args__": tuple(indexes),
+        "entity_schema": schema,
+        **build_columns(schema),
+    }
+    return type(name, (EntityMixin, db.Model), attrs)
+
+
+_schemas = load_schemas()
+Topic = _build_model("Topic", _schemas["Topic"])
+Assignment = _build_model("Assignment", _schemas["Assignment"])
+UserProgress = _build_model("UserProgress", _schemas["UserProgress"])
+
+
+class UserTopicProgress(db.Model):
+    """Per-user, per-topic counters maintained on every submission.
+
+    ``solved`` counts distinct assignments answered correctly and
+    ``total_assignments`` mirrors the topic's assignment count, so a topic card
+    needs this one row to show its percentage.
+    """
+
+    __tablename__ = "user_topic_progress"
+
+    user_id = sa.Column(sa.String(32), primary_key=True)
+    topic_id = sa.Column(sa.String(64), primary_key=True)
+    attempted = sa.Column(sa.Integer, nullable=False, default=0)
+    correct = sa.Column(sa.Integer, nullable=False, default=0)
+    solved = sa.Column(sa.Integer, nullable=False, default=0)
+    total_assignments = sa.Column(sa.Integer, nullable=False, default=0)
+    updated_date = sa.Column(sa.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    __table_args__ = (sa.Index("ix_user_topic_progress_topic_id", "topic_id"),)
+
+    def to_dict(self) -> dict:
+        total = self.total_assignments
+        return {
+            "topic_id": self.topic_id,
+            "attempted": self.attempted,
+            "correct": self.correct,
+            "solved": self.solved,
+            "total_assignments": total,
+            "completed": self.correct > 0,
+            "percentage": round(min(self.solved, total) * 100 / total) if total else 0,
+        }
+
+
+class CollectionVersion(db.Model):
+    """Change counter per entity collection, bumped in the writing transaction."""
+
+    __tablename__ = "collection_versions"
+
+    name = sa.Column(sa.String(64), primary_key=True)
+    version = sa.Column(sa.Integer, nullable=False, default=0)
+
+
+class BackgroundJob(db.Model):
+    """Persisted state of a background job, so any worker can answer ``GET /api/jobs/<id>``."""
+
+    __tablename__ = "jobs"
+
+    id = sa.Column(sa.String(32), primary_key=True, default=new_id)
+    kind = sa.Column(sa.String(32), nullable=False)
+    owner = sa.Column(sa.String(255))
+    status = sa.Column(sa.String(16), nullable=False, default="queued")
+    done = sa.Column(sa.Integer, nullable=False, default=0)
+    total = sa.Column(sa.Integer)
+    result = sa.Column(sa.JSON)
+    error = sa.Column(sa.Text)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+    updated_date = sa.Column(sa.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    finished_date = sa.Column(sa.DateTime)
+
+    __table_args__ = (sa.Index("ix_jobs_status_updated_date", "status", "updated_date"),)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class GradingTicket(db.Model):
+    """A free-text answer queued for LLM grading; the client polls it by id."""
+
+    __tablename__ = "grading_tickets"
+
+    id = sa.Column(sa.String(32), primary_key=True, default=new_id)
+    progress_id = sa.Column(sa.String(32), nullable=False)
+    status = sa.Column(sa.String(16), nullable=False, default="queued")
+    attempts = sa.Column(sa.Integer, nullable=False, default=0)
+    error = sa.Column(sa.Text)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+    updated_date = sa.Column(sa.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    __table_args__ = (
+        sa.Index("ix_grading_tickets_progress_id", "progress_id"),
+        sa.Index("ix_grading_tickets_status_updated_date", "status", "updated_date"),
+    )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "degraded", "regrading", "failed")
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "progress_id": self.progress_id, "status": self.status, "error": self.error}
+
+
+class GradeCacheEntry(db.Model):
+    """A stored LLM grade, addressed by a hash of the assignment content and the normalized answer."""
+
+    __tablename__ = "grade_cache"
+
+    key = sa.Column(sa.String(64), primary_key=True)
+    assignment_id = sa.Column(sa.String(32), nullable=False)
+    is_correct = sa.Column(sa.Boolean, nullable=False)
+    points_earned = sa.Column(sa.Integer, nullable=False)
+    feedback = sa.Column(sa.Text)
+    hits = sa.Column(sa.Integer, nullable=False, default=0)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+    used_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (
+        sa.Index("ix_grade_cache_assignment_id", "assignment_id"),
+        sa.Index("ix_grade_cache_used_date", "used_date"),
+    )
+
+
+class ReviewDraft(db.Model):
+    """An AI grade proposed for a submission, waiting for a teacher to accept or reject it."""
+
+    __tablename__ = "review_drafts"
+
+    id = sa.Column(sa.String(32), primary_key=True, default=new_id)
+    progress_id = sa.Column(sa.String(32), nullable=False)
+    job_id = sa.Column(sa.String(32))
+    status = sa.Column(sa.String(16), nullable=False, default="draft")
+    is_correct = sa.Column(sa.Boolean)
+    points_earned = sa.Column(sa.Integer)
+    feedback = sa.Column(sa.Text)
+    error = sa.Column(sa.Text)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+    reviewed_by = sa.Column(sa.String(255))
+
+    __table_args__ = (
+        sa.Index("ix_review_drafts_progress_id", "progress_id"),
+        sa.Index("ix_review_drafts_status_created_date", "status", "created_date"),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "progress_id": self.progress_id,
+            "job_id": self.job_id,
+            "status": self.status,
+            "is_correct": self.is_correct,
+            "points_earned": self.points_earned,
+            "feedback": self.feedback,
+            "error": self.error,
+            "created_date": self.created_date.isoformat() if self.created_date else None,
+            "reviewed_by": self.reviewed_by,
+        }
+
+
+class HelperSession(db.Model):
+    """One AI helper conversation: a running summary of older turns plus the message log."""
+
+    __tablename__ = "helper_sessions"
+
+    id = sa.Column(sa.String(32), primary_key=True, default=new_id)
+    user_id = sa.Column(sa.String(32), nullable=False)
+    summary = sa.Column(sa.Text, nullable=False, default="")
+    summarized_seq = sa.Column(sa.Integer, nullable=False, default=0)
+    last_seq = sa.Column(sa.Integer, nullable=False, default=0)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+    updated_date = sa.Column(sa.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    __table_args__ = (
+        sa.Index("ix_helper_sessions_user_id_updated_date", "user_id", "updated_date"),
+        sa.Index("ix_helper_sessions_updated_date", "updated_date"),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "summary": self.summary,
+            "messages": self.last_seq,
+            "created_date": self.created_date.isoformat() if self.created_date else None,
+            "updated_date": self.updated_date.isoformat() if self.updated_date else None,
+        }
+
+
+class HelperMessage(db.Model):
+    __tablename__ = "helper_messages"
+
+    id = sa.Column(sa.String(32), primary_key=True, default=new_id)
+    session_id = sa.Column(sa.String(32), nullable=False)
+    seq = sa.Column(sa.Integer, nullable=False)
+    role = sa.Column(sa.String(16), nullable=False)
+    text = sa.Column(sa.Text, nullable=False)
+    created_date = sa.Column(sa.DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (sa.Index("ix_helper_messages_session_id_seq", "session_id", "seq", unique=True),)
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "role": self.role,
+            "text": self.text,
+            "created_date": self.created_date.isoformat() if self.created_date else None,
+        }
+
+
+ENTITIES = {
+    "User": User,
+    "Topic": Topic,
+    "Assignment": Assignment,
+    "UserProgress": UserProgress,
+}
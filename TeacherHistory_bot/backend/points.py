@@ -0,0 +1,40 @@
+"""Crediting points to users."""
+
+import sqlalchemy as sa
+
+from .extensions import db
+from .leaderboard import mark_changed
+from .models import User
+
+POINTS_PER_LEVEL = 100
+
+
+def locked_user(*criteria) -> User | None:
+    """Load the user matching ``criteria`` with its row locked until the transaction ends.
+
+    Take it before reading anything a points decision depends on, so that
+    concurrent submissions and grades for one user are serialized.
+    """
+    return db.session.scalar(
+        sa.select(User).where(*criteria).with_for_update().execution_options(populate_existing=True)
+    )
+
+
+def add_points(user_id: str, delta: int) -> tuple[int, int, int | None]:
+    """Atomically add ``delta`` points and recompute the level.
+
+    Returns the new ``(total_points, level, grade)``.  Must run inside the
+    caller's transaction; the row stays locked until it commits.
+    """
+    new_total = User.total_points + delta
+    db.session.execute(
+        sa.update(User)
+        .where(User.id == user_id)
+        .values(total_points=new_total, level=new_total // POINTS_PER_LEVEL + 1)
+        .execution_options(synchronize_session=False)
+    )
+    total, level, grade = db.session.execute(
+        sa.select(User.total_points, User.level, User.grade).where(User.id == user_id)
+    ).one()
+    mark_changed(db.session, user_id, total, grade)
+    return total, level, grade
@@ -0,0 +1,90 @@
+"""Local first-pass scoring of free-text answers.
+
+Most answers that reach the LLM do not need it: empty or one-word answers
+that miss the reference, answers that only restate the question, answers that
+reproduce the reference nearly word for word.  :func:`prescore` settles those
+from term overlap with ``correct_answer`` (over :func:`backend.text.tokenize`
+stems), answer length and overlap with the question, and marks everything else
+ambiguous for the LLM, including substantive answers that share no terms with
+the reference, which may be paraphrases.  Coverage counts only reference
+terms the question does not already contain, so copying the question earns
+nothing.
+
+:func:`degraded_grade` scores an ambiguous answer from the same coverage when
+the LLM cannot be reached.
+"""
+
+from dataclasses import dataclass
+
+from .text import tokenize
+
+# Coverage of the reference at or above which an answer is settled as correct.
+CORRECT_COVERAGE = 0.9
+# Share of the answer's terms taken from the question that marks a copied question.
+COPY_OVERLAP = 0.8
+MIN_TERMS = 3
+
+DEGRADED_FEEDBACK = (
+    "Ответ оценён автоматически по совпадению с эталоном, пока ИИ-проверка недоступна. "
+    "Оценка может быть уточнена позже."
+)
+
+
+@dataclass
+class PreScore:
+    settled: bool
+    coverage: float
+    is_correct: bool | None = None
+    points: int = 0
+    feedback: str | None = None
+
+    @property
+    def grade(self) -> tuple[bool, int, str | None]:
+        return self.is_correct, self.points, self.feedback
+
+
+def _normalized(text: str) -> str:
+    return " ".join(tokenize(text or ""))
+
+
+def _coverage(answer: set, reference: set, question: set) -> float:
+    novel = reference - question or reference
+    return len(answer & novel) / len(novel) if novel else 0.0
+
+
+def prescore(assignment, answer: str) -> PreScore:
+    answer_terms = set(tokenize(answer))
+    reference = set(tokenize(assignment.correct_answer or ""))
+    question = set(tokenize(assignment.question or ""))
+    max_points = assignment.points or 0
+    coverage = _coverage(answer_terms, reference, question)
+
+    def settle(is_correct: bool, feedback: str) -> PreScore:
+        return PreScore(True, coverage, is_correct, max_points if is_correct else 0, feedback)
+
+    if not answer_terms:
+        return settle(False, "Ответ пустой или не содержит слов по теме.")
+    if not reference:
+        return PreScore(False, coverage)
+    if _normalized(answer) == _normalized(assignment.correct_answer):
+        return settle(True, "Ответ совпадает с эталоном.")
+    copied = question and len(answer_terms & question) / len(answer_terms) >= COPY_OVERLAP
+    if copied and coverage < 0.2:
+        return settle(False, "Ответ повторяет формулировку задания, но не отвечает на него.")
+    if coverage >= CORRECT_COVERAGE:
+        return settle(True, "Ответ содержит все ключевые положения эталона.")
+    # A longer answer without the reference's terms may be a paraphrase; only the LLM can tell.
+    if coverage == 0 and len(answer_terms) < MIN_TERMS:
+        return settle(False, "Ответ слишком короткий и не содержит ключевых положений эталона.")
+    return PreScore(False, coverage)
+
+
+def degraded_grade(assignment, answer: str, score: PreScore | None = None) -> tuple[bool, int, str] | None:
+    """Coverage-based grade for when the LLM is unavailable; ``None`` if there is no reference to compare with."""
+    score = score or prescore(assignment, answer)
+    if score.settled:
+        return score.grade
+    if not tokenize(assignment.correct_answer or ""):
+        return None
+    share = min(max((score.coverage - 0.2) / 0.6, 0.0), 1.0)
+    return score.coverage >= 0.5, round((assignment.points or 0) * share), DEGRADED_FEEDBACK
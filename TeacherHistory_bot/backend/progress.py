@@ -0,0 +1,87 @@
+"""Progress page summary.
+
+Returns the aggregates the page used to compute from the user's whole progress
+history, and the latest activities already joined with their topic and
+assignment titles, so the payload does not grow with the question bank.
+The recent list is served by the ``(created_by, created_date, id)`` index,
+scanned backwards.
+"""
+
+import sqlalchemy as sa
+from flask import Blueprint, jsonify, request
+
+from .auth import current_user, login_required
+from .extensions import db
+from .models import Assignment, Topic, UserProgress
+from .query import count_true, percent
+
+bp = Blueprint("progress", __name__, url_prefix="/api/progress")
+
+SUBJECTS = ("history", "social_studies")
+
+
+def answer_stats(user) -> dict:
+    total, correct = db.session.execute(
+        sa.select(sa.func.count(UserProgress.id), count_true(UserProgress.is_correct))
+        .where(UserProgress.created_by == user.email)
+    ).one()
+    return {
+        "totalAnswers": total,
+        "correctAnswers": correct,
+        "totalPoints": user.total_points or 0,
+        "level": user.level or 1,
+        "accuracy": percent(correct, total),
+    }
+
+
+def subject_progress(user) -> dict:
+    result = {subject: {"total": 0, "completed": 0, "percentage": 0} for subject in SUBJECTS}
+    if user.grade is None:
+        return result
+    solved = (
+        sa.select(UserProgress.topic_id)
+        .where(UserProgress.created_by == user.email, UserProgress.is_correct.is_(True))
+        .distinct()
+        .subquery()
+    )
+    rows = db.session.execute(
+        sa.select(Topic.subject, sa.func.count(Topic.id), sa.func.count(solved.c.topic_id))
+        .outerjoin(solved, solved.c.topic_id == Topic.id)
+        .where(Topic.grade == user.grade)
+        .group_by(Topic.subject)
+    )
+    for subject, total, completed in rows:
+        result[subject] = {"total": total, "completed": completed, "percentage": percent(completed, total)}
+    return result
+
+
+def recent_activity(email: str, limit: int) -> list[dict]:
+    rows = db.session.execute(
+        sa.select(UserProgress, Topic.title, Topic.subject, Assignment.title, Assignment.type, Assignment.points)
+        .outerjoin(Topic, Topic.id == UserProgress.topic_id)
+        .outerjoin(Assignment, Assignment.id == UserProgress.assignment_id)
+        .where(UserProgress.created_by == email)
+        .order_by(UserProgress.created_date.desc(), UserProgress.id.desc())
+        .limit(limit)
+    )
+    activity = []
+    for progress, topic_title, subject, assignment_title, kind, points in rows:
+        item = progress.to_dict()
+        item["topic"] = {"id": progress.topic_id, "title": topic_title, "subject": subject} if topic_title else None
+        item["assignment"] = (
+            {"id": progress.assignment_id, "title": assignment_title, "type": kind, "points": points}
+            if assignment_title else None
+        )
+        activity.append(item)
+    return activity
+
+
+@bp.get("/summary")
+@login_required
+def summary():
+    limit = max(1, min(request.args.get("recent", 10, type=int), 100))
+    return jsonify(
+        stats=answer_stats(current_user),
+        subjects=subject_progress(current_user),
+        recent=recent_activity(current_user.email, limit),
+    )
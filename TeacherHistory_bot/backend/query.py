@@ -0,0 +1,208 @@
+"""Translate the entity SDK's ``filter(query, sort, limit)`` arguments into SQL.
+
+Listing supports keyset pagination: a cursor encodes the sort key values of the
+last row returned, and the next page starts strictly after it.  Unlike OFFSET
+this costs the same on page 1000 as on page 1 and does not skip or repeat rows
+when records are inserted between requests.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only
+
+from .errors import ApiError
+from .extensions import db
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _column(model, field: str):
+    column = model.__table__.columns.get(field)
+    if column is None:
+        raise ApiError(f"{model.__name__} has no field {field!r}")
+    return column
+
+
+def parse_sort(model, sort: str | None) -> list[tuple[sa.Column, bool]]:
+    """Parse ``"-created_date"`` / ``"grade,order_index"`` into (column, descending) keys.
+
+    ``id`` is always appended as a tie-breaker so that the ordering is total.
+    """
+    keys = []
+    for part in (sort or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        column = _column(model, part.lstrip("-+"))
+        if column.name != "id":
+            keys.append((column, part.startswith("-")))
+    keys.append((model.__table__.c.id, False))
+    return keys
+
+
+def order_clauses(keys) -> list:
+    clauses = []
+    for column, descending in keys:
+        clause = column.desc() if descending else column.asc()
+        # NULLs sort last in both directions so that keyset conditions are
+        # the same on every backend.
+        clauses.append(clause.nulls_last() if column.nullable else clause)
+    return clauses
+
+
+def _operand_list(op: str, value) -> list:
+    if not isinstance(value, list):
+        raise ApiError(f"{op} needs a list of values")
+    return value
+
+
+_OPERATORS = {
+    "$ne": lambda col, v: col.is_not(None) if v is None else sa.or_(col != v, col.is_(None)),
+    "$gt": lambda col, v: col > v,
+    "$gte": lambda col, v: col >= v,
+    "$lt": lambda col, v: col < v,
+    "$lte": lambda col, v: col <= v,
+    "$in": lambda col, v: col.in_(_operand_list("$in", v)),
+    "$nin": lambda col, v: sa.or_(col.not_in(_operand_list("$nin", v)), col.is_(None)),
+    "$contains": lambda col, v: col.ilike(f"%{v}%"),
+}
+
+
+def _field_clause(column, value):
+    if value is None:
+        return column.is_(None)
+    if isinstance(value, list):
+        return column.in_(value)
+    if isinstance(value, dict):
+        clauses = []
+        for op, operand in value.items():
+            if op not in _OPERATORS:
+                raise ApiError(f"unsupported operator {op!r}")
+            clauses.append(_OPERATORS[op](column, operand))
+        return sa.and_(*clauses)
+    return column == value
+
+
+def filter_clauses(model, criteria: dict | None) -> list:
+    """Equality filters plus ``$in``/``$gt``/``$contains``-style operators.
+
+    ``None`` matches NULL and a bare list matches any of its values.
+    """
+    if criteria is None:
+        return []
+    if not isinstance(criteria, dict):
+        raise ApiError("query must be a JSON object")
+    if "$or" in criteria:
+        criteria = dict(criteria)
+        alternatives = criteria.pop("$or")
+        if not isinstance(alternatives, list):
+            raise ApiError("$or must be a list of queries")
+        ors = [sa.and_(*filter_clauses(model, alt)) for alt in alternatives]
+        return [sa.or_(*ors), *filter_clauses(model, criteria)]
+    return [_field_clause(_column(model, field), value) for field, value in criteria.items()]
+
+
+def parse_fields(model, fields) -> list[str] | None:
+    """Parse a ``fields`` projection (``"id,title"`` or a list); ``id`` is always included."""
+    if fields in (None, "", []):
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        raise ApiError("fields must be a comma-separated string or a list of names")
+    names = ["id"]
+    for field in fields:
+        field = field.strip()
+        if field and field not in names:
+            names.append(_column(model, field).name)
+    return names
+
+
+def encode_cursor(keys, record) -> str:
+    values = []
+    for column, _ in keys:
+        value = getattr(record, column.key)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    payload = {"k": [("-" if desc else "") + col.name for col, desc in keys], "v": values}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(keys, cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        names, values = payload["k"], payload["v"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ApiError("malformed cursor") from None
+    if names != [("-" if desc else "") + col.name for col, desc in keys] or len(values) != len(keys):
+        raise ApiError("cursor does not match the requested sort")
+    decoded = []
+    for (column, _), value in zip(keys, values):
+        if value is not None and isinstance(column.type, sa.DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ApiError("malformed cursor") from None
+        decoded.append(value)
+    return decoded
+
+
+def _after(column, descending: bool, value):
+    """Rows that sort strictly after ``value`` on a single key (NULLs last)."""
+    if value is None:
+        return sa.false()
+    beyond = column < value if descending else column > value
+    return sa.or_(beyond, column.is_(None)) if column.nullable else beyond
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def keyset_clause(keys, values):
+    """``(k1, k2, ...) > (v1, v2, ...)`` in the sort order, expanded for mixed directions."""
+    alternatives = []
+    for i, (column, descending) in enumerate(keys):
+        prefix = [_equal(col, val) for (col, _), val in zip(keys[:i], values[:i])]
+        alternatives.append(sa.and_(*prefix, _after(column, descending, values[i])))
+    return sa.or_(*alternatives)
+
+
+def dialect_insert(model):
+    """``INSERT`` construct of the session's dialect, for ``on_conflict_do_update``."""
+    return _INSERTS[db.session.get_bind().dialect.name](model)
+
+
+def count_true(column):
+    """``SUM(CASE WHEN column THEN 1 ELSE 0 END)``, 0 for no rows; portable across backends."""
+    return sa.func.coalesce(sa.func.sum(sa.case((column, 1), else_=0)), 0)
+
+
+def percent(part: int, whole: int) -> int:
+    """``part`` as a rounded percentage of ``whole``, 0 when ``whole`` is 0."""
+    return round(part * 100 / whole) if whole else 0
+
+
+def build_select(model, criteria=None, sort=None, limit=None, cursor=None, fields=None, scope=()) -> sa.Select:
+    """SELECT for a list call; ``fields`` (from :func:`parse_fields`) limits the loaded columns.
+
+    ``scope`` holds extra clauses the caller's permissions add to ``criteria``.
+    """
+    keys = parse_sort(model, sort)
+    stmt = sa.select(model).where(*filter_clauses(model, criteria), *scope)
+    if fields:
+        # Sort keys are loaded too, since the next cursor is built from them.
+        needed = dict.fromkeys([*fields, *(column.name for column, _ in keys)])
+        stmt = stmt.options(load_only(*(getattr(model, name) for name in needed)))
+    if cursor:
+        stmt = stmt.where(keyset_clause(keys, decode_cursor(keys, cursor)))
+    stmt = stmt.order_by(*order_clauses(keys))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
@@ -0,0 +1,221 @@
+"""Curriculum retrieval for the AI helper.
+
+``Topic.content`` is split into chunks of about ``RETRIEVAL_CHUNK_TOKENS``
+(paragraphs packed together, long ones cut at sentence boundaries) and kept in
+an in-memory BM25 index over :func:`backend.text.tokenize` terms.  A question
+retrieves the best chunks of the student's grade, and :func:`context_for`
+packs the top ``RETRIEVAL_TOP_K`` of them into ``RETRIEVAL_TOKEN_BUDGET``.
+
+The index is built from the database on first use and then updated per topic
+from committed ``Topic`` changes (see the session hooks below), the same way
+as the leaderboard.  Changes made by other workers, or by bulk statements such
+as the course import, are picked up by the periodic rebuild after
+``RETRIEVAL_RESYNC_SECONDS`` or by :meth:`BM25Index.invalidate`.
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import Topic
+from .text import estimate_tokens, tokenize
+
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def chunk_text(text: str, max_tokens: int) -> list[str]:
+    """Split ``text`` into pieces of at most about ``max_tokens`` tokens."""
+    pieces = []
+    for paragraph in _PARAGRAPH.split(text or ""):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            words = sentence.split()
+            while words:  # a sentence longer than a chunk is cut by words
+                take, size = 0, 0
+                while take < len(words) and (take == 0 or size + estimate_tokens(words[take]) <= max_tokens):
+                    size += estimate_tokens(words[take])
+                    take += 1
+                pieces.append(" ".join(words[:take]))
+                words = words[take:]
+
+    chunks, current = [], ""
+    for piece in pieces:
+        joined = f"{current}\n\n{piece}" if current else piece
+        if current and estimate_tokens(joined) > max_tokens:
+            chunks.append(current)
+            current = piece
+        else:
+            current = joined
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class Chunk:
+    topic_id: str
+    grade: int | None
+    title: str
+    text: str
+    length: int
+
+
+class BM25Index:
+    """Okapi BM25 over topic chunks, updated one topic at a time."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._chunks: dict[int, Chunk] = {}
+        self._postings: dict[str, dict[int, int]] = {}
+        self._by_topic: dict[str, list[int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+        self.chunk_tokens = 200
+        self.loaded_at: float | None = None
+
+    def load(self, topics) -> None:
+        """Replace the index with ``(id, grade, title, content)`` rows."""
+        with self._lock:
+            self._chunks, self._postings, self._by_topic = {}, {}, {}
+            self._total_length = 0
+            for row in topics:
+                self._add(*row)
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.loaded_at = None
+
+    def _add(self, topic_id, grade, title, content) -> None:
+        ids = []
+        for text in chunk_text(content, self.chunk_tokens):
+            terms = Counter(tokenize(f"{title}\n{text}"))
+            if not terms:
+                continue
+            self._next_id += 1
+            length = sum(terms.values())
+            self._chunks[self._next_id] = Chunk(topic_id, grade, title or "", text, length)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[self._next_id] = tf
+            self._total_length += length
+            ids.append(self._next_id)
+        self._by_topic[topic_id] = ids
+
+    def _remove(self, topic_id) -> None:
+        for chunk_id in self._by_topic.pop(topic_id, []):
+            chunk = self._chunks.pop(chunk_id)
+            self._total_length -= chunk.length
+            for term in set(tokenize(f"{chunk.title}\n{chunk.text}")):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def update(self, topic_id: str, grade, title, content) -> None:
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            self._remove(topic_id)
+            self._add(topic_id, grade, title, content)
+
+    def discard(self, topic_id: str) -> None:
+        with self._lock:
+            self._remove(topic_id)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def search(self, query: str, k: int, grade=None) -> list[tuple[float, Chunk]]:
+        """The ``k`` best chunks for ``query``; ``grade`` restricts them to one grade's topics."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._chunks)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+            scores: Counter = Counter()
+            for term in terms:
+                postings = self._postings.get(term, {})
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    chunk = self._chunks[chunk_id]
+                    if grade is not None and chunk.grade != grade:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * chunk.length / avg_length)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(score, self._chunks[chunk_id]) for chunk_id, score in best]
+
+
+index = BM25Index()
+
+
+def ensure_loaded() -> BM25Index:
+    max_age = current_app.config["RETRIEVAL_RESYNC_SECONDS"]
+    if index.loaded_at is None or time.monotonic() - index.loaded_at > max_age:
+        index.chunk_tokens = current_app.config["RETRIEVAL_CHUNK_TOKENS"]
+        index.load(db.session.execute(sa.select(Topic.id, Topic.grade, Topic.title, Topic.content)))
+    return index
+
+
+def context_for(question: str, grade=None) -> list[Chunk]:
+    """The most relevant chunks for ``question`` that fit in the token budget, best first."""
+    config = current_app.config
+    budget = config["RETRIEVAL_TOKEN_BUDGET"]
+    selected = []
+    for _, chunk in ensure_loaded().search(question, config["RETRIEVAL_TOP_K"], grade):
+        cost = estimate_tokens(chunk.title) + estimate_tokens(chunk.text)
+        if cost <= budget:
+            selected.append(chunk)
+            budget -= cost
+    return selected
+
+
+# -- keep the index in step with committed Topic changes ----------------------
+
+_PENDING = "retrieval_pending"
+
+
+@sa.event.listens_for(Session, "after_flush")
+def _collect_topic_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING, {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Topic):
+            pending[obj.id] = (obj.grade, obj.title, obj.content)
+    for obj in session.deleted:
+        if isinstance(obj, Topic):
+            pending[obj.id] = None
+
+
+@sa.event.listens_for(Session, "after_commit")
+def _apply_topic_changes(session):
+    for topic_id, change in session.info.pop(_PENDING, {}).items():
+        if change is None:
+            index.discard(topic_id)
+        else:
+            index.update(topic_id, *change)
+
+
+@sa.event.listens_for(Session, "after_rollback")
+def _drop_topic_changes(session):
+    session.info.pop(_PENDING, None)
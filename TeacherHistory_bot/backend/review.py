@@ -0,0 +1,209 @@
+"""Bulk AI review of free-text submissions for the admin AssignmentReview tab.
+
+``POST /api/review/ai`` starts a background job that grades every pending
+non-test submission (no feedback yet, or never graded), optionally narrowed to
+one ``assignment_id``, ``topic_id`` or ``progress_id``, with up to
+``REVIEW_WORKERS`` LLM calls in flight, retrying each one on failure.  The
+client follows the job's ``done``/``total`` counter through
+``GET /api/jobs/<id>``.  A review started twice shares the LLM calls still in
+flight for the same answers.
+
+Grades are not applied directly: each becomes a :class:`ReviewDraft` that a
+teacher accepts (optionally correcting it) or rejects.  Accepting writes the
+grade to the submission and adjusts the student's points, as does
+``POST /api/review/grade/<progress_id>`` for a grade the teacher sets by hand.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import sqlalchemy as sa
+from flask import Blueprint, current_app, jsonify, request
+
+from . import grade_cache, llm
+from .auth import admin_required, current_user
+from .errors import ApiError, NotFound
+from .extensions import db
+from .grading import apply_grade, build_prompt, grade_answer
+from .jobs import runner
+from .models import Assignment, GradingTicket, ReviewDraft, UserProgress
+from .prescore import prescore
+
+bp = Blueprint("review", __name__, url_prefix="/api/review")
+
+
+def pending_query(criteria: dict):
+    """Non-test submissions that still need a grade.
+
+    Submissions with an open, accepted or rejected draft, or with a grading
+    ticket still in the queue or being regraded, are left out, so an accepted
+    grade without feedback is not sent to the LLM again.  Only failed drafts
+    are retried, and a review asked for one ``progress_id`` overrides an
+    earlier rejection.
+    """
+    skipped = ("draft", "accepted") if criteria.get("progress_id") else ("draft", "accepted", "rejected")
+    open_drafts = sa.select(ReviewDraft.progress_id).where(ReviewDraft.status.in_(skipped))
+    active_tickets = sa.select(GradingTicket.progress_id).where(
+        GradingTicket.status.in_(("queued", "running", "regrading"))
+    )
+    stmt = (
+        sa.select(UserProgress.id, UserProgress.user_answer, Assignment)
+        .join(Assignment, Assignment.id == UserProgress.assignment_id)
+        .where(
+            Assignment.type != "test",
+            sa.or_(UserProgress.ai_feedback.is_(None), UserProgress.is_correct.is_(None)),
+            UserProgress.id.not_in(open_drafts),
+            UserProgress.id.not_in(active_tickets),
+        )
+        .order_by(UserProgress.created_date, UserProgress.id)
+    )
+    if criteria.get("assignment_id"):
+        stmt = stmt.where(UserProgress.assignment_id == criteria["assignment_id"])
+    if criteria.get("topic_id"):
+        stmt = stmt.where(UserProgress.topic_id == criteria["topic_id"])
+    if criteria.get("progress_id"):
+        stmt = stmt.where(UserProgress.id == criteria["progress_id"])
+    return stmt
+
+
+def review_pending(job, criteria: dict) -> dict:
+    """Draft an AI grade for every pending submission.
+
+    Answers the pre-scorer settles or the grade cache knows are drafted
+    straight away.  The rest go to the LLM on a bounded pool; drafts are
+    written from the job thread as the calls complete, one commit per
+    submission, so progress is visible and a crash keeps what was already
+    drafted.
+    """
+    gateway = llm.get_gateway()
+    rows = db.session.execute(pending_query(criteria)).all()
+    job.total = len(rows)
+    counts = {"drafted": 0, "failed": 0}
+    if not rows:
+        return counts
+
+    misses = []
+    for progress_id, answer, assignment in rows:
+        score = prescore(assignment, answer)
+        grade = score.grade if score.settled else grade_cache.lookup(assignment, answer)
+        if grade is None:
+            misses.append((progress_id, answer, assignment))
+            continue
+        db.session.add(ReviewDraft(progress_id=progress_id, job_id=job.id, is_correct=grade[0],
+                                   points_earned=grade[1], feedback=grade[2]))
+        counts["drafted"] += 1
+    db.session.commit()
+    job.advance(counts["drafted"])
+
+    workers = current_app.config["REVIEW_WORKERS"]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clio-review") as pool:
+        futures = {
+            pool.submit(grade_answer, gateway, build_prompt(row[2], row[1]), row[2].points or 0, "review",
+                        key=grade_cache.cache_key(row[2], row[1])): row
+            for row in misses
+        }
+        for future in as_completed(futures):
+            progress_id, answer, assignment = futures[future]
+            draft = ReviewDraft(progress_id=progress_id, job_id=job.id)
+            try:
+                draft.is_correct, draft.points_earned, draft.feedback = grade = future.result()
+                grade_cache.store(assignment, answer, grade)
+                counts["drafted"] += 1
+            except llm.LLMError as exc:
+                draft.status, draft.error = "failed", str(exc)
+                counts["failed"] += 1
+            db.session.add(draft)
+            db.session.commit()
+            job.advance()
+    return counts
+
+
+def _draft_with_progress(draft: ReviewDraft) -> dict:
+    progress = db.session.get(UserProgress, draft.progress_id)
+    return {**draft.to_dict(), "progress": progress.to_dict() if progress else None}
+
+
+def _open_draft(draft_id: str) -> ReviewDraft:
+    draft = db.session.get(ReviewDraft, draft_id)
+    if draft is None:
+        raise NotFound(f"ReviewDraft {draft_id} not found")
+    if draft.status != "draft":
+        raise ApiError(f"draft is already {draft.status}", 409)
+    return draft
+
+
+@bp.post("/ai")
+@admin_required
+def start_review():
+    body = request.get_json(silent=True) or {}
+    criteria = {key: body[key] for key in ("assignment_id", "topic_id", "progress_id") if body.get(key)}
+    job = runner.submit("ai_review", review_pending, criteria, owner=current_user.email)
+    return jsonify(job.to_dict()), 202
+
+
+@bp.get("/drafts")
+@admin_required
+def list_drafts():
+    stmt = sa.select(ReviewDraft).order_by(ReviewDraft.created_date, ReviewDraft.id)
+    status = request.args.get("status", "draft")
+    if status != "all":
+        stmt = stmt.where(ReviewDraft.status == status)
+    if request.args.get("job_id"):
+        stmt = stmt.where(ReviewDraft.job_id == request.args["job_id"])
+    return jsonify([_draft_with_progress(draft) for draft in db.session.scalars(stmt)])
+
+
+def _graded_submission(progress_id: str) -> tuple[UserProgress, Assignment]:
+    progress = db.session.get(UserProgress, progress_id)
+    assignment = db.session.get(Assignment, progress.assignment_id) if progress else None
+    if assignment is None:
+        raise NotFound("submission or assignment no longer exists")
+    return progress, assignment
+
+
+def _read_grade(assignment, is_correct=None, points=None, feedback=None) -> tuple[bool, int, str | None]:
+    """The grade in the request body, falling back to the given values; points are clamped."""
+    body = request.get_json(silent=True) or {}
+    is_correct = body.get("is_correct", is_correct)
+    points = body.get("points_earned", points)
+    feedback = body.get("feedback", feedback)
+    if not isinstance(is_correct, bool):
+        raise ApiError("is_correct must be a boolean")
+    if isinstance(points, bool) or not isinstance(points, (int, float)):
+        raise ApiError("points_earned must be a number")
+    if feedback is not None and not isinstance(feedback, str):
+        raise ApiError("feedback must be a string")
+    return is_correct, max(0, min(int(points), assignment.points or 0)), feedback
+
+
+@bp.post("/grade/<progress_id>")
+@admin_required
+def grade_submission(progress_id):
+    progress, assignment = _graded_submission(progress_id)
+    delta = apply_grade(progress, *_read_grade(assignment))
+    db.session.commit()
+    return jsonify({"progress": progress.to_dict(), "delta": delta})
+
+
+@bp.post("/drafts/<draft_id>/accept")
+@admin_required
+def accept_draft(draft_id):
+    draft = _open_draft(draft_id)
+    if draft.is_correct is None:
+        raise ApiError("draft has no grade to accept", 409)
+    progress, assignment = _graded_submission(draft.progress_id)
+    is_correct, points, feedback = _read_grade(assignment, draft.is_correct, draft.points_earned, draft.feedback)
+
+    delta = apply_grade(progress, is_correct, points, feedback)
+    draft.status, draft.reviewed_by = "accepted", current_user.email
+    draft.is_correct, draft.points_earned, draft.feedback = is_correct, points, feedback
+    db.session.commit()
+    return jsonify({"draft": draft.to_dict(), "progress": progress.to_dict(), "delta": delta})
+
+
+@bp.post("/drafts/<draft_id>/reject")
+@admin_required
+def reject_draft(draft_id):
+    draft = _open_draft(draft_id)
+    draft.status, draft.reviewed_by = "rejected", current_user.email
+    db.session.commit()
+    return jsonify(draft.to_dict())
@@ -0,0 +1,107 @@
+"""Entity schemas from ``Entities/*.json``: loading, column mapping and validation.
+
+The JSON files are the single source of truth for the entity fields; the
+SQLAlchemy tables in :mod:`backend.models` are generated from them.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from .errors import ApiError
+
+ENTITIES_DIR = Path(__file__).resolve().parent.parent / "Entities"
+
+# Fields every entity gets from the platform, whatever its schema says.
+BUILTIN_FIELDS = ("id", "created_date", "updated_date", "created_by")
+
+
+@lru_cache(maxsize=None)
+def load_schemas() -> dict[str, dict]:
+    """Return every entity schema keyed by its ``name``."""
+    schemas = {}
+    for path in sorted(ENTITIES_DIR.glob("*.json")):
+        with path.open(encoding="utf-8") as fh:
+            schema = json.load(fh)
+        schemas[schema["name"]] = schema
+    return schemas
+
+
+def column_type(name: str, spec: dict) -> sa.types.TypeEngine:
+    """Map a JSON-schema property to a column type."""
+    kind = spec.get("type")
+    if kind == "integer":
+        return sa.Integer()
+    if kind == "number":
+        return sa.Float()
+    if kind == "boolean":
+        return sa.Boolean()
+    if kind in ("array", "object"):
+        return sa.JSON()
+    # References and enums are short and indexed; free text is unbounded.
+    if name.endswith("_id") or "enum" in spec:
+        return sa.String(64)
+    return sa.Text()
+
+
+def build_columns(schema: dict) -> dict[str, sa.Column]:
+    columns = {}
+    for name, spec in schema["properties"].items():
+        columns[name] = sa.Column(
+            name,
+            column_type(name, spec),
+            nullable=True,
+            default=spec.get("default"),
+        )
+    return columns
+
+
+def _check_type(field: str, spec: dict, value):
+    kind = spec.get("type")
+    if value is None:
+        return None
+    if kind == "integer":
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or int(value) != value:
+            raise ApiError(f"{field}: expected integer")
+        value = int(value)
+    elif kind == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ApiError(f"{field}: expected number")
+    elif kind == "boolean":
+        if not isinstance(value, bool):
+            raise ApiError(f"{field}: expected boolean")
+    elif kind == "string":
+        if not isinstance(value, str):
+            raise ApiError(f"{field}: expected string")
+    elif kind == "array":
+        if not isinstance(value, list):
+            raise ApiError(f"{field}: expected array")
+    if "enum" in spec and value not in spec["enum"]:
+        raise ApiError(f"{field}: must be one of {spec['enum']}")
+    return value
+
+
+def validate(schema: dict, data: dict, partial: bool = False) -> dict:
+    """Validate ``data`` against ``schema`` and return the writable fields.
+
+    Built-in fields are ignored rather than rejected so that clients can send
+    back a record they previously read.  ``partial`` skips the required-field
+    check for updates.
+    """
+    if not isinstance(data, dict):
+        raise ApiError("request body must be a JSON object")
+    properties = schema["properties"]
+    cleaned = {}
+    for field, value in data.items():
+        if field in BUILTIN_FIELDS:
+            continue
+        if field not in properties:
+            raise ApiError(f"{schema['name']} has no field {field!r}")
+        cleaned[field] = _check_type(field, properties[field], value)
+    if not partial:
+        missing = [f for f in schema.get("required", []) if cleaned.get(f) in (None, "")]
+        if missing:
+            raise ApiError(f"missing required fields: {', '.join(missing)}")
+    return cleaned
@@ -0,0 +1,119 @@
+"""Aggregated statistics for the admin StatisticViewer, computed with GROUP BY.
+
+Both endpoints return objects keyed by grade (as a string, ``"none"`` for users
+who have not picked one yet) plus an ``"all"`` entry, so the grade selector can
+switch without another request.
+"""
+
+import sqlalchemy as sa
+from flask import Blueprint, jsonify, request
+
+from .auth import admin_required
+from .errors import ApiError
+from .extensions import db
+from .models import Topic, User, UserProgress
+from .query import count_true, percent
+
+bp = Blueprint("stats", __name__, url_prefix="/api/stats")
+
+
+def _grade_key(grade) -> str:
+    return "none" if grade is None else str(grade)
+
+
+def _requested_grade():
+    grade = request.args.get("grade")
+    if grade in (None, "", "all"):
+        return None
+    try:
+        return int(grade)
+    except ValueError:
+        raise ApiError("grade must be an integer") from None
+
+
+def grade_stats(grade=None) -> dict:
+    users = sa.select(
+        User.grade,
+        sa.func.count(User.id),
+        count_true(User.total_points > 0),
+        sa.func.coalesce(sa.func.sum(User.total_points), 0),
+    ).group_by(User.grade)
+    answers = (
+        sa.select(User.grade, sa.func.count(UserProgress.id), count_true(UserProgress.is_correct))
+        .join(User, User.email == UserProgress.created_by)
+        .group_by(User.grade)
+    )
+    if grade is not None:
+        users = users.where(User.grade == grade)
+        answers = answers.where(User.grade == grade)
+
+    totals = {}
+    for g, total, active, points in db.session.execute(users):
+        totals[_grade_key(g)] = [total, active, points, 0, 0]
+    for g, answered, correct in db.session.execute(answers):
+        row = totals.setdefault(_grade_key(g), [0, 0, 0, 0, 0])
+        row[3], row[4] = answered, correct
+    totals["all"] = [sum(col) for col in zip(*totals.values())] if totals else [0] * 5
+
+    return {
+        key: {
+            "totalUsers": total,
+            "activeUsers": active,
+            "totalAnswers": answered,
+            "correctAnswers": correct,
+            "accuracy": percent(correct, answered),
+            "avgPoints": round(points / total) if total else 0,
+        }
+        for key, (total, active, points, answered, correct) in totals.items()
+    }
+
+
+def topic_stats(grade=None) -> dict:
+    attempts = (
+        sa.select(
+            UserProgress.topic_id.label("topic_id"),
+            sa.func.count(UserProgress.id).label("attempts"),
+            sa.func.count(sa.distinct(UserProgress.created_by)).label("unique_users"),
+            count_true(UserProgress.is_correct).label("completions"),
+        )
+        .group_by(UserProgress.topic_id)
+        .subquery()
+    )
+    stmt = sa.select(
+        Topic.id, Topic.title, Topic.subject, Topic.grade, Topic.is_premium,
+        sa.func.coalesce(attempts.c.attempts, 0),
+        sa.func.coalesce(attempts.c.unique_users, 0),
+        sa.func.coalesce(attempts.c.completions, 0),
+    ).outerjoin(attempts, attempts.c.topic_id == Topic.id)
+    if grade is not None:
+        stmt = stmt.where(Topic.grade == grade)
+    stmt = stmt.order_by(sa.desc(sa.func.coalesce(attempts.c.attempts, 0)), Topic.id)
+
+    result = {"all": []}
+    for id_, title, subject, topic_grade, premium, tried, unique, completed in db.session.execute(stmt):
+        item = {
+            "id": id_,
+            "title": title,
+            "subject": subject,
+            "grade": topic_grade,
+            "is_premium": premium,
+            "attempts": tried,
+            "uniqueUsers": unique,
+            "completions": completed,
+            "completionRate": percent(completed, tried),
+        }
+        result.setdefault(_grade_key(topic_grade), []).append(item)
+        result["all"].append(item)
+    return result
+
+
+@bp.get("/grades")
+@admin_required
+def grades():
+    return jsonify(grade_stats(_requested_grade()))
+
+
+@bp.get("/topics")
+@admin_required
+def topics():
+    return jsonify(topic_stats(_requested_grade()))
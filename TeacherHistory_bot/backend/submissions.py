@@ -0,0 +1,109 @@
+"""Answer submission: one request, one transaction.
+
+``POST /api/submissions`` replaces the Learning page's ``UserProgress.create``
++ ``User.updateMyUserData`` + reload sequence.  Points are added with an
+``UPDATE ... SET total_points = total_points + n`` so concurrent submissions
+cannot overwrite each other, and the response carries everything the page
+needs to update its state without reloading.  Test answers, and free-text
+answers the local pre-scorer can settle, are graded inline; other free-text
+answers are stored ungraded and handed to the grading queue, and the response
+carries the ticket to poll (see :mod:`backend.grading`).
+"""
+
+import sqlalchemy as sa
+from flask import Blueprint, jsonify, request
+
+from . import grading
+from .auth import current_user, login_required
+from .errors import ApiError, NotFound
+from .extensions import db
+from .models import Assignment, GradingTicket, User, UserProgress
+from .points import add_points, locked_user
+from .prescore import prescore
+from .topic_progress import record_attempt
+
+bp = Blueprint("submissions", __name__, url_prefix="/api/submissions")
+
+
+def grade_test(assignment, answer: str) -> tuple[bool, int]:
+    is_correct = answer == assignment.correct_answer
+    return is_correct, (assignment.points or 0) if is_correct else 0
+
+
+def record_submission(user, assignment, answer: str, is_correct: bool | None, points: int,
+                      feedback: str | None = None) -> dict:
+    """Insert the progress row and credit the points in the current transaction.
+
+    Points are only credited for the first correct answer to an assignment, so a
+    double submit cannot earn them twice: the user row is locked before prior
+    attempts are counted, which serializes concurrent submissions by the same
+    user.  ``is_correct=None`` stores the answer ungraded, for the grading queue
+    to fill in.
+    """
+    locked_user(User.id == user.id)
+    previous = db.session.execute(
+        sa.select(sa.func.count(UserProgress.id), sa.func.max(sa.case((UserProgress.is_correct, 1), else_=0)))
+        .where(UserProgress.created_by == user.email, UserProgress.assignment_id == assignment.id)
+    ).one()
+    attempts, solved_before = previous[0], bool(previous[1])
+    if solved_before:
+        points = 0
+
+    progress = UserProgress(
+        topic_id=assignment.topic_id,
+        assignment_id=assignment.id,
+        user_answer=answer,
+        is_correct=is_correct,
+        points_earned=points,
+        ai_feedback=feedback,
+        attempt_number=attempts + 1,
+        created_by=user.email,
+    )
+    db.session.add(progress)
+    db.session.flush()
+    first_solve = bool(is_correct) and not solved_before
+    topic = record_attempt(user.id, assignment.topic_id, is_correct, first_solve) if assignment.topic_id else None
+
+    old_level = user.level or 1
+    total, level, _ = add_points(user.id, points) if points else (user.total_points, old_level, user.grade)
+    return {
+        "progress": progress.to_dict(),
+        "user": {"id": user.id, "total_points": total, "level": level},
+        "topic": topic.to_dict() if topic else None,
+        "delta": {
+            "points_earned": points,
+            "level_up": level > old_level,
+            "first_solve": first_solve,
+        },
+    }
+
+
+@bp.post("")
+@login_required
+def submit():
+    body = request.get_json(silent=True) or {}
+    answer = body.get("user_answer")
+    if not isinstance(answer, str) or not answer.strip():
+        raise ApiError("user_answer is required")
+    assignment = db.session.get(Assignment, body.get("assignment_id") or "")
+    if assignment is None:
+        raise NotFound("assignment not found")
+
+    if assignment.type == "test":
+        is_correct, points = grade_test(assignment, answer)
+        result = record_submission(current_user, assignment, answer, is_correct, points)
+        db.session.commit()
+        return jsonify(result), 201
+
+    score = prescore(assignment, answer)
+    if score.settled:
+        result = record_submission(current_user, assignment, answer, *score.grade)
+        db.session.commit()
+        return jsonify(result), 201
+
+    result = record_submission(current_user, assignment, answer, None, 0)
+    ticket = GradingTicket(progress_id=result["progress"]["id"])
+    db.session.add(ticket)
+    db.session.commit()
+    grading.queue.enqueue(ticket.id)
+    return jsonify({**result, "ticket": ticket.to_dict()}), 202
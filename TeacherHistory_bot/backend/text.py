@@ -0,0 +1,55 @@
+"""Russian text tokenization for the local search indexes.
+
+Words are lower-cased, ``ё`` is folded into ``е``, stop words are dropped and
+a light suffix stripper removes the common inflectional endings, so that
+"причины Первой мировой войны" and "причина первая мировая война" share all
+their terms.  It is deliberately cruder than a real stemmer: it only has to
+make the same word in different cases and numbers look alike.
+"""
+
+import re
+
+_WORD = re.compile(r"[0-9a-zа-я]+")
+
+STOP_WORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всё всего всех вы где да даже для до его
+    ее её если есть еще ещё же за здесь и из или им их к как какие какой когда кто ли либо мне может мы на
+    над надо наш не него нее неё нет ни них но ну о об однако он она они оно от очень по под при про с со
+    так также такой там те тем то того тоже той только том ты у уже хотя чего чей чем что чтобы чье чья эта
+    эти это этого этой этом я расскажи объясни почему зачем
+""".split())
+
+# Longest first, so "ами" is tried before "и".
+_ENDINGS = sorted("""
+    иями ями ами ием иях ях ах ов ев ей ий ый ой ая яя ое ее ые ие ого его ому ему ым им ом ем ую юю
+    ых их ия ья ье ию ью ам ям а я о е ы и у ю ь ть ться ся
+""".split(), key=len, reverse=True)
+MIN_STEM = 3
+
+# Stop words for search, but they decide what a question asks: "Почему началась
+# война" and "Когда началась война" share every other term.
+QUESTION_WORDS = frozenset("""
+    где зачем как какие какой когда кто куда откуда почему сколько чей чем что чье чья
+""".split())
+
+
+def stem(word: str) -> str:
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    words = _WORD.findall(text.lower().replace("ё", "е"))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+def question_words(text: str) -> frozenset[str]:
+    """The :data:`QUESTION_WORDS` that occur in ``text``."""
+    return frozenset(_WORD.findall(text.lower().replace("ё", "е"))) & QUESTION_WORDS
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count; Cyrillic text runs at about three characters per token."""
+    return len(text) // 3 + 1
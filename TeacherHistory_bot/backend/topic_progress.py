@@ -0,0 +1,122 @@
+"""Maintenance of the ``user_topic_progress`` summary table.
+
+Submissions update a user's row incrementally with an upsert.  Writes that go
+through the generic entity API (admin reviews, manual edits) recompute the
+affected row from ``user_progress``, and assignment changes refresh the
+``total_assignments`` column of every row for that topic.  ``flask
+rebuild-topic-progress`` recomputes the whole table.
+"""
+
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+
+from .extensions import db
+from .models import Assignment, User, UserProgress, UserTopicProgress, utcnow
+from .query import count_true, dialect_insert
+
+
+def _upsert(values: dict, increments: dict):
+    """INSERT ``values`` or, on conflict, add ``increments`` to the existing row."""
+    stmt = dialect_insert(UserTopicProgress).values(**values)
+    table = UserTopicProgress.__table__
+    updates = {name: table.c[name] + amount for name, amount in increments.items()}
+    updates["total_assignments"] = stmt.excluded.total_assignments
+    updates["updated_date"] = values["updated_date"]
+    db.session.execute(stmt.on_conflict_do_update(index_elements=["user_id", "topic_id"], set_=updates))
+
+
+def assignment_count(topic_id: str) -> int:
+    return db.session.scalar(
+        sa.select(sa.func.count(Assignment.id)).where(Assignment.topic_id == topic_id)
+    )
+
+
+def record_attempt(user_id: str, topic_id: str, is_correct: bool, first_solve: bool) -> UserTopicProgress:
+    """Count one submission; ``first_solve`` marks a newly solved assignment."""
+    increments = {"attempted": 1, "correct": int(bool(is_correct)), "solved": int(first_solve)}
+    _upsert(
+        {
+            "user_id": user_id,
+            "topic_id": topic_id,
+            **increments,
+            "total_assignments": assignment_count(topic_id),
+            "updated_date": utcnow(),
+        },
+        increments,
+    )
+    return db.session.get(UserTopicProgress, (user_id, topic_id), populate_existing=True)
+
+
+def _aggregate(where):
+    return (
+        sa.select(
+            User.id,
+            UserProgress.topic_id,
+            sa.func.count(UserProgress.id),
+            count_true(UserProgress.is_correct),
+            sa.func.count(sa.distinct(sa.case((UserProgress.is_correct, UserProgress.assignment_id)))),
+        )
+        .join(User, User.email == UserProgress.created_by)
+        .where(where, UserProgress.topic_id.is_not(None))
+        .group_by(User.id, UserProgress.topic_id)
+    )
+
+
+def recompute(email: str, topic_ids) -> None:
+    """Rebuild one user's rows for ``topic_ids`` from their progress history."""
+    topic_ids = [t for t in set(topic_ids) if t]
+    user_id = db.session.scalar(sa.select(User.id).where(User.email == email))
+    if user_id is None or not topic_ids:
+        return
+    db.session.execute(
+        sa.delete(UserTopicProgress)
+        .where(UserTopicProgress.user_id == user_id, UserTopicProgress.topic_id.in_(topic_ids))
+    )
+    _insert_aggregates(_aggregate(sa.and_(UserProgress.created_by == email, UserProgress.topic_id.in_(topic_ids))))
+
+
+def _insert_aggregates(stmt) -> None:
+    rows = db.session.execute(stmt).all()
+    if not rows:
+        return
+    totals = dict(db.session.execute(
+        sa.select(Assignment.topic_id, sa.func.count(Assignment.id))
+        .where(Assignment.topic_id.in_({row[1] for row in rows}))
+        .group_by(Assignment.topic_id)
+    ).all())
+    now = utcnow()
+    db.session.execute(sa.insert(UserTopicProgress), [
+        {
+            "user_id": user_id, "topic_id": topic_id, "attempted": attempted, "correct": correct,
+            "solved": solved, "total_assignments": totals.get(topic_id, 0), "updated_date": now,
+        }
+        for user_id, topic_id, attempted, correct, solved in rows
+    ])
+
+
+def refresh_totals(topic_ids) -> None:
+    """Copy the current assignment count of each topic into its summary rows."""
+    for topic_id in {t for t in topic_ids if t}:
+        db.session.execute(
+            sa.update(UserTopicProgress)
+            .where(UserTopicProgress.topic_id == topic_id)
+            .values(total_assignments=assignment_count(topic_id))
+        )
+
+
+def rows_for(user_id: str) -> dict:
+    return {
+        row.topic_id: row.to_dict()
+        for row in db.session.scalars(sa.select(UserTopicProgress).where(UserTopicProgress.user_id == user_id))
+    }
+
+
+@click.command("rebuild-topic-progress")
+@with_appcontext
+def rebuild_command():
+    """Recompute user_topic_progress from user_progress."""
+    db.session.execute(sa.delete(UserTopicProgress))
+    _insert_aggregates(_aggregate(sa.true()))
+    db.session.commit()
+    click.echo(f"{db.session.scalar(sa.select(sa.func.count()).select_from(UserTopicProgress))} rows")
@@ -0,0 +1,57 @@
+"""Admin operations on users that touch more than one table."""
+
+import sqlalchemy as sa
+from flask import Blueprint, current_app, jsonify
+
+from . import conversations
+from .auth import admin_required, current_user
+from .errors import ApiError, NotFound
+from .extensions import db
+from .jobs import runner
+from .models import GradingTicket, ReviewDraft, User, UserProgress, UserTopicProgress
+
+bp = Blueprint("users", __name__, url_prefix="/api/users")
+
+
+def delete_user_cascade(job, user_id: str) -> dict:
+    """Delete a user and all their progress in one transaction.
+
+    Grading tickets and review drafts go with the progress they belong to.
+    Progress rows go in batches of ``DELETE_BATCH_SIZE`` so no single statement
+    holds a huge lock set, and the job reports progress after each batch.  Any
+    failure rolls the whole deletion back.
+    """
+    batch_size = current_app.config["DELETE_BATCH_SIZE"]
+    user = db.session.get(User, user_id)
+    if user is None:
+        raise NotFound(f"User {user_id} not found")
+    owned = UserProgress.created_by == user.email
+    job.total = db.session.scalar(sa.select(sa.func.count()).select_from(UserProgress).where(owned))
+    try:
+        while True:
+            ids = db.session.scalars(sa.select(UserProgress.id).where(owned).limit(batch_size)).all()
+            if not ids:
+                break
+            db.session.execute(sa.delete(GradingTicket).where(GradingTicket.progress_id.in_(ids)))
+            db.session.execute(sa.delete(ReviewDraft).where(ReviewDraft.progress_id.in_(ids)))
+            db.session.execute(sa.delete(UserProgress).where(UserProgress.id.in_(ids)))
+            job.advance(len(ids))
+        db.session.execute(sa.delete(UserTopicProgress).where(UserTopicProgress.user_id == user_id))
+        conversations.delete_for_user(user_id)
+        db.session.delete(user)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {"user_id": user_id, "progress_deleted": job.done}
+
+
+@bp.delete("/<user_id>")
+@admin_required
+def delete_user(user_id):
+    if db.session.get(User, user_id) is None:
+        raise NotFound(f"User {user_id} not found")
+    if user_id == current_user.id:
+        raise ApiError("cannot delete your own account")
+    job = runner.submit("delete_user", delete_user_cascade, user_id, owner=current_user.email)
+    return jsonify(job.to_dict()), 202
@@ -0,0 +1,48 @@
+"""Collection versions and conditional GET for entity lists.
+
+Content collections (topics and assignments) carry a version number that every
+write bumps inside its own transaction.  A list response's ETag combines that
+version with the query parameters, so ``If-None-Match`` can be answered with
+304 before the list query runs.  Collections written on every submission
+(users, progress) are not versioned, since one counter row would serialise
+all submissions; their lists get an ETag hashed from the response body, which
+still saves the transfer and the client-side parse.
+"""
+
+import hashlib
+import json
+
+import sqlalchemy as sa
+from flask import request
+
+from .extensions import db
+from .models import CollectionVersion
+from .query import dialect_insert
+
+VERSIONED = {"Topic", "Assignment"}
+
+
+def bump(*names: str) -> None:
+    for name in names:
+        if name not in VERSIONED:
+            continue
+        stmt = dialect_insert(CollectionVersion).values(name=name, version=1)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["name"], set_={"version": CollectionVersion.version + 1},
+        ))
+
+
+def current(name: str) -> int:
+    return db.session.scalar(sa.select(CollectionVersion.version).where(CollectionVersion.name == name)) or 0
+
+
+def list_etag(name: str, params: dict) -> str | None:
+    """ETag for a list of a versioned collection, or ``None`` if it is not versioned."""
+    if name not in VERSIONED:
+        return None
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{name}-{current(name)}-{digest}"
+
+
+def not_modified(etag: str) -> bool:
+    return etag in request.if_none_match
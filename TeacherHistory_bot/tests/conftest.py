@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend import catalog, create_app, helper, leaderboard, retrieval  # noqa: E402
+from backend.extensions import db  # noqa: E402
+from backend.models import User  # noqa: E402
+
+ADMIN = {"X-User-Email": "teacher@example.com"}
+STUDENT = {"X-User-Email": "student@example.com"}
+
+
+def make_app(path):
+    """An app on a fresh SQLite file at ``path``, with the admin user created."""
+    # A file database: grading and streaming run on worker threads, which an
+    # in-memory SQLite database cannot be shared with.
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "LLM_PROVIDER": "fake",
+        "LLM_RETRY_BACKOFF": 0,
+        "REGRADE_INTERVAL_SECONDS": 0,
+    })
+    catalog.invalidate()
+    helper.answers.clear()
+    retrieval.index.invalidate()
+    leaderboard.board.loaded_at = None
+    with app.app_context():
+        db.session.add(User(email=ADMIN["X-User-Email"], full_name="Teacher", role="admin"))
+        db.session.commit()
+    return app
+
+
+def dispose(app):
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path / "clio.db")
+    yield app
+    dispose(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def provider(app):
+    return app.extensions["llm"]
+
+
+@pytest.fixture
+def create(client):
+    def create(entity, **values):
+        response = client.post(f"/api/entities/{entity}", json=values, headers=ADMIN)
+        assert response.status_code == 201, response.json
+        return response.json
+    return create
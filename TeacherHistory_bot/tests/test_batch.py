@@ -0,0 +1,20 @@
+from .conftest import ADMIN
+
+
+def test_bad_queries_fail_on_their_own(client, create):
+    topic = create("Topic", title="Смута", grade=7, subject="history", content="...")
+    results = client.post("/api/batch", json={"queries": {
+        "topics": {"entity": "Topic", "fields": "id,title"},
+        "one": {"entity": "Topic", "id": topic["id"]},
+        "list": {"entity": ["Topic"]},
+        "object": {"entity": {"name": "Topic"}},
+        "missing": {},
+        "unknown": {"entity": "Nope"},
+        "spec": "Topic",
+    }}, headers=ADMIN).json
+
+    assert results["topics"] == {"status": 200, "body": [{"id": topic["id"], "title": "Смута"}]}
+    assert results["one"]["body"]["title"] == "Смута"
+    for key in ("list", "object", "missing", "spec"):
+        assert results[key]["status"] == 400, key
+    assert results["unknown"]["status"] == 404
@@ -0,0 +1,43 @@
+from backend import versions
+from backend.extensions import db
+from backend.models import Topic
+
+from .conftest import ADMIN, STUDENT
+
+NINTH_GRADE = "/api/entities/Topic?q=%7B%22grade%22%3A9%7D"
+
+
+def test_unchanged_list_is_not_modified(client, create):
+    create("Topic", title="Революция 1917 года", grade=9, subject="history", content="...")
+    first = client.get(NINTH_GRADE, headers=STUDENT)
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    again = client.get(NINTH_GRADE, headers={**STUDENT, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_write_invalidates_the_etag(client, create):
+    topic = create("Topic", title="Революция 1917 года", grade=9, subject="history", content="...")
+    etag = client.get(NINTH_GRADE, headers=STUDENT).headers["ETag"]
+
+    client.put(f"/api/entities/Topic/{topic['id']}", json={"title": "Февральская революция"}, headers=ADMIN)
+    response = client.get(NINTH_GRADE, headers={**STUDENT, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [t["title"] for t in response.json] == ["Февральская революция"]
+
+
+def test_write_from_another_worker_is_served(app, client, create):
+    topic = create("Topic", title="Революция 1917 года", grade=9, subject="history", content="...")
+    etag = client.get(NINTH_GRADE, headers=STUDENT).headers["ETag"]
+
+    # Another worker commits a change and bumps the version, but this
+    # process's in-memory catalog is never told.
+    with app.app_context():
+        db.session.get(Topic, topic["id"]).title = "Февральская революция"
+        versions.bump("Topic")
+        db.session.commit()
+
+    response = client.get(NINTH_GRADE, headers={**STUDENT, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json] == ["Февральская революция"]
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+from .conftest import ADMIN, dispose, make_app
+
+PACKAGE = {
+    "topics": [{
+        "title": "Реформы Петра I", "grade": 8, "subject": "history", "content": "...", "order_index": 1,
+        "assignments": [
+            {"title": "Год", "type": "test", "question": "Когда основан Петербург?", "correct_answer": "1703",
+             "points": 5},
+            {"title": "Итоги", "type": "essay", "question": "Каковы итоги реформ?", "correct_answer": "Империя",
+             "points": 10},
+        ],
+    }],
+}
+
+
+def import_course(client, package, dry_run=False):
+    response = client.post(f"/api/course/import{'?dry_run=1' if dry_run else ''}", json=package, headers=ADMIN)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def titles(client, entity):
+    return sorted(r["title"] for r in client.get(f"/api/entities/{entity}", headers=ADMIN).json)
+
+
+@pytest.fixture
+def other_client(tmp_path):
+    app = make_app(tmp_path / "other.db")
+    yield app.test_client()
+    dispose(app)
+
+
+def test_dry_run_reports_the_diff_without_writing(client):
+    result = import_course(client, PACKAGE, dry_run=True)
+    assert result["dry_run"] is True
+    assert result["summary"] == {"Topic": {"create": 1, "update": 0, "unchanged": 0},
+                                 "Assignment": {"create": 2, "update": 0, "unchanged": 0}}
+    assert titles(client, "Topic") == []
+
+    import_course(client, PACKAGE)
+    edited = {"topics": [{**PACKAGE["topics"][0], "assignments": [
+        {**PACKAGE["topics"][0]["assignments"][0], "correct_answer": "1704"},
+        PACKAGE["topics"][0]["assignments"][1],
+    ]}]}
+    result = import_course(client, edited, dry_run=True)
+    assert result["summary"]["Assignment"] == {"create": 0, "update": 1, "unchanged": 1}
+    [change] = result["changes"]
+    assert (change["action"], change["title"], change["fields"]) == ("update", "Год", ["correct_answer"])
+    [stored] = client.post("/api/entities/Assignment/filter", json={"query": {"title": "Год"}}, headers=ADMIN).json
+    assert stored["correct_answer"] == "1703"
+
+
+def test_export_imports_into_another_database(client, other_client):
+    import_course(client, PACKAGE)
+    exported = client.get("/api/course/export", headers=ADMIN).get_json()
+
+    result = import_course(other_client, exported)
+    assert result["summary"] == {"Topic": {"create": 1, "update": 0, "unchanged": 0},
+                                 "Assignment": {"create": 2, "update": 0, "unchanged": 0}}
+    assert titles(other_client, "Assignment") == ["Год", "Итоги"]
+    assert import_course(other_client, exported)["summary"]["Assignment"]["unchanged"] == 2
+    assert import_course(client, exported)["summary"]["Assignment"]["unchanged"] == 2
+
+
+def test_csv_export_round_trips(client, other_client):
+    import_course(client, PACKAGE)
+    files = {
+        entity.lower() + "s": (io.BytesIO(client.get(f"/api/course/export?format=csv&entity={entity}",
+                                                     headers=ADMIN).data), f"{entity}.csv")
+        for entity in ("Topic", "Assignment")
+    }
+    response = other_client.post("/api/course/import", data=files, headers=ADMIN)
+    assert response.status_code == 200, response.json
+    assert titles(other_client, "Assignment") == ["Год", "Итоги"]
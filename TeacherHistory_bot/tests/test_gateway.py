@@ -0,0 +1,299 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import grading
+from backend.llm import (
+    CircuitBreaker, CircuitOpen, FakeProvider, Gateway, LLMError, LLMTimeout, QuotaExceeded, prompt_key,
+)
+from backend.llm import gateway as gateway_module
+
+FEATURES = {
+    "grading": {"rate": 100.0, "burst": 100},
+    "helper": {"rate": 1.0, "burst": 2, "concurrency": 1, "user_rate": 0.5, "user_burst": 1},
+}
+
+
+class Clock:
+    """A monotonic clock that only moves when told to, or when the gateway sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Flaky(FakeProvider):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def complete(self, prompt, schema=None, timeout=None):
+        self.fail = self.calls < self.failures
+        return super().complete(prompt, schema, timeout)
+
+
+class Gated(FakeProvider):
+    """Holds every call until :attr:`release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def complete(self, prompt, schema=None, timeout=None):
+        assert self.release.wait(5)
+        return super().complete(prompt, schema, timeout)
+
+
+def make_gateway(provider, clock, max_concurrency=4, features=FEATURES, **kwargs):
+    return Gateway(provider, max_concurrency, features, 5.0, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_feature_quota_fails_interactive_calls_until_it_refills(clock):
+    provider = FakeProvider()
+    gw = make_gateway(provider, clock)
+    gw.complete("Вопрос", feature="helper")
+    gw.complete("Вопрос", feature="helper")
+
+    with pytest.raises(QuotaExceeded) as exc:
+        gw.complete("Вопрос", feature="helper")
+    assert exc.value.retry_after == pytest.approx(1.0)
+    assert provider.calls == 2
+    gw.complete("Вопрос", feature="grading")  # other features keep their own bucket
+
+    clock.now += 1
+    gw.complete("Вопрос", feature="helper")
+    assert provider.calls == 4
+
+
+def test_per_user_quota_is_kept_per_user(clock):
+    provider = FakeProvider()
+    gw = make_gateway(provider, clock)
+    gw.complete("Вопрос", feature="helper", user="a@example.com")
+
+    with pytest.raises(QuotaExceeded, match="per-user") as exc:
+        gw.complete("Вопрос", feature="helper", user="a@example.com")
+    assert exc.value.retry_after == pytest.approx(2.0)
+    gw.complete("Вопрос", feature="helper", user="b@example.com")
+    assert provider.calls == 2
+
+
+def test_background_calls_wait_for_a_token_within_the_deadline(clock):
+    gw = make_gateway(FakeProvider(), clock, features={"grading": {"rate": 2.0, "burst": 1}})
+    gw.complete("Вопрос", feature="grading", wait=True)
+    gw.complete("Вопрос", feature="grading", wait=True)
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+    with pytest.raises(QuotaExceeded):
+        gw.complete("Вопрос", feature="grading", wait=True, deadline=clock() + 0.1)
+
+
+def test_global_slots_time_out_at_the_deadline(clock):
+    gw = make_gateway(FakeProvider(), clock, max_concurrency=1)
+    held = gw.stream("Вопрос", feature="helper")
+
+    with pytest.raises(LLMTimeout):
+        gw.complete("Вопрос", feature="grading", deadline=clock() + 0.05)
+    held.close()
+    gw.complete("Вопрос", feature="grading", deadline=clock() + 0.05)
+
+
+def test_feature_slots_do_not_crowd_out_other_features(clock):
+    features = dict(FEATURES, helper={"rate": 100.0, "burst": 100, "concurrency": 1})
+    gw = make_gateway(FakeProvider(), clock, features=features)
+    held = gw.stream("Вопрос", feature="helper")
+
+    with pytest.raises(LLMTimeout):
+        gw.stream("Вопрос", feature="helper", deadline=clock() + 0.05)
+    gw.complete("Вопрос", feature="grading", deadline=clock() + 0.05)
+    list(held)  # an exhausted stream gives its slots back
+    gw.stream("Вопрос", feature="helper", deadline=clock() + 0.05).close()
+
+
+def test_deadline_bounds_the_provider_call(clock):
+    provider = FakeProvider()
+    gw = make_gateway(provider, clock)
+    with pytest.raises(LLMTimeout):
+        gw.complete("Вопрос", feature="grading", deadline=clock())
+    assert provider.calls == 0
+
+    provider.latency = 1.0
+    with pytest.raises(LLMTimeout, match="timed out"):
+        gw.complete("Вопрос", feature="grading", deadline=clock() + 0.05)
+
+
+def test_retries_back_off_with_full_jitter(clock, monkeypatch):
+    ranges = []
+
+    def uniform(low, high):
+        ranges.append((low, high))
+        return high / 2
+
+    monkeypatch.setattr(gateway_module.random, "uniform", uniform)
+    provider = Flaky(failures=2)
+    gw = make_gateway(provider, clock, backoff=1.0)
+
+    assert gw.complete("Вопрос", feature="grading", attempts=3).startswith("Это учебный ответ")
+    assert provider.calls == 3
+    assert ranges == [(0, 1.0), (0, 2.0)]
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_retries_stop_at_attempts_and_at_the_deadline(clock, monkeypatch):
+    monkeypatch.setattr(gateway_module.random, "uniform", lambda low, high: high)
+    provider = Flaky(failures=10)
+    gw = make_gateway(provider, clock, backoff=0.001)
+    with pytest.raises(LLMError, match="failing"):
+        gw.complete("Вопрос", feature="grading", attempts=3)
+    assert provider.calls == 3
+
+    gw = make_gateway(provider, clock, backoff=100.0)
+    with pytest.raises(LLMTimeout, match="backing off"):
+        gw.complete("Вопрос", feature="grading", attempts=3, deadline=clock() + 0.01)
+    assert provider.calls == 4
+
+
+def test_rejected_replies_are_retried(clock):
+    provider = FakeProvider()
+    gw = make_gateway(provider, clock, backoff=0.0)
+    seen = []
+
+    def validate(reply):
+        seen.append(reply)
+        if len(seen) == 1:
+            raise LLMError("malformed reply")
+        return reply.upper()
+
+    assert gw.complete("Вопрос", feature="grading", attempts=2, validate=validate).startswith("ЭТО")
+    assert provider.calls == 2
+
+
+def test_breaker_opens_lets_one_trial_through_and_closes(clock):
+    provider = FakeProvider(fail=True)
+    breaker = CircuitBreaker(2, 10.0, clock)
+    closed = []
+    breaker.on_close(lambda: closed.append(clock()))
+    gw = make_gateway(provider, clock, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(LLMError, match="failing"):
+            gw.complete("Вопрос", feature="grading")
+    assert breaker.open
+
+    with pytest.raises(CircuitOpen) as exc:
+        gw.complete("Вопрос", feature="grading", attempts=3)
+    assert exc.value.retry_after == pytest.approx(10.0)
+    assert provider.calls == 2 and clock.sleeps == []
+
+    clock.now += 10  # half-open: a failed trial starts a new cooldown
+    with pytest.raises(LLMError, match="failing"):
+        gw.complete("Вопрос", feature="grading")
+    with pytest.raises(CircuitOpen):
+        gw.complete("Вопрос", feature="grading")
+    assert provider.calls == 3
+
+    clock.now += 10
+    provider.fail = False
+    gw.complete("Вопрос", feature="grading")
+    assert not breaker.open
+    assert closed == [20.0]
+    gw.complete("Вопрос", feature="grading")
+    assert closed == [20.0]
+
+
+def test_half_open_breaker_admits_a_single_trial(clock):
+    breaker = CircuitBreaker(1, 10.0, clock)
+    breaker.record_failure()
+    clock.now += 10
+
+    breaker.allow()
+    with pytest.raises(CircuitOpen) as exc:
+        breaker.allow()
+    assert exc.value.retry_after == pytest.approx(10.0)
+
+
+def test_closing_breaker_wakes_the_regrade_sweep(app, provider):
+    gw = app.extensions["llm_gateway"]
+    provider.fail = True
+    for _ in range(gw.breaker.threshold):
+        with pytest.raises(LLMError):
+            gw.complete("Вопрос", feature="grading")
+    with pytest.raises(CircuitOpen):
+        gw.complete("Вопрос", feature="grading")
+
+    grading.queue._wake.clear()
+    gw.breaker.cooldown = 0
+    provider.fail = False
+    gw.complete("Вопрос", feature="grading")
+    assert grading.queue._wake.is_set()
+
+
+def coalesced(gw, provider, prompts, **kwargs):
+    """Run one keyed call per prompt at once and return their outcomes once all have joined one flight."""
+    def call(prompt):
+        try:
+            return gw.complete(prompt, feature="grading", key=prompt_key(prompt), **kwargs)
+        except LLMError as exc:
+            return exc
+
+    with ThreadPoolExecutor(len(prompts)) as pool:
+        futures = [pool.submit(call, prompt) for prompt in prompts]
+        limit = time.monotonic() + 5
+        while sum(flight.waiters for flight in gw._flights._calls.values()) < len(prompts) - 1:
+            assert time.monotonic() < limit, "callers did not join one flight"
+            time.sleep(0.01)
+        provider.release.set()
+        return [future.result() for future in futures]
+
+
+def test_identical_calls_share_one_provider_call(clock):
+    provider = Gated()
+    gw = make_gateway(provider, clock)
+    replies = coalesced(gw, provider, ["Кто такие декабристы?", "  Кто такие\nдекабристы? "] * 4)
+
+    assert provider.calls == 1
+    assert len(set(replies)) == 1 and replies[0].startswith("Это учебный ответ")
+    assert gw.in_flight() == 0
+    gw.complete("Кто такие декабристы?", feature="grading", key=prompt_key("Кто такие декабристы?"))
+    assert provider.calls == 2  # a finished flight is not reused
+
+
+def test_failed_call_reaches_every_waiter(clock):
+    provider = Gated()
+    provider.fail = True
+    gw = make_gateway(provider, clock)
+    errors = coalesced(gw, provider, ["Вопрос"] * 6)
+
+    assert provider.calls == 1
+    assert all(isinstance(error, LLMError) and "failing" in str(error) for error in errors)
+    assert gw.in_flight() == 0
+
+
+def test_waiters_are_still_charged_their_own_quota(clock):
+    provider = Gated()
+    gw = make_gateway(provider, clock)
+    ask = dict(feature="helper", user="a@example.com", key=prompt_key("Вопрос"))
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(gw.complete, "Вопрос", **ask)
+        limit = time.monotonic() + 5
+        while not gw.in_flight():
+            assert time.monotonic() < limit
+            time.sleep(0.01)
+
+        with pytest.raises(QuotaExceeded, match="per-user"):
+            gw.complete("Вопрос", **ask)
+        provider.release.set()
+        assert leader.result().startswith("Это учебный ответ")
+    assert provider.calls == 1
@@ -0,0 +1,45 @@
+import sqlalchemy as sa
+
+from backend.extensions import db
+from backend.grade_cache import normalize_answer
+from backend.models import GradeCacheEntry
+
+from .conftest import ADMIN, STUDENT
+from .test_grading import ANSWER, essay, submit
+
+OTHER = {"X-User-Email": "other@example.com"}
+
+
+def cached_grades(app) -> int:
+    with app.app_context():
+        return db.session.scalar(sa.select(sa.func.count()).select_from(GradeCacheEntry))
+
+
+def test_normalization_only_merges_answers_that_read_the_same():
+    assert normalize_answer("  Гонка  вооружений, колонии. ") == normalize_answer("гонка вооружений, колонии")
+    assert normalize_answer("Ёлка") == normalize_answer("елка")
+    assert normalize_answer("колонии, гонка вооружений") != normalize_answer("гонка вооружений, колонии")
+
+
+def test_same_answer_is_graded_once(app, client, create, provider):
+    assignment = essay(create)
+    first = submit(client, assignment)
+    second = submit(client, assignment, f"  {ANSWER.upper()}. ", headers=OTHER)
+
+    assert provider.calls == 1
+    assert cached_grades(app) == 1
+    assert second["ticket"]["status"] == "done"
+    for field in ("is_correct", "points_earned", "ai_feedback"):
+        assert second["progress"][field] == first["progress"][field]
+
+
+def test_editing_the_assignment_drops_its_grades(app, client, create, provider):
+    assignment = essay(create)
+    submit(client, assignment)
+    edit = {"correct_answer": "Борьба за колонии, убийство эрцгерцога, союзы держав"}
+    response = client.put(f"/api/entities/Assignment/{assignment['id']}", json=edit, headers=ADMIN)
+    assert response.status_code == 200
+    assert cached_grades(app) == 0
+
+    submit(client, assignment, headers=OTHER)
+    assert provider.calls == 2
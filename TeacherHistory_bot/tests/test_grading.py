@@ -0,0 +1,73 @@
+from backend import grading
+from backend.prescore import DEGRADED_FEEDBACK
+
+from .conftest import STUDENT
+
+REFERENCE = "Борьба за колонии, гонка вооружений, противоречия Антанты и Тройственного союза, убийство эрцгерцога"
+ANSWER = "Гонка вооружений, колонии, противоречия Антанты"
+
+
+def essay(create):
+    topic = create("Topic", title="Первая мировая война", grade=9, subject="history", content="...")
+    return create("Assignment", topic_id=topic["id"], title="Причины", type="essay", points=10,
+                  question="Назовите причины Первой мировой войны", correct_answer=REFERENCE)
+
+
+def submit(client, assignment, answer=ANSWER, headers=STUDENT):
+    response = client.post("/api/submissions", json={"assignment_id": assignment["id"], "user_answer": answer},
+                           headers=headers)
+    assert response.status_code == 202, response.json
+    assert response.json["progress"]["is_correct"] is None
+    ticket = response.json["ticket"]
+    response = client.get(f"/api/grading/{ticket['id']}?wait=5", headers=headers)
+    assert response.status_code == 200
+    return response.json
+
+
+def test_test_answers_are_graded_inline(client, create):
+    topic = create("Topic", title="Начало войны", grade=9, subject="history", content="...")
+    assignment = create("Assignment", topic_id=topic["id"], title="Год", type="test", question="Год начала войны?",
+                        correct_answer="1914", points=5)
+    response = client.post("/api/submissions", json={"assignment_id": assignment["id"], "user_answer": "1914"},
+                           headers=STUDENT)
+    assert response.status_code == 201
+    assert response.json["progress"]["is_correct"] is True
+    assert response.json["user"]["total_points"] == 5
+
+
+def test_essay_goes_through_a_grading_ticket(client, create, provider):
+    result = submit(client, essay(create))
+
+    assert result["ticket"]["status"] == "done"
+    assert provider.calls == 1
+    progress = result["progress"]
+    assert progress["is_correct"] is not None
+    assert progress["ai_feedback"].startswith("Совпадение с эталоном")
+    assert result["user"]["total_points"] == progress["points_earned"]
+    assert result["topic"]["attempted"] == 1
+
+
+def test_degraded_grade_is_replaced_by_regrade(app, client, create, provider):
+    assignment = essay(create)
+    provider.fail = True
+    result = submit(client, assignment)
+
+    assert result["ticket"]["status"] == "degraded"
+    assert result["progress"]["ai_feedback"] == DEGRADED_FEEDBACK
+    provisional = result["progress"]["points_earned"]
+    assert result["user"]["total_points"] == provisional
+
+    provider.fail = False
+    with app.app_context():
+        assert grading.queue.regrade() == 1
+    result = client.get(f"/api/grading/{result['ticket']['id']}?wait=5", headers=STUDENT).json
+
+    assert result["ticket"]["status"] == "done"
+    assert result["progress"]["ai_feedback"].startswith("Совпадение с эталоном")
+    assert result["user"]["total_points"] == result["progress"]["points_earned"]
+
+
+def test_ticket_is_private_to_its_owner(client, create):
+    result = submit(client, essay(create))
+    response = client.get(f"/api/grading/{result['ticket']['id']}", headers={"X-User-Email": "other@example.com"})
+    assert response.status_code == 404
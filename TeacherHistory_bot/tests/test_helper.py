@@ -0,0 +1,82 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy as sa
+
+from backend import conversations
+from backend.extensions import db
+from backend.models import HelperMessage, HelperSession
+
+from .conftest import STUDENT
+
+
+def events(chunks):
+    for chunk in chunks:
+        for block in chunk.decode().split("\n\n"):
+            if block.strip():
+                lines = dict(line.split(": ", 1) for line in block.splitlines())
+                yield lines.get("event", "message"), json.loads(lines["data"])
+
+
+def test_stream_can_be_cancelled(client, provider):
+    provider.token_delay = 0.05
+    response = client.post("/api/helper/stream", json={"question": "Кто такие декабристы?"}, headers=STUDENT,
+                           buffered=False)
+    stream = events(response.response)
+    event, data = next(stream)
+    assert event == "start"
+    event, _ = next(stream)
+    assert event == "delta"
+
+    # The open stream keeps its request context pushed on this thread, so the
+    # cancel requests are made from another one, as a browser's would be.
+    def cancel(headers):
+        return client.post(f"/api/helper/stream/{data['id']}/cancel", headers=headers).status_code
+
+    with ThreadPoolExecutor(1) as pool:
+        assert pool.submit(cancel, {"X-User-Email": "other@example.com"}).result() == 404
+        assert pool.submit(cancel, STUDENT).result() == 200
+
+    names = [event for event, _ in stream]
+    response.close()
+    assert names[-1] == "cancelled"
+    assert "done" not in names
+
+
+def test_stream_runs_to_completion(client):
+    response = client.post("/api/helper/stream", json={"question": "Кто такие декабристы?"}, headers=STUDENT)
+    names = [event for event, _ in events([response.data])]
+    assert names[0] == "start"
+    assert names[-1] == "done"
+
+
+def test_cached_answer_needs_the_same_question_word(client, provider):
+    def ask(question):
+        response = client.post("/api/helper/ask", json={"question": question}, headers=STUDENT)
+        assert response.status_code == 200, response.json
+        return response.json
+
+    ask("Когда началась Первая мировая война?")
+    assert ask("Когда началась первая мировая война").get("cached") is True
+    assert ask("Почему началась Первая мировая война?").get("cached") is False
+    assert provider.calls == 2
+
+
+def test_interleaved_turns_in_one_session_get_distinct_seqs(app, client):
+    session_id = client.post("/api/helper/ask", json={"question": "Кто такие декабристы?"},
+                             headers=STUDENT).json["session_id"]
+
+    with app.app_context():
+        first = db.session.get(HelperSession, session_id)
+        assert first.last_seq == 2
+        with app.app_context():  # a second request, which read the session at the same time
+            second = db.session.get(HelperSession, session_id)
+            assert second.last_seq == 2
+            conversations.append(second, "user", "А когда было восстание?")
+            db.session.commit()
+        conversations.append(first, "user", "Чем оно закончилось?")
+        db.session.commit()
+
+        seqs = db.session.scalars(sa.select(HelperMessage.seq).where(
+            HelperMessage.session_id == session_id).order_by(HelperMessage.seq)).all()
+    assert seqs == [1, 2, 3, 4]
@@ -0,0 +1,49 @@
+from backend.leaderboard import Leaderboard
+
+from .conftest import STUDENT
+
+OTHER = {"X-User-Email": "other@example.com"}
+
+
+def test_changes_committed_during_a_reload_are_replayed():
+    board = Leaderboard()
+    board.begin_load()
+    # Committed after the snapshot below was read.
+    board.record("b", 50, 9)
+    board.discard("c")
+    board.load([("a", 30, 9), ("b", 10, 9), ("c", 40, 8)])
+
+    assert board.top(10) == [(1, "b", 50), (2, "a", 30)]
+    assert board.rank("c") is None
+
+
+def test_record_moves_a_user_between_partitions():
+    board = Leaderboard()
+    board.begin_load()
+    board.load([("a", 30, 9), ("b", 20, 9)])
+    board.record("b", 35, 8)
+
+    assert board.top(10, 9) == [(1, "a", 30)]
+    assert board.top(10, 8) == [(1, "b", 35)]
+    assert board.around("a", 1) == [(1, "b", 35), (2, "a", 30)]
+
+
+def test_ranking_follows_submissions(client, create):
+    topic = create("Topic", title="Начало войны", grade=9, subject="history", content="...")
+    cheap, dear = (
+        create("Assignment", topic_id=topic["id"], title=f"Год {points}", type="test",
+               question="Год начала войны?", correct_answer="1914", points=points)
+        for points in (5, 10)
+    )
+    for headers, grade in ((STUDENT, 9), (OTHER, 8)):
+        assert client.put("/api/auth/me", json={"grade": grade}, headers=headers).status_code == 200
+    assert client.get("/api/leaderboard", headers=STUDENT).json == {"items": [], "total": 0}
+
+    for headers, assignment in ((STUDENT, cheap), (OTHER, cheap), (OTHER, dear)):
+        client.post("/api/submissions", json={"assignment_id": assignment["id"], "user_answer": "1914"},
+                    headers=headers)
+
+    ranking = client.get("/api/leaderboard", headers=STUDENT).json
+    assert [(u["rank"], u["total_points"], u["grade"]) for u in ranking["items"]] == [(1, 15, 8), (2, 5, 9)]
+    assert client.get("/api/leaderboard/me", headers=STUDENT).json["rank"] == 2
+    assert client.get("/api/leaderboard/me?grade=9", headers=STUDENT).json["rank"] == 1
@@ -0,0 +1,67 @@
+from .conftest import ADMIN, STUDENT
+
+OTHER = {"X-User-Email": "other@example.com"}
+
+
+def progress(client, create, headers):
+    topic = create("Topic", title="Начало войны", grade=9, subject="history", content="...")
+    assignment = create("Assignment", topic_id=topic["id"], title="Год", type="test", question="Год начала войны?",
+                        correct_answer="1914", points=5)
+    response = client.post("/api/submissions", json={"assignment_id": assignment["id"], "user_answer": "1914"},
+                           headers=headers)
+    return response.json["progress"]
+
+
+def test_users_are_readable_by_admins_only(client):
+    client.get("/api/auth/me", headers=STUDENT)
+    assert client.get("/api/entities/User", headers=STUDENT).status_code == 403
+    assert client.post("/api/entities/User/filter", json={}, headers=STUDENT).status_code == 403
+    admin_id = client.get("/api/auth/me", headers=ADMIN).json["id"]
+    assert client.get(f"/api/entities/User/{admin_id}", headers=STUDENT).status_code == 403
+    assert len(client.get("/api/entities/User", headers=ADMIN).json) == 2
+
+
+def test_students_read_only_their_own_progress(client, create):
+    mine = progress(client, create, STUDENT)
+    theirs = progress(client, create, OTHER)
+
+    listed = client.get("/api/entities/UserProgress", headers=STUDENT).json
+    assert [p["id"] for p in listed] == [mine["id"]]
+    filtered = client.post("/api/entities/UserProgress/filter", json={"query": {"created_by": OTHER["X-User-Email"]}},
+                           headers=STUDENT).json
+    assert filtered == []
+    paged = client.post("/api/entities/UserProgress/filter", json={"cursor": ""}, headers=STUDENT).json
+    assert [p["id"] for p in paged["items"]] == [mine["id"]]
+    assert client.get(f"/api/entities/UserProgress/{theirs['id']}", headers=STUDENT).status_code == 404
+    assert len(client.get("/api/entities/UserProgress", headers=ADMIN).json) == 2
+
+
+def test_batch_applies_the_same_read_rules(client, create):
+    mine = progress(client, create, STUDENT)
+    theirs = progress(client, create, OTHER)
+    results = client.post("/api/batch", json={"queries": {
+        "users": {"entity": "User"},
+        "progress": {"entity": "UserProgress"},
+        "theirs": {"entity": "UserProgress", "id": theirs["id"]},
+    }}, headers=STUDENT).json
+
+    assert results["users"]["status"] == 403
+    assert [p["id"] for p in results["progress"]["body"]] == [mine["id"]]
+    assert results["theirs"]["status"] == 404
+
+
+def test_students_cannot_write_progress(client, create):
+    mine = progress(client, create, STUDENT)
+    url = f"/api/entities/UserProgress/{mine['id']}"
+    for change in ({"points_earned": -1000}, {"ai_feedback": None}, {"user_answer": "1915"}):
+        assert client.put(url, json=change, headers=STUDENT).status_code == 403
+    assert client.post("/api/entities/UserProgress", json={**mine, "id": None}, headers=STUDENT).status_code == 403
+    assert client.delete(url, headers=STUDENT).status_code == 403
+    assert client.get("/api/auth/me", headers=STUDENT).json["total_points"] == 5
+
+
+def test_grading_fields_are_not_writable_even_by_admins(client, create):
+    mine = progress(client, create, STUDENT)
+    response = client.put(f"/api/entities/UserProgress/{mine['id']}", json={"points_earned": 100}, headers=ADMIN)
+    assert response.status_code == 403
+    assert client.get(f"/api/entities/UserProgress/{mine['id']}", headers=STUDENT).json["points_earned"] == 5
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from backend.prescore import prescore
+
+WAR = SimpleNamespace(
+    question="Назовите причины Первой мировой войны",
+    correct_answer="Борьба за колонии, гонка вооружений, противоречия держав, убийство эрцгерцога",
+    points=10,
+)
+
+
+def test_empty_and_trivially_short_misses_are_settled():
+    for answer in ("", "...", "Не знаю", "Наполеон"):
+        score = prescore(WAR, answer)
+        assert score.settled and score.grade[:2] == (False, 0), answer
+
+
+def test_paraphrase_without_reference_terms_goes_to_the_llm():
+    answer = "Конфликт интересов Антанты и Тройственного союза, милитаризм и выстрел Гаврило Принципа в Сараево"
+    score = prescore(WAR, answer)
+    assert score.coverage == 0
+    assert not score.settled
+
+
+def test_short_partial_answer_goes_to_the_llm():
+    assert not prescore(WAR, "Колонии").settled
+
+
+def test_reference_and_copied_question_are_settled():
+    assert prescore(WAR, WAR.correct_answer).grade[:2] == (True, 10)
+    assert prescore(WAR, "Причины Первой мировой войны").grade[:2] == (False, 0)
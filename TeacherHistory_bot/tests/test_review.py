@@ -0,0 +1,77 @@
+from backend.extensions import db
+from backend.models import UserProgress
+
+from .conftest import ADMIN, STUDENT
+from .test_grading import essay, submit
+from .test_users import wait_for_job
+
+
+def ungraded(app, assignment, answer):
+    with app.app_context():
+        progress = UserProgress(assignment_id=assignment["id"], topic_id=assignment["topic_id"],
+                                user_answer=answer, created_by=STUDENT["X-User-Email"])
+        db.session.add(progress)
+        db.session.commit()
+        return progress.id
+
+
+def review(client, **criteria):
+    job = wait_for_job(client, client.post("/api/review/ai", json=criteria, headers=ADMIN).json)
+    assert job["status"] == "succeeded"
+    return client.get(f"/api/review/drafts?status=all&job_id={job['id']}", headers=ADMIN).json
+
+
+def test_review_of_one_submission_drafts_only_that_one(app, client, create):
+    assignment = essay(create)
+    client.get("/api/auth/me", headers=STUDENT)
+    first = ungraded(app, assignment, "Гонка вооружений и борьба за колонии")
+    ungraded(app, assignment, "Убийство эрцгерцога в Сараево")
+
+    drafts = review(client, progress_id=first)
+    assert [d["progress_id"] for d in drafts] == [first]
+
+    draft = drafts[0]
+    response = client.post(f"/api/review/drafts/{draft['id']}/accept", json={"points_earned": 7}, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json["progress"]["points_earned"] == 7
+    assert client.get("/api/auth/me", headers=STUDENT).json["total_points"] == 7
+
+
+def test_rejected_draft_is_redone_only_on_request(app, client, create):
+    progress_id = ungraded(app, essay(create), "Гонка вооружений и борьба за колонии")
+    [draft] = review(client)
+    assert client.post(f"/api/review/drafts/{draft['id']}/reject", headers=ADMIN).status_code == 200
+
+    assert review(client) == []
+    assert [d["progress_id"] for d in review(client, progress_id=progress_id)] == [progress_id]
+
+
+def test_manual_grade_replaces_a_provisional_one(client, create, provider):
+    assignment = essay(create)
+    provider.fail = True
+    result = submit(client, assignment)
+    provisional = result["progress"]["points_earned"]
+    assert result["user"]["total_points"] == provisional
+
+    url = f"/api/review/grade/{result['progress']['id']}"
+    grade = {"is_correct": True, "points_earned": 8, "feedback": "Хорошо"}
+    assert client.post(url, json=grade, headers=STUDENT).status_code == 403
+    response = client.post(url, json=grade, headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json["progress"]["points_earned"] == 8
+    assert client.get("/api/auth/me", headers=STUDENT).json["total_points"] == 8
+
+    response = client.post(url, json={**grade, "points_earned": 50}, headers=ADMIN)
+    assert response.json["progress"]["points_earned"] == assignment["points"]
+    assert client.post(url, json={"points_earned": 3}, headers=ADMIN).status_code == 400
+
+
+def test_accepted_draft_is_not_reviewed_again(app, client, create, provider):
+    progress_id = ungraded(app, essay(create), "Гонка вооружений и борьба за колонии")
+    [draft] = review(client)
+    response = client.post(f"/api/review/drafts/{draft['id']}/accept", json={"feedback": None}, headers=ADMIN)
+    assert response.json["progress"]["ai_feedback"] is None
+
+    assert review(client) == []
+    assert review(client, progress_id=progress_id) == []
+    assert provider.calls == 1
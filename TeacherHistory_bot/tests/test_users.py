@@ -0,0 +1,41 @@
+import time
+
+import sqlalchemy as sa
+
+from backend.extensions import db
+from backend.models import GradingTicket, ReviewDraft, User, UserProgress
+
+from .conftest import ADMIN, STUDENT
+from .test_grading import essay, submit
+
+
+def wait_for_job(client, job):
+    deadline = time.monotonic() + 5
+    while job["status"] not in ("succeeded", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/jobs/{job['id']}", headers=ADMIN).json
+    return job
+
+
+def test_delete_user_removes_their_tickets_and_drafts(app, client, create, provider):
+    assignment = essay(create)
+    submit(client, assignment)
+    with app.app_context():  # an answer saved before server-side grading, still ungraded
+        db.session.add(UserProgress(assignment_id=assignment["id"], topic_id=assignment["topic_id"],
+                                    user_answer="Колонии и вооружения держав Европы",
+                                    created_by=STUDENT["X-User-Email"]))
+        db.session.commit()
+    review = wait_for_job(client, client.post("/api/review/ai", json={}, headers=ADMIN).json)
+    assert review["status"] == "succeeded"
+
+    with app.app_context():
+        user_id = db.session.scalar(sa.select(User.id).where(User.email == STUDENT["X-User-Email"]))
+        assert db.session.scalar(sa.select(sa.func.count()).select_from(ReviewDraft)) == 1
+
+    job = wait_for_job(client, client.delete(f"/api/users/{user_id}", headers=ADMIN).json)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"user_id": user_id, "progress_deleted": 2}
+    with app.app_context():
+        for model in (User, UserProgress, GradingTicket, ReviewDraft):
+            count = db.session.scalar(sa.select(sa.func.count()).select_from(model))
+            assert count == (1 if model is User else 0), model.__name__